@@ -0,0 +1,51 @@
+import pyomo.environ as pyo
+from example_data import read_data
+from n_k_model import n_k_reliability_model
+from prob_model import prob_reliability_model
+
+
+# (formulation, builder)
+BUILDERS = [('n-1', n_k_reliability_model), ('dual-no', prob_reliability_model)]
+
+
+def benchmark_cuts(datafolder, advanced, builder, time_limit=1000, abs_gap=0.01, renewable=False):
+    """
+    Solves a model without and with the capacity adequacy cuts (cuts=True) to the target gap.
+
+    Returns:
+        dict: Nodes explored, solve time (seconds), objective and final gap, without and with the cuts
+    """
+
+    data = read_data(datafolder, advanced)
+
+    results = {}
+    for run, cuts in [('no cuts', False), ('cuts', True)]:
+        m = builder(data, renewable, cuts=cuts)
+        results[run] = solve_counting_nodes(m, time_limit, abs_gap)
+
+    return results
+
+
+def solve_counting_nodes(m, time_limit, abs_gap):
+    # Persistent interface, so the node count and run time are read from the Gurobi model
+    opt = pyo.SolverFactory('gurobi_persistent')
+    opt.set_instance(m)
+    opt.set_gurobi_param('TimeLimit', time_limit)
+    opt.set_gurobi_param('MIPGap', abs_gap)
+    opt.set_gurobi_param('Threads', 8)
+    opt.solve(m)
+
+    return {'nodes': int(opt.get_model_attr('NodeCount')), 'time': opt.get_model_attr('Runtime'),
+            'objective': pyo.value(m.obj), 'gap': opt.get_model_attr('MIPGap')}
+
+
+
+if __name__ == "__main__":
+    datafolder = "San Diego"
+
+    print(f"{'Model':<9}{'Nodes':>12}{'Nodes cuts':>12}{'Time [s]':>11}{'Time cuts [s]':>15}{'Gap':>9}{'Gap cuts':>10}")
+    for advanced, builder in BUILDERS:
+        r = benchmark_cuts(datafolder, advanced, builder)
+        print(f"{advanced:<9}{r['no cuts']['nodes']:>12}{r['cuts']['nodes']:>12}"
+              f"{r['no cuts']['time']:>11.2f}{r['cuts']['time']:>15.2f}"
+              f"{r['no cuts']['gap']:>9.2%}{r['cuts']['gap']:>10.2%}")
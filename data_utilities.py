@@ -0,0 +1,697 @@
+import os
+import glob
+import json
+import hashlib
+import tempfile
+import itertools
+from collections import Counter
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+
+
+def table_to_dict(df, keys, value):
+    """
+    Converts a parameter table into the dictionary expected by the model builders.
+
+    The columns are pulled out as whole lists and zipped together, so no Python-level
+    work is done per row beyond building the dictionary itself.
+
+    Parameters:
+        df (DataFrame): Table read from the case folder
+        keys (str or list): Index column (e.g. 'k') or index columns (e.g. ['i','t','n','b'])
+        value (str): Column holding the parameter value
+
+    Returns:
+        dict: {index: value} or {(index_1, ..., index_n): value}
+    """
+
+    values = df[value].tolist()
+
+    if isinstance(keys, str):
+        return dict(zip(df[keys].tolist(), values))
+
+    return dict(zip(zip(*[df[c].tolist() for c in keys]), values))
+
+
+
+class ParamArray(Mapping):
+    """
+    Parameter stored as a NumPy array with one axis per index (node, gen, year, rpdn, sub, state, ...).
+
+    It reads like the tuple-keyed dictionaries the model builders expect, p[i,t,n,b] or p[k],
+    so it can be passed directly to pyo.Param(initialize=...). The array itself (array, with
+    the labels of each axis in axes) can be used for vectorized work without rebuilding dicts.
+
+    Parameters:
+        array (ndarray): Parameter values, one axis per index
+        axes (list): Labels of each axis, in the order of the index
+        present (ndarray): Entries the parameter is defined for (None when defined everywhere)
+    """
+
+    def __init__(self, array, axes, present=None):
+        self.array = array
+        self.axes = axes
+        self.present = present
+        self._positions = [{label: p for p, label in enumerate(labels)} for labels in axes]
+
+    def position(self, key):
+        # Position of the entry in array, KeyError for labels outside the axes
+        if len(self.axes) == 1:
+            return (self._positions[0][key],)
+        return tuple(positions[label] for positions, label in zip(self._positions, key))
+
+    def __getitem__(self, key):
+        try:
+            pos = self.position(key)
+        except (KeyError, TypeError, ValueError):
+            raise KeyError(key) from None
+
+        if len(pos) != self.array.ndim or (self.present is not None and not self.present[pos]):
+            raise KeyError(key)
+
+        v = self.array[pos]
+        return v.item() if isinstance(v, np.generic) else v
+
+    def __iter__(self):
+        keys = self.axes[0] if len(self.axes) == 1 else itertools.product(*self.axes)
+
+        if self.present is None:
+            return iter(keys)
+        return itertools.compress(keys, self.present.ravel())
+
+    def __len__(self):
+        return self.array.size if self.present is None else int(self.present.sum())
+
+
+
+def table_to_array(df, keys, value):
+    """
+    Converts a parameter table into a ParamArray. The axis labels are the distinct values of
+    each index column in order of appearance, and entries missing from the table are not part
+    of the parameter.
+
+    Parameters:
+        df (DataFrame): Table read from the case folder
+        keys (str or list): Index column (e.g. 'k') or index columns (e.g. ['i','t','n','b'])
+        value (str): Column holding the parameter value
+
+    Returns:
+        ParamArray: {index: value} or {(index_1, ..., index_n): value}
+    """
+
+    keys = [keys] if isinstance(keys, str) else keys
+
+    codes, axes = [], []
+    for c in keys:
+        c_codes, labels = pd.factorize(df[c])
+        codes.append(c_codes)
+        axes.append(labels.tolist())
+
+    shape = tuple(len(labels) for labels in axes)
+    column = df[value].to_numpy()
+
+    values = np.zeros(shape, dtype=column.dtype)
+    values[tuple(codes)] = column
+
+    present = np.zeros(shape, dtype=bool)
+    present[tuple(codes)] = True
+
+    return ParamArray(values, axes, None if present.all() else present)
+
+
+
+def table_labels(df, column):
+    """
+    Returns the distinct values of a column, in order of appearance (e.g. the nodes of demand.csv).
+    """
+
+    return pd.unique(df[column].dropna()).tolist()
+
+
+
+def table_to_lists(df, key, value):
+    """
+    Groups a two-column table into {key: [values]}, dropping empty values (e.g. node_npn_gen.csv).
+    """
+
+    d = {k: [] for k in pd.unique(df[key]).tolist()}
+
+    df = df.dropna(subset=[value])
+    for k, v in zip(df[key].tolist(), df[value].tolist()):
+        d[k].append(v)
+
+    return d
+
+
+
+def read_failures(tables, name, keys, group, value):
+    """
+    Reads a state or scenario indicator table as failure lists.
+
+    Only the failed components are kept, so the size of the result grows with the number of
+    outages instead of components x states. When the case folder has the sparse file of the
+    table (e.g. state_failures_gen.csv for state_indicator_gen.csv, listing only the failed
+    components), it is read instead of the dense 0/1 table.
+
+    Parameters:
+        tables (CaseTables): Tables of the case folder
+        name (str): Dense indicator table (e.g. 'state_indicator_gen')
+        keys (str or list): Component column (e.g. 'l') or columns (e.g. ['i','k'])
+        group (str): State or scenario column ('st' or 'sc')
+        value (str): Indicator column of the dense table (0 = failed, 1 = available)
+
+    Returns:
+        dict: {state: [failed component]}, states without failures are left out.
+    """
+
+    sparse_name = name.replace('indicator', 'failures')
+    columns = [keys] if isinstance(keys, str) else keys
+
+    if os.path.exists(os.path.join(tables.curPath, f'{sparse_name}.csv')):
+        df = tables[sparse_name]
+        labels = [df[c].tolist() for c in columns + [group]]
+
+    elif tables.cache and os.path.getsize(os.path.join(tables.curPath, f'{name}.csv')) >= CACHE_MIN_BYTES:
+        # Large tables are read from the memory-mapped tensor, without building a DataFrame
+        indicator = tables.tensor(name, columns + [group], value)
+        positions = _failed_positions(indicator.array)
+        labels = [np.array(axis, dtype=object)[p].tolist() for axis, p in zip(indicator.axes, positions)]
+
+    else:
+        df = tables[name]
+        df = df[pd.to_numeric(df[value], errors='coerce') == 0]    # Other values are reported by validate_data
+        labels = [df[c].tolist() for c in columns + [group]]
+
+    components = labels[0] if isinstance(keys, str) else list(zip(*labels[:-1]))
+
+    failures = {}
+    for st, c in zip(labels[-1], components):
+        failures.setdefault(st, []).append(c)
+
+    return failures
+
+
+
+def failures_to_indicator(failures):
+    """
+    Converts failure lists into the initial values of an indicator Param declared with default=1,
+    i.e. {(component, state): 0} for the failed components only.
+    """
+
+    return {(*c, st) if isinstance(c, tuple) else (c, st): 0 for st, components in failures.items() for c in components}
+
+
+
+def failures_by_component(failures):
+    """
+    Inverts failure lists {state: [component]} into {component: {states it failed in}}, so the
+    states a component is available in can be found without a lookup per (component, state).
+    """
+
+    failed = {}
+    for st, components in failures.items():
+        for c in components:
+            failed.setdefault(c, set()).add(st)
+    return failed
+
+
+
+def write_failure_table(curPath, name, group, value):
+    """
+    Writes the sparse file of a dense indicator table of a case folder, e.g.
+    write_failure_table(curPath, 'state_indicator_gen', 'st', 'state_gen') writes state_failures_gen.csv.
+    """
+
+    df = pd.read_csv(os.path.join(curPath, f'{name}.csv'), header=0)
+    df = df[df[value].astype(float) == 0].drop(columns=value)
+
+    keys = [c for c in df.columns if c != group]
+    df[keys + [group]].to_csv(os.path.join(curPath, f"{name.replace('indicator', 'failures')}.csv"), index=False)
+
+
+
+# Index sets of the parameters, as declared in the model builders
+PARAM_INDEX = {
+    'weight_time': ['rpdn'], 'operation_time': ['sub'],
+    'min_ins_cap': ['gen_pn'], 'max_ins_cap': ['gen_pn'], 'min_line': ['line_pn'], 'max_line': ['line_pn'],
+    'load_demand': ['node','year','rpdn','sub'], 'capacity_factor': ['node','year','rpdn','sub'],
+    'min_opt_dpt': ['dispatch_gen'], 'max_opt_dpt': ['dispatch_gen'], 'ramp_up': ['dispatch_gen'], 'ramp_down': ['dispatch_gen'],
+    'res_target': ['year'], 'pre_cap': ['node','gen_ex'], 'pre_cap_line': ['line_ex'],
+    'unit_IC': ['gen_pn','year'], 'unit_IC_line': ['line_pn','year'], 'unit_FC': ['generator','year'],
+    'unit_FC_line': ['line','year'], 'unit_VC': ['generator','year'], 'unit_VC_line': ['line','year'],
+    'min_ins_cap_backup': ['dis_pn'], 'max_ins_cap_backup': ['dis_pn'], 'unit_IC_backup': ['dis_pn','year'],
+    'unit_FC_backup': ['dis_pn','year'], 'unit_VC_backup': ['dis_pn','year'],
+    'prob': ['state'], 'scenario_rate': ['scenario'],
+}
+
+# Index sets of the failure lists (components, state or scenario) and of the dense indicator tables
+FAILURE_INDEX = {
+    'state_failed_gen': (['node','dis_pn'], 'state'),
+    'state_failed_line': (['line'], 'state'),
+    'state_failed_backup': (['node','dis_pn'], 'state'),
+    'scenario_failed_gen': (['node','dis_pn','year','rpdn'], 'scenario'),
+    'scenario_failed_line': (['line','year','rpdn'], 'scenario'),
+}
+INDICATOR_INDEX = {
+    'state_indicator_gen': ['node','dis_pn','state'],
+    'state_indicator_line': ['line','state'],
+    'state_indicator_backup': ['node','dis_pn','state'],
+    'scenario_indicator_gen': ['node','dis_pn','year','rpdn','scenario'],
+    'scenario_indicator_line': ['line','year','rpdn','scenario'],
+}
+
+# Largest accepted deviation of the sum of the state probabilities from 1
+PROB_TOLERANCE = 1e-3
+
+
+def validate_data(d, tables=None):
+    """
+    Checks the data of a case right after loading, so broken inputs fail before a model is
+    built. Every parameter must cover exactly the index grid the model declares it on, with
+    non-negative values; the failure lists and dense indicator tables must only refer to
+    existing components, states and scenarios; the state probabilities must sum to 1; and
+    line_to_node and line_fr_node must only refer to existing nodes and lines, each line at
+    no more than one node.
+
+    Parameters:
+        d (dict): Data returned by read_data or read_prod_data
+        tables (CaseTables): Tables the data was read from, to check the dense indicator tables
+
+    Raises:
+        ValueError: Listing every problem found.
+    """
+
+    problems = []
+
+    for key, sets in PARAM_INDEX.items():
+        if isinstance(d.get(key), ParamArray):
+            _check_param(problems, key, d[key], [(s, d[s]) for s in sets])
+
+    for key, (sets, group) in FAILURE_INDEX.items():
+        if key in d:
+            _check_failures(problems, key, d[key], [d[s] for s in sets], d[group])
+
+    if tables is not None:
+        for name, indicator in list(tables.items()) + list(tables.tensors.items()):
+            prefix = next((p for p in INDICATOR_INDEX if name.startswith(p)), None)
+            if prefix is not None and all(s in d for s in INDICATOR_INDEX[prefix]):
+                _check_indicator(problems, name, indicator, [(s, d[s]) for s in INDICATOR_INDEX[prefix]])
+
+    if isinstance(d.get('prob'), ParamArray) and abs(d['prob'].array.sum() - 1) > PROB_TOLERANCE:
+        problems.append(f"prob: state probabilities sum to {d['prob'].array.sum():.6f} instead of 1")
+
+    _check_line_maps(problems, d)
+
+    if problems:
+        raise ValueError("Invalid case data:\n  " + "\n  ".join(problems))
+
+
+
+def _check_param(problems, name, p, sets):
+    if any(len(labels) == 0 for _, labels in sets):
+        if len(p) > 0:
+            problems.append(f"{name}: has entries, but its index ({', '.join(s for s, _ in sets)}) is empty")
+        return
+
+    for axis, (s, labels) in zip(p.axes, sets):
+        missing = set(labels) - set(axis)
+        unknown = set(axis) - set(labels)
+        if missing:
+            problems.append(f"{name}: no entries for {s} {sorted(missing, key=str)[:5]}")
+        if unknown:
+            problems.append(f"{name}: entries for unknown {s} {sorted(unknown, key=str)[:5]}")
+        if missing or unknown:
+            return
+
+    if p.present is not None and not p.present.all():
+        problems.append(f"{name}: {int((~p.present).sum())} missing entries, e.g. {_first_missing(p)}")
+
+    array = p.array if p.present is None else p.array[p.present]
+    if array.dtype.kind not in 'biuf':
+        problems.append(f"{name}: non-numeric values")
+    elif np.isnan(array).any() or (array < 0).any():
+        problems.append(f"{name}: {int((np.isnan(array) | (array < 0)).sum())} missing or negative values")
+
+
+def _first_missing(p):
+    pos = tuple(int(i[0]) for i in np.nonzero(~p.present))
+    key = tuple(axis[i] for axis, i in zip(p.axes, pos))
+    return key[0] if len(key) == 1 else key
+
+
+def _check_failures(problems, name, failures, sets, groups):
+    unknown_groups = set(failures) - set(groups)
+    if unknown_groups:
+        problems.append(f"{name}: unknown states/scenarios {sorted(unknown_groups, key=str)[:5]}")
+
+    components = set().union(*failures.values()) if failures else set()
+    grid = set(sets[0]) if len(sets) == 1 else set(itertools.product(*sets))
+    unknown = components - grid
+    if unknown:
+        problems.append(f"{name}: unknown components {sorted(unknown, key=str)[:5]}")
+
+
+def _check_indicator(problems, name, indicator, sets):
+    if isinstance(indicator, ParamArray):
+        # Memory-mapped tensor, a cell written twice or never written is rejected when it is built
+        axes = indicator.axes
+    else:
+        keys = list(indicator.columns[:len(sets)])
+        axes = [pd.unique(indicator[c]).tolist() for c in keys]
+        if len(indicator) != np.prod([len(labels) for _, labels in sets]) or indicator.duplicated(subset=keys).any():
+            problems.append(f"{name}.csv: missing or duplicate rows (expected one row per {', '.join(s for s, _ in sets)})")
+        if not pd.to_numeric(indicator[indicator.columns[len(sets)]], errors='coerce').isin([0, 1]).all():
+            problems.append(f"{name}.csv: indicator values other than 0 and 1")
+
+    for axis, (s, labels) in zip(axes, sets):
+        if set(axis) != set(labels):
+            problems.append(f"{name}.csv: {s} labels do not match the case "
+                            f"(missing {sorted(set(labels) - set(axis), key=str)[:5]}, unknown {sorted(set(axis) - set(labels), key=str)[:5]})")
+
+
+def _check_line_maps(problems, d):
+    if 'line_to_node' not in d:
+        return
+
+    for key in ['line_to_node', 'line_fr_node']:
+        unknown_nodes = set(d[key]) - set(d['node'])
+        if unknown_nodes:
+            problems.append(f"{key}: unknown nodes {sorted(unknown_nodes, key=str)[:5]}")
+
+        counts = Counter(l for lines in d[key].values() for l in lines)
+        unknown = set(counts) - set(d['line'])
+        unconnected = set(d['line']) - set(counts)
+        repeated = [l for l, c in counts.items() if c > 1]
+        if unknown:
+            problems.append(f"{key}: unknown lines {sorted(unknown, key=str)[:5]}")
+        if unconnected:
+            # Every line has one node on each end, the flow balance and the adequacy cuts rely on it
+            problems.append(f"{key}: lines connected to no node {sorted(unconnected, key=str)[:5]}")
+        if repeated:
+            problems.append(f"{key}: lines connected to more than one node {sorted(repeated, key=str)[:5]}")
+
+    unknown_gens = set(k for gens in d['node_npn_gen'].values() for k in gens) - set(d['gen_pn'])
+    if unknown_gens:
+        problems.append(f"node_npn_gen: unknown generators {sorted(unknown_gens, key=str)[:5]}")
+
+
+
+# CSV files (without extension) read by every formulation
+COMMON_FILES = ['node_line_map', 'node_npn_gen', 'weight', 'operation_time', 'min_cap_gen', 'max_cap_gen',
+                'min_cap_line', 'max_cap_line', 'demand', 'capacity_factor', 'min_opt_gen', 'max_opt_gen',
+                'ramp_up', 'ramp_down', 'res_target', 'pre_cap_gen', 'pre_cap_line', 'ic_gen', 'ic_line',
+                'fc_gen', 'fc_line', 'vc_gen', 'vc_line']
+
+# Backup generators only exist in the probabilistic formulations
+BACKUP_FILES = ['min_cap_backup', 'max_cap_backup', 'ic_backup', 'fc_backup']
+
+# State tables of the probabilistic formulations, each indicator table with its sparse (failures) file
+STATE_FILES = ['prob', 'state_indicator_gen', 'state_failures_gen', 'state_indicator_line', 'state_failures_line']
+
+# Data manifest: CSV files each reliability formulation depends on ('prod' is the lower-level model)
+DATA_FILES = {
+    'no': COMMON_FILES,
+    'reserve': COMMON_FILES,
+    'n-1': COMMON_FILES + ['scenario_rate_n1', 'scenario_indicator_gen_n1', 'scenario_failures_gen_n1',
+                           'scenario_indicator_line_n1', 'scenario_failures_line_n1'],
+    'n-2': COMMON_FILES + ['scenario_rate_n2', 'scenario_indicator_gen_n2', 'scenario_failures_gen_n2',
+                           'scenario_indicator_line_n2', 'scenario_failures_line_n2'],
+    'dual-no': COMMON_FILES + BACKUP_FILES + STATE_FILES + ['state_indicator_backup_nodual', 'state_failures_backup_nodual'],
+    'dual-yes': COMMON_FILES + BACKUP_FILES + STATE_FILES + ['state_indicator_backup_dual', 'state_failures_backup_dual'],
+    'prod': COMMON_FILES + BACKUP_FILES + STATE_FILES + ['state_indicator_backup_nodual', 'state_failures_backup_nodual'],
+}
+
+
+
+class CaseTables(dict):
+    """
+    Tables of a case folder, read from CSV on first access.
+
+    Only the files listed in the data manifest of the selected formulation can be read, so
+    a formulation never pays for tables it does not use (e.g. the n-2 scenario tables).
+
+    Parameters:
+        curPath (str): Path of the case folder
+        advanced (str or list): Type(s) of reliability modelings -> 'no', 'reserve', 'n-1', 'n-2', 'dual-no', 'dual-yes', 'prod'
+        cache (bool): Whether the binary table cache of the case folder is used
+    """
+
+    def __init__(self, curPath, advanced, cache=True):
+        formulations = [advanced] if isinstance(advanced, str) else advanced
+        for a in formulations:
+            if a not in DATA_FILES:
+                raise ValueError(f"Unknown reliability formulation '{a}', expected one of {list(DATA_FILES)}")
+
+        super().__init__()
+        self.curPath = curPath
+        self.files = set().union(*[DATA_FILES[a] for a in formulations])
+        self.cache = cache
+        self.tensors = {}
+
+    def __missing__(self, name):
+        if name not in self.files:
+            raise KeyError(f"'{name}.csv' is not in the data manifest of the selected formulations")
+
+        if self.cache:
+            df = read_cached_table(self.curPath, name)
+        else:
+            df = pd.read_csv(os.path.join(self.curPath, f'{name}.csv'), header=0)
+
+        self[name] = df
+        return df
+
+    def tensor(self, name, keys, value):
+        """
+        Reads a 0/1 indicator table as a ParamArray over a memory-mapped uint8 tensor, with
+        one axis per column of keys (see read_indicator_tensor).
+        """
+
+        if name not in self.files:
+            raise KeyError(f"'{name}.csv' is not in the data manifest of the selected formulations")
+
+        if name not in self.tensors:
+            self.tensors[name] = read_indicator_tensor(self.curPath, name, keys, value)
+        return self.tensors[name]
+
+
+
+# Folder (inside each case folder) holding the binary copies of the CSV tables
+CACHE_FOLDER = '.cache'
+
+# Smaller CSV files are parsed faster than a cache entry is opened, so they are not cached
+CACHE_MIN_BYTES = 64 * 1024
+
+# Rows per chunk when an indicator table is streamed from CSV, this bounds the memory of the ingestion
+CHUNK_ROWS = 500_000
+# Fill value of the indicator tensor cells no row has written yet
+UNWRITTEN = 255
+
+
+def read_cached_table(curPath, name):
+    """
+    Reads a table of a case folder through the binary cache.
+
+    Each table is stored as an .npz file named after the hash of the CSV content, so a
+    changed CSV gets a new cache entry and the old one is removed. Cache files are written
+    to a temporary file and moved into place, so concurrent runs sharing a case folder
+    never see a partially written entry.
+
+    Parameters:
+        curPath (str): Path of the case folder
+        name (str): Table name (CSV file without extension)
+
+    Returns:
+        DataFrame: The table, identical to pd.read_csv of the CSV file.
+    """
+
+    csv_path = os.path.join(curPath, f'{name}.csv')
+    if os.path.getsize(csv_path) < CACHE_MIN_BYTES:
+        return pd.read_csv(csv_path, header=0)
+
+    key = _file_hash(csv_path)
+
+    cache_path = os.path.join(curPath, CACHE_FOLDER, f'{name}-{key}.npz')
+
+    if os.path.exists(cache_path):
+        try:
+            return _npz_to_table(cache_path)
+        except (OSError, ValueError, KeyError):
+            pass    # Unreadable entry, rebuilt below
+
+    df = pd.read_csv(csv_path, header=0)
+    _table_to_npz(df, cache_path)
+
+    # Remove the entries of previous versions of the CSV file
+    for old_path in glob.glob(os.path.join(curPath, CACHE_FOLDER, f'{glob.escape(name)}-*.npz')):
+        if old_path != cache_path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+    return df
+
+
+
+def _table_to_npz(df, cache_path):
+    arrays = {'__columns__': np.array(df.columns, dtype=str)}
+
+    for c in df.columns:
+        if df[c].dtype.kind in 'iu':
+            # Indices and indicators are stored in the smallest integer type that holds them
+            arrays[c] = pd.to_numeric(df[c], downcast='integer').to_numpy()
+        elif df[c].dtype.kind in 'bf':
+            arrays[c] = df[c].to_numpy()
+        else:
+            # Text columns are stored as codes into their distinct values (code -1 is a missing entry)
+            codes, uniques = pd.factorize(df[c])
+            arrays[c] = pd.to_numeric(pd.Series(codes), downcast='integer').to_numpy()
+            arrays[f'__text__{c}'] = np.array(uniques, dtype=str)
+
+    _write_atomic(cache_path, lambda f: np.savez(f, **arrays))
+
+
+
+def _write_atomic(path, write):
+    # Written to a temporary file and moved into place, readers never see a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+
+def _npz_to_table(cache_path):
+    with np.load(cache_path, allow_pickle=False) as f:
+        columns = f['__columns__'].tolist()
+        data = {}
+
+        for c in columns:
+            if f'__text__{c}' in f.files:
+                text = np.append(f[f'__text__{c}'].astype(object), np.nan)
+                data[c] = pd.Series(text[f[c]], dtype=object)
+            else:
+                data[c] = f[c].astype(np.int64) if f[c].dtype.kind in 'iu' else f[c]
+
+        df = pd.DataFrame(data, columns=columns)
+
+    return df
+
+
+
+def read_indicator_tensor(curPath, name, keys, value):
+    """
+    Reads a 0/1 indicator table of a case folder as a memory-mapped tensor.
+
+    The tensor is a uint8 .npy file in the cache folder, with the axes in the order of keys
+    (e.g. i, k, t, n, sc) and their labels in a .json file next to it. Both are named after
+    the hash of the CSV content like the table cache. The tensor is opened with mmap_mode='r',
+    so it costs almost no memory until it is read and concurrent runs on the same case share
+    its pages. A table with a missing or duplicate row for any cell of the tensor is rejected.
+
+    Parameters:
+        curPath (str): Path of the case folder
+        name (str): Indicator table (e.g. 'scenario_indicator_gen_n2')
+        keys (list): Index columns, in the axis order of the tensor
+        value (str): Indicator column
+
+    Returns:
+        ParamArray: The indicator, backed by the read-only memory map.
+    """
+
+    csv_path = os.path.join(curPath, f'{name}.csv')
+    key = _file_hash(csv_path)
+
+    tensor_path = os.path.join(curPath, CACHE_FOLDER, f'{name}-{key}.npy')
+    axes_path = os.path.join(curPath, CACHE_FOLDER, f'{name}-{key}.json')
+
+    if not os.path.exists(tensor_path):
+        # First pass: axis labels, in order of appearance, and the indicator values are checked
+        labels = [{} for _ in keys]
+        rows = 0
+        for chunk in pd.read_csv(csv_path, header=0, usecols=keys + [value], chunksize=CHUNK_ROWS):
+            rows += len(chunk)
+            if not pd.to_numeric(chunk[value], errors='coerce').isin([0, 1]).all():
+                raise ValueError(f"'{name}.csv' has indicator values other than 0 and 1 in column '{value}'")
+            for c, c_labels in zip(keys, labels):
+                for label in pd.unique(chunk[c]).tolist():
+                    c_labels.setdefault(label, len(c_labels))
+
+        axes = [list(c_labels) for c_labels in labels]
+        error = f"'{name}.csv' has missing or duplicate rows (expected one row per {', '.join(keys)})"
+        if rows != np.prod([len(axis) for axis in axes]):
+            raise ValueError(error)
+
+        # Second pass: each chunk is written straight into the tensor file, never held in memory as a whole.
+        # Cells start at UNWRITTEN, so a cell written twice or never written is caught even if the row count matches
+        os.makedirs(os.path.dirname(tensor_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(tensor_path), suffix='.tmp')
+        os.close(fd)
+        try:
+            tensor = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8, shape=tuple(len(axis) for axis in axes))
+            tensor[...] = UNWRITTEN
+            flat = tensor.reshape(-1)
+            index = [pd.Index(axis) for axis in axes]
+            for chunk in pd.read_csv(csv_path, header=0, usecols=keys + [value], chunksize=CHUNK_ROWS):
+                codes = tuple(c_index.get_indexer(chunk[c]) for c, c_index in zip(keys, index))
+                cells = np.ravel_multi_index(codes, tensor.shape)
+                if len(np.unique(cells)) != len(cells) or (flat[cells] != UNWRITTEN).any():
+                    raise ValueError(error)
+                flat[cells] = chunk[value].to_numpy(dtype=np.uint8)
+            if any((flat[start:start + CHUNK_ROWS] == UNWRITTEN).any() for start in range(0, flat.size, CHUNK_ROWS)):
+                raise ValueError(error)
+            tensor.flush()
+            del flat
+            del tensor
+
+            # The labels are only written once the table is known to be complete, and before the tensor appears
+            _write_atomic(axes_path, lambda f: f.write(json.dumps(axes).encode()))
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, tensor_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        # Remove the entries of previous versions of the CSV file
+        for ext in ['npy', 'json']:
+            for old_path in glob.glob(os.path.join(curPath, CACHE_FOLDER, f'{glob.escape(name)}-*.{ext}')):
+                if old_path not in [tensor_path, axes_path]:
+                    try:
+                        os.remove(old_path)
+                    except OSError:
+                        pass
+
+    with open(axes_path) as f:
+        axes = json.load(f)
+
+    return ParamArray(np.load(tensor_path, mmap_mode='r'), axes)
+
+
+
+def _failed_positions(tensor):
+    # np.nonzero(tensor == 0), over blocks of the first axis so no full-size mask is built
+    step = max(1, CHUNK_ROWS // max(1, tensor[0].size))
+
+    blocks = []
+    for start in range(0, tensor.shape[0], step):
+        positions = np.nonzero(tensor[start:start + step] == 0)
+        blocks.append((positions[0] + start,) + positions[1:])
+
+    return tuple(np.concatenate(axis) for axis in zip(*blocks)) if blocks else tuple(np.array([], dtype=int) for _ in tensor.shape)
+
+
+
+def _file_hash(path):
+    h = hashlib.blake2b(digest_size=10)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
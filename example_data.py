@@ -1,396 +1,239 @@
 import os
-import pandas as pd
+from data_utilities import table_to_array, table_labels, table_to_lists, read_failures, validate_data, CaseTables
 
-def read_data(datafolder, advanced):
+
+def read_data(datafolder, advanced, tables=None):
     curPath = os.path.join(os.path.abspath(os.path.curdir), 'data2', datafolder)
 
-    # Read CSV files after defining file paths
-    capacity_factor = pd.read_csv(os.path.join(curPath, 'capacity_factor.csv'), header=0)
-    demand = pd.read_csv(os.path.join(curPath, 'demand.csv'), header=0)
-    fc_backup = pd.read_csv(os.path.join(curPath, 'fc_backup.csv'), header=0)
-    fc_gen = pd.read_csv(os.path.join(curPath, 'fc_gen.csv'), header=0)
-    ic_backup = pd.read_csv(os.path.join(curPath, 'ic_backup.csv'), header=0)
-    fc_line = pd.read_csv(os.path.join(curPath, 'fc_line.csv'), header=0)
-    ic_gen = pd.read_csv(os.path.join(curPath, 'ic_gen.csv'), header=0)
-    ic_line = pd.read_csv(os.path.join(curPath, 'ic_line.csv'), header=0)
-    vc_gen = pd.read_csv(os.path.join(curPath, 'vc_gen.csv'), header=0)
-    vc_line = pd.read_csv(os.path.join(curPath, 'vc_line.csv'), header=0)
-    max_cap_backup = pd.read_csv(os.path.join(curPath, 'max_cap_backup.csv'), header=0)
-    max_cap_gen = pd.read_csv(os.path.join(curPath, 'max_cap_gen.csv'), header=0)
-    max_cap_line = pd.read_csv(os.path.join(curPath, 'max_cap_line.csv'), header=0)
-    min_cap_backup = pd.read_csv(os.path.join(curPath, 'min_cap_backup.csv'), header=0)
-    min_cap_gen = pd.read_csv(os.path.join(curPath, 'min_cap_gen.csv'), header=0)
-    min_cap_line = pd.read_csv(os.path.join(curPath, 'min_cap_line.csv'), header=0)
-    max_opt_gen = pd.read_csv(os.path.join(curPath, 'max_opt_gen.csv'), header=0)
-    min_opt_gen = pd.read_csv(os.path.join(curPath, 'min_opt_gen.csv'), header=0)
-    weight = pd.read_csv(os.path.join(curPath, 'weight.csv'), header=0)
-    operation_time = pd.read_csv(os.path.join(curPath, 'operation_time.csv'), header=0)
-    pre_cap_line = pd.read_csv(os.path.join(curPath, 'pre_cap_line.csv'), header=0)
-    pre_cap_gen = pd.read_csv(os.path.join(curPath, 'pre_cap_gen.csv'), header=0)
-    prob = pd.read_csv(os.path.join(curPath, 'prob.csv'), header=0)
-    ramp_down = pd.read_csv(os.path.join(curPath, 'ramp_down.csv'), header=0)
-    ramp_up = pd.read_csv(os.path.join(curPath, 'ramp_up.csv'), header=0)
-    res_target = pd.read_csv(os.path.join(curPath, 'res_target.csv'), header=0)   
-    scenario_indicator_gen_n1 = pd.read_csv(os.path.join(curPath, 'scenario_indicator_gen_n1.csv'), header=0)
-    scenario_indicator_gen_n2 = pd.read_csv(os.path.join(curPath, 'scenario_indicator_gen_n2.csv'), header=0)
-    scenario_indicator_line_n1 = pd.read_csv(os.path.join(curPath, 'scenario_indicator_line_n1.csv'), header=0)
-    scenario_indicator_line_n2 = pd.read_csv(os.path.join(curPath, 'scenario_indicator_line_n2.csv'), header=0)
-    scenario_rate_n1 = pd.read_csv(os.path.join(curPath, 'scenario_rate_n1.csv'), header=0)
-    scenario_rate_n2 = pd.read_csv(os.path.join(curPath, 'scenario_rate_n2.csv'), header=0)
-    state_indicator_gen = pd.read_csv(os.path.join(curPath, 'state_indicator_gen.csv'), header=0)
-    state_indicator_backup_dual = pd.read_csv(os.path.join(curPath, 'state_indicator_backup_dual.csv'), header=0)
-    state_indicator_backup_nodual = pd.read_csv(os.path.join(curPath, 'state_indicator_backup_nodual.csv'), header=0)
-    state_indicator_line = pd.read_csv(os.path.join(curPath, 'state_indicator_line.csv'), header=0)
-    
+    # CSV files are read lazily, only the ones listed in the data manifest of the formulation
+    if tables is None:
+        tables = CaseTables(curPath, advanced)
+
 
     d = {}
-    
-    if datafolder == "Illustrative":
-        d['ND'] = 3     # Number of nodes
-        d['LN'] = 3     # Number of lines
-        d['TN'] = 3     # Number of planning periods 
-        d['NN'] = 4     # Number of representative days (4 average demand from each seaseon)
-        d['BN'] = 24    # Number of subperiods
-
-        if advanced == 'n-1':
-            d['SC'] = 36   # Number of scenarios
-            d['scenario'] = list(range(0,d['SC']+1))
-
-            d['scenario_indicator_gen'] = {(row['i'], row['k'], row['t'], row['n'], row['sc']): 
-                                        row['sc_gen'] for _, row in scenario_indicator_gen_n1.iterrows()}   
-            d['scenario_rate'] = {row['sc']: row['sc_rate'] for _, row in scenario_rate_n1.iterrows()}
-            d['scenario_indicator_line'] = {(row['l'], row['t'], row['n'], row['sc']): 
-                                        row['sc_line'] for _, row in scenario_indicator_line_n1.iterrows()}   
-            
-
-        elif advanced == 'n-2':
-            d['SC'] = 36   # Number of scenarios
-            d['scenario'] = list(range(0,d['SC']+1))
-
-            d['scenario_indicator_gen'] = {(row['i'], row['k'], row['t'], row['n'], row['sc']): 
-                                        row['sc_gen'] for _, row in scenario_indicator_gen_n2.iterrows()}   
-            d['scenario_rate'] = {row['sc']: row['sc_rate'] for _, row in scenario_rate_n2.iterrows()}
-            d['scenario_indicator_line'] = {(row['l'], row['t'], row['n'], row['sc']): 
-                                        row['sc_line'] for _, row in scenario_indicator_line_n2.iterrows()}   
-            
-
-        elif advanced == 'dual-no':
-            d['ST'] = 8    # Number of states        
-            d['state'] = list(range(1,d['ST']+1))
-
-            d['prob'] = {row['st']: row['prob'] for _, row in prob.iterrows()}  
-            d['state_indicator_gen'] = {(row['i'], row['k'], row['st']): row['state_gen'] for _, row in state_indicator_gen.iterrows()}  
-            d['state_indicator_line'] = {(row['l'], row['st']): row['state_line'] for _, row in state_indicator_line.iterrows()}  
-            d['state_indicator_backup'] = {(row['i'], row['k'], row['st']): row['state_backup'] for _, row in state_indicator_backup_nodual.iterrows()}  
-
-        elif advanced == 'dual-yes':
-            d['ST'] = 8    # Number of states        
-            d['state'] = list(range(1,d['ST']+1))
-
-            d['prob'] = {row['st']: row['prob'] for _, row in prob.iterrows()}  
-            d['state_indicator_gen'] = {(row['i'], row['k'], row['st']): row['state_gen'] for _, row in state_indicator_gen.iterrows()}  
-            d['state_indicator_line'] = {(row['l'], row['st']): row['state_line'] for _, row in state_indicator_line.iterrows()}  
-            d['state_indicator_backup'] = {(row['i'], row['k'], row['st']): row['state_backup'] for _, row in state_indicator_backup_dual.iterrows()} 
-
-
-        # SETS
-        d['node'] = list(range(1,d['ND']+1))
-        d['generator'] = ['ng']
-        d['dispatch_gen'] = ['ng']
-        d['renewable_gen'] = []
-        d['gen_pn'] = ['ng']
-        d['dis_pn'] = ['ng'] 
-        d['res_pn'] = [] 
-        d['gen_ex'] = []
-        d['line'] = list(range(1,d['LN']+1))
-        d['line_pn'] = list(range(1,d['LN']+1))
-        d['line_ex'] = []
-        d['year'] = list(range(1,d['TN']+1))
-        d['rpdn'] = list(range(1,d['NN']+1))
-        d['sub'] = list(range(1,d['BN']+1))
-            
-        # INDEXED SETS    
-        d['line_to_node'] = {1: [3], 2: [1,2], 3: []}
-        d['line_fr_node'] = {1: [1], 2: [], 3: [2,3]}
-        d['node_npn_gen'] = {1: [], 2: [], 3: []}    
-
-
-
-    else:
-        d['ND'] = 4     # Number of nodes
-        d['LN'] = 5     # Number of lines
-        d['TN'] = 5     # Number of planning periods (10-year planning, 5 interval)
-        d['NN'] = 4     # Number of representative days (4 average demand from each seaseon)
-        d['BN'] = 12    # Number of subperiods (24 hours, 12 interval)
-
-        if advanced == 'n-1':
-            d['SC'] = 80   # Number of scenarios
-            d['scenario'] = list(range(0,d['SC']+1))
-
-            d['scenario_indicator_gen'] = {(row['i'], row['k'], row['t'], row['n'], row['sc']): 
-                                        row['sc_gen'] for _, row in scenario_indicator_gen_n1.iterrows()}   
-            d['scenario_rate'] = {row['sc']: row['sc_rate'] for _, row in scenario_rate_n1.iterrows()}
-            d['scenario_indicator_line'] = {(row['l'], row['t'], row['n'], row['sc']): 
-                                        row['sc_line'] for _, row in scenario_indicator_line_n1.iterrows()}   
-            
-        elif advanced == 'n-2':
-            d['SC'] = 120   # Number of scenarios
-            d['scenario'] = list(range(0,d['SC']+1))
-
-            d['scenario_indicator_gen'] = {(row['i'], row['k'], row['t'], row['n'], row['sc']): 
-                                        row['sc_gen'] for _, row in scenario_indicator_gen_n2.iterrows()}   
-            d['scenario_rate'] = {row['sc']: row['sc_rate'] for _, row in scenario_rate_n2.iterrows()}
-            d['scenario_indicator_line'] = {(row['l'], row['t'], row['n'], row['sc']): 
-                                        row['sc_line'] for _, row in scenario_indicator_line_n2.iterrows()}   
-
-        elif advanced == 'dual-no':
-            d['ST'] = 16    # Number of states
-            d['state'] = list(range(1,d['ST']+1))
-
-            d['prob'] = {row['st']: row['prob'] for _, row in prob.iterrows()}  
-            d['state_indicator_gen'] = {(row['i'], row['k'], row['st']): row['state_gen'] for _, row in state_indicator_gen.iterrows()}  
-            d['state_indicator_line'] = {(row['l'], row['st']): row['state_line'] for _, row in state_indicator_line.iterrows()}  
-            d['state_indicator_backup'] = {(row['i'], row['k'], row['st']): row['state_backup'] for _, row in state_indicator_backup_nodual.iterrows()}  
-        
-        elif advanced == 'dual-yes':
-            d['ST'] = 16    # Number of states
-            d['state'] = list(range(1,d['ST']+1))
-
-            d['prob'] = {row['st']: row['prob'] for _, row in prob.iterrows()}  
-            d['state_indicator_gen'] = {(row['i'], row['k'], row['st']): row['state_gen'] for _, row in state_indicator_gen.iterrows()}  
-            d['state_indicator_line'] = {(row['l'], row['st']): row['state_line'] for _, row in state_indicator_line.iterrows()}  
-            d['state_indicator_backup'] = {(row['i'], row['k'], row['st']): row['state_backup'] for _, row in state_indicator_backup_dual.iterrows()}  
-
-
-        # SETS
-        d['node'] = list(range(1,d['ND']+1))
-        d['generator'] = ['ng1','ng2','ng3','ng-p','wt-p']
-        d['dispatch_gen'] = ['ng1','ng2','ng3','ng-p']
-        d['renewable_gen'] = ['wt-p']
-        d['gen_pn'] = ['ng-p','wt-p']
-        d['dis_pn'] = ['ng-p'] 
-        d['res_pn'] = ['wt-p'] 
-        d['gen_ex'] = ['ng1','ng2','ng3']
-        d['line'] = list(range(1,d['LN']+1))
-        d['line_pn'] = [2,3,4,5]
-        d['line_ex'] = [1]
-        d['year'] = list(range(1,d['TN']+1))
-        d['rpdn'] = list(range(1,d['NN']+1))
-        d['sub'] = list(range(1,d['BN']+1))
-            
-        # INDEXED SETS    
-        d['line_to_node'] = {1: [2,3], 2: [], 3: [], 4:[1,4,5]}
-        d['line_fr_node'] = {1: [1], 2: [2,4], 3: [3,5], 4:[]}
-        d['node_npn_gen'] = {1: [], 2: [], 3: [], 4: []}    
+
+    _read_sets(d, tables, advanced)
 
 
     # PARAMETERS
-    d['weight_time'] = {row['n']: row['weight'] for _, row in weight.iterrows()}
-    d['operation_time'] = {row['b']: row['opt_time'] for _, row in operation_time.iterrows()}
-    d['min_ins_cap'] = {row['k']: row['min_cap'] for _, row in min_cap_gen.iterrows()}
-    d['max_ins_cap'] = {row['k']: row['max_cap'] for _, row in max_cap_gen.iterrows()}
-    d['min_line'] = {row['l']: row['min_cap'] for _, row in min_cap_line.iterrows()}
-    d['max_line'] = {row['l']: row['max_cap'] for _, row in max_cap_line.iterrows()}
-    d['min_ins_cap_backup'] = {row['k']: row['min_cap'] for _, row in min_cap_backup.iterrows()}
-    d['max_ins_cap_backup'] = {row['k']: row['max_cap'] for _, row in max_cap_backup.iterrows()}  
-
-    d['load_demand'] = {(row['i'], row['t'], row['n'], row['b']): row['D'] for _, row in demand.iterrows()}   
-    d['capacity_factor'] = {(row['i'], row['t'], row['n'], row['b']): row['CPF'] for _, row in capacity_factor.iterrows()}
-    d['min_opt_dpt'] = {row['k']: row['min_opt'] for _, row in min_opt_gen.iterrows()}
-    d['max_opt_dpt'] = {row['k']: row['max_opt'] for _, row in max_opt_gen.iterrows()}
-    d['ramp_up'] = {row['k']: row['ramp_up'] for _, row in ramp_up.iterrows()}
-    d['ramp_down'] = {row['k']: row['ramp_down'] for _, row in ramp_down.iterrows()}
-    d['res_target'] = {row['t']: row['res_target'] for _, row in res_target.iterrows()}   
-    d['pre_cap'] = {(row['i'], row['k']): row['pre_cap'] for _, row in pre_cap_gen.iterrows()}   
-    d['pre_cap_line'] = {row['l']: row['pre_cap'] for _, row in pre_cap_line.iterrows()}  
-
-
-    d['unit_IC'] = {(row['k'], row['t']): row['ic_gen'] for _, row in ic_gen.iterrows()}                 # M$/MW
-    d['unit_IC_line'] = {(row['l'], row['t']): row['ic_line'] for _, row in ic_line.iterrows()}          # M$/MW
-    d['unit_IC_backup'] = {(row['k'], row['t']): row['ic_backup'] for _, row in ic_backup.iterrows()}    # M$/MW
-    d['unit_FC'] = {(row['k'], row['t']): row['fc_gen'] for _, row in fc_gen.iterrows()}                 # M$/MW                
-    d['unit_FC_line'] = {(row['l'], row['t']): row['fc_line'] for _, row in fc_line.iterrows()}          # M$/MW
-    d['unit_FC_backup'] = {(row['k'], row['t']): row['fc_backup'] for _, row in fc_backup.iterrows()}    # M$/MW 
-    d['unit_VC'] = {(row['k'], row['t']): row['vc_gen'] for _, row in vc_gen.iterrows()}         # $/MWh (including fuel cost)
-    d['unit_VC_line'] = {(row['l'], row['t']): row['vc_line'] for _, row in vc_line.iterrows()}  # $/MWh
+    _read_common_parameters(d, tables)
 
-    d['UD_penalty'] = 9
+    if advanced in ['n-1','n-2']:
+        _read_scenario_parameters(d, tables, advanced.replace('-', ''))
+
+    elif advanced == 'dual-no':
+        _read_state_parameters(d, tables, 'state_indicator_backup_nodual')
+
+    elif advanced == 'dual-yes':
+        _read_state_parameters(d, tables, 'state_indicator_backup_dual')
+
+
+    # Broken inputs fail here, before a model is built
+    validate_data(d, tables)
 
-    # Bounds
-    d['ub_IC'] = {}
-    for k in d['gen_pn']:
-        for t in d['year']:
-            d['ub_IC'][k,t] = d['max_ins_cap'][k] * d['unit_IC'][k,t]    
-    
-    d['ub_ICL'] = {}
-    for l in d['line_pn']:
-        for t in d['year']:
-            d['ub_ICL'][l,t] = d['max_line'][l] * d['unit_IC_line'][l,t]    
 
-    d['ub_IC_backup'] = {}
-    for k in d['dis_pn']:
-        for t in d['year']:
-            d['ub_IC_backup'][k,t] = d['max_ins_cap_backup'][k] * d['unit_IC_backup'][k,t]               
-    
-    
     return d
 
 
 
-def read_prod_data(datafolder):
+def read_prod_data(datafolder, tables=None):
     curPath = os.path.join(os.path.abspath(os.path.curdir), 'data2', datafolder)
 
-    # Read CSV files after defining file paths
-    capacity_factor = pd.read_csv(os.path.join(curPath, 'capacity_factor.csv'), header=0)
-    demand = pd.read_csv(os.path.join(curPath, 'demand.csv'), header=0)
-    fc_backup = pd.read_csv(os.path.join(curPath, 'fc_backup.csv'), header=0)
-    fc_gen = pd.read_csv(os.path.join(curPath, 'fc_gen.csv'), header=0)
-    ic_backup = pd.read_csv(os.path.join(curPath, 'ic_backup.csv'), header=0)
-    fc_line = pd.read_csv(os.path.join(curPath, 'fc_line.csv'), header=0)
-    ic_gen = pd.read_csv(os.path.join(curPath, 'ic_gen.csv'), header=0)
-    ic_line = pd.read_csv(os.path.join(curPath, 'ic_line.csv'), header=0)
-    vc_gen = pd.read_csv(os.path.join(curPath, 'vc_gen.csv'), header=0)
-    vc_line = pd.read_csv(os.path.join(curPath, 'vc_line.csv'), header=0)
-    max_cap_backup = pd.read_csv(os.path.join(curPath, 'max_cap_backup.csv'), header=0)
-    max_cap_gen = pd.read_csv(os.path.join(curPath, 'max_cap_gen.csv'), header=0)
-    max_cap_line = pd.read_csv(os.path.join(curPath, 'max_cap_line.csv'), header=0)
-    min_cap_backup = pd.read_csv(os.path.join(curPath, 'min_cap_backup.csv'), header=0)
-    min_cap_gen = pd.read_csv(os.path.join(curPath, 'min_cap_gen.csv'), header=0)
-    min_cap_line = pd.read_csv(os.path.join(curPath, 'min_cap_line.csv'), header=0)
-    max_opt_gen = pd.read_csv(os.path.join(curPath, 'max_opt_gen.csv'), header=0)
-    min_opt_gen = pd.read_csv(os.path.join(curPath, 'min_opt_gen.csv'), header=0)
-    weight = pd.read_csv(os.path.join(curPath, 'weight.csv'), header=0)
-    operation_time = pd.read_csv(os.path.join(curPath, 'operation_time.csv'), header=0)
-    pre_cap_line = pd.read_csv(os.path.join(curPath, 'pre_cap_line.csv'), header=0)
-    pre_cap_gen = pd.read_csv(os.path.join(curPath, 'pre_cap_gen.csv'), header=0)
-    prob = pd.read_csv(os.path.join(curPath, 'prob.csv'), header=0)
-    ramp_down = pd.read_csv(os.path.join(curPath, 'ramp_down.csv'), header=0)
-    ramp_up = pd.read_csv(os.path.join(curPath, 'ramp_up.csv'), header=0)
-    res_target = pd.read_csv(os.path.join(curPath, 'res_target.csv'), header=0)   
-    state_indicator_gen = pd.read_csv(os.path.join(curPath, 'state_indicator_gen.csv'), header=0)
-    state_indicator_backup_nodual = pd.read_csv(os.path.join(curPath, 'state_indicator_backup_nodual.csv'), header=0)
-    state_indicator_line = pd.read_csv(os.path.join(curPath, 'state_indicator_line.csv'), header=0)
-    
+    # CSV files are read lazily, only the ones listed in the data manifest of the formulation
+    if tables is None:
+        tables = CaseTables(curPath, 'prod')
+
 
     d = {}
-    
-    if datafolder == "Illustrative":
-        d['ND'] = 3     # Number of nodes
-        d['LN'] = 3     # Number of lines
-        d['TN'] = 3     # Number of planning periods 
-        d['NN'] = 4     # Number of representative days (4 average demand from each seaseon)
-        d['BN'] = 24    # Number of subperiods
-        d['ST'] = 8    # Number of states        
-
-
-        # SETS
-        d['node'] = list(range(1,d['ND']+1))
-        d['generator'] = ['ng']
-        d['dispatch_gen'] = ['ng']
-        d['renewable_gen'] = []
-        d['gen_pn'] = ['ng']
-        d['dis_pn'] = ['ng'] 
-        d['res_pn'] = [] 
-        d['gen_ex'] = []
-        d['line'] = list(range(1,d['LN']+1))
-        d['line_pn'] = list(range(1,d['LN']+1))
-        d['line_ex'] = []
-        d['year'] = list(range(1,d['TN']+1))
-        d['rpdn'] = list(range(1,d['NN']+1))
-        d['sub'] = list(range(1,d['BN']+1))
-        d['state'] = list(range(1,d['ST']+1))
-            
-        # INDEXED SETS    
-        d['line_to_node'] = {1: [3], 2: [1,2], 3: []}
-        d['line_fr_node'] = {1: [1], 2: [], 3: [2,3]}
-        d['node_npn_gen'] = {1: [], 2: [], 3: []}    
-
-
-
-    else:
-        d['ND'] = 4     # Number of nodes
-        d['LN'] = 5     # Number of lines
-        d['TN'] = 5     # Number of planning periods (10-year planning, 5 interval)
-        d['NN'] = 4     # Number of representative days (4 average demand from each seaseon)
-        d['BN'] = 12    # Number of subperiods (24 hours, 12 interval)
-        d['ST'] = 16    # Number of states
-        
-
-        # SETS
-        d['node'] = list(range(1,d['ND']+1))
-        d['generator'] = ['ng1','ng2','ng3','ng-p','wt-p']
-        d['dispatch_gen'] = ['ng1','ng2','ng3','ng-p']
-        d['renewable_gen'] = ['wt-p']
-        d['gen_pn'] = ['ng-p','wt-p']
-        d['dis_pn'] = ['ng-p'] 
-        d['res_pn'] = ['wt-p'] 
-        d['gen_ex'] = ['ng1','ng2','ng3']
-        d['line'] = list(range(1,d['LN']+1))
-        d['line_pn'] = [2,3,4,5]
-        d['line_ex'] = [1]
-        d['year'] = list(range(1,d['TN']+1))
-        d['rpdn'] = list(range(1,d['NN']+1))
-        d['sub'] = list(range(1,d['BN']+1))
-        d['state'] = list(range(1,d['ST']+1))
-            
-        # INDEXED SETS    
-        d['line_to_node'] = {1: [2,3], 2: [], 3: [], 4:[1,4,5]}
-        d['line_fr_node'] = {1: [1], 2: [2,4], 3: [3,5], 4:[]}
-        d['node_npn_gen'] = {1: [], 2: [], 3: [], 4: []}    
+
+    _read_sets(d, tables, 'prod')
 
 
     # PARAMETERS
-    d['weight_time'] = {row['n']: row['weight'] for _, row in weight.iterrows()}
-    d['operation_time'] = {row['b']: row['opt_time'] for _, row in operation_time.iterrows()}
-    d['min_ins_cap'] = {row['k']: row['min_cap'] for _, row in min_cap_gen.iterrows()}
-    d['max_ins_cap'] = {row['k']: row['max_cap'] for _, row in max_cap_gen.iterrows()}
-    d['min_line'] = {row['l']: row['min_cap'] for _, row in min_cap_line.iterrows()}
-    d['max_line'] = {row['l']: row['max_cap'] for _, row in max_cap_line.iterrows()}
-    d['min_ins_cap_backup'] = {row['k']: row['min_cap'] for _, row in min_cap_backup.iterrows()}
-    d['max_ins_cap_backup'] = {row['k']: row['max_cap'] for _, row in max_cap_backup.iterrows()}  
-
-    d['load_demand'] = {(row['i'], row['t'], row['n'], row['b']): row['D'] for _, row in demand.iterrows()}   
-    d['capacity_factor'] = {(row['i'], row['t'], row['n'], row['b']): row['CPF'] for _, row in capacity_factor.iterrows()}
-    d['min_opt_dpt'] = {row['k']: row['min_opt'] for _, row in min_opt_gen.iterrows()}
-    d['max_opt_dpt'] = {row['k']: row['max_opt'] for _, row in max_opt_gen.iterrows()}
-    d['ramp_up'] = {row['k']: row['ramp_up'] for _, row in ramp_up.iterrows()}
-    d['ramp_down'] = {row['k']: row['ramp_down'] for _, row in ramp_down.iterrows()}
-    d['res_target'] = {row['t']: row['res_target'] for _, row in res_target.iterrows()}   
-    d['pre_cap'] = {(row['i'], row['k']): row['pre_cap'] for _, row in pre_cap_gen.iterrows()}   
-    d['pre_cap_line'] = {row['l']: row['pre_cap'] for _, row in pre_cap_line.iterrows()}
-    d['prob'] = {row['st']: row['prob'] for _, row in prob.iterrows()}  
-    d['state_indicator_gen'] = {(row['i'], row['k'], row['st']): row['state_gen'] for _, row in state_indicator_gen.iterrows()}  
-    d['state_indicator_line'] = {(row['l'], row['st']): row['state_line'] for _, row in state_indicator_line.iterrows()}  
-    d['state_indicator_backup'] = {(row['i'], row['k'], row['st']): row['state_backup'] for _, row in state_indicator_backup_nodual.iterrows()}  
-  
-
-
-    d['unit_IC'] = {(row['k'], row['t']): row['ic_gen'] for _, row in ic_gen.iterrows()}                 # M$/MW
-    d['unit_IC_line'] = {(row['l'], row['t']): row['ic_line'] for _, row in ic_line.iterrows()}          # M$/MW
-    d['unit_IC_backup'] = {(row['k'], row['t']): row['ic_backup'] for _, row in ic_backup.iterrows()}    # M$/MW
-    d['unit_FC'] = {(row['k'], row['t']): row['fc_gen'] for _, row in fc_gen.iterrows()}                 # M$/MW                
-    d['unit_FC_line'] = {(row['l'], row['t']): row['fc_line'] for _, row in fc_line.iterrows()}          # M$/MW
-    d['unit_FC_backup'] = {(row['k'], row['t']): row['fc_backup'] for _, row in fc_backup.iterrows()}    # M$/MW 
-    d['unit_VC'] = {(row['k'], row['t']): row['vc_gen'] for _, row in vc_gen.iterrows()}         # $/MWh (including fuel cost)
-    d['unit_VC_line'] = {(row['l'], row['t']): row['vc_line'] for _, row in vc_line.iterrows()}  # $/MWh
+    _read_common_parameters(d, tables)
+    _read_state_parameters(d, tables, 'state_indicator_backup_nodual')
+
+
+    # Broken inputs fail here, before a model is built
+    validate_data(d, tables)
+
+
+    return d
+
+
+
+class CaseData:
+    """
+    Data of a case study for the two-level algorithm, loaded in a single pass.
+
+    The data of the upper-level model and of the lower-level (prod) model are read from one
+    set of tables, and the prod data shares the parameter dictionaries of the upper-level
+    data instead of converting the same tables again. Each is built on first use, so the
+    prod data is never read when the upper-level model is already probabilistic.
+
+    Parameters:
+        datafolder (str): Case folder in data2 -> e.g. 'Illustrative' or 'San Diego'
+        advanced (str): Type of reliability modelings -> 'no', 'reserve', 'n-1', 'n-2', 'dual-no', 'dual-yes'
+    """
+
+    def __init__(self, datafolder, advanced):
+        curPath = os.path.join(os.path.abspath(os.path.curdir), 'data2', datafolder)
+
+        self.datafolder = datafolder
+        self.advanced = advanced
+        self.tables = CaseTables(curPath, [advanced, 'prod'])
+        self._data = None
+        self._prod_data = None
+
+    def data(self):
+        if self._data is None:
+            self._data = read_data(self.datafolder, self.advanced, self.tables)
+        return self._data
+
+    def prod_data(self):
+        if self._prod_data is None:
+            # Shallow copy, the parameter dictionaries are not duplicated
+            d = {k: v for k, v in self.data().items() if k not in SCENARIO_KEYS}
+
+            # dual-no already holds the states of the prod model
+            if self.advanced != 'dual-no':
+                _read_sets(d, self.tables, 'prod')
+                _read_state_parameters(d, self.tables, 'state_indicator_backup_nodual')
+                validate_data(d, self.tables)
+
+            self._prod_data = d
+        return self._prod_data
+
+
+
+# Keys that only exist in the data of the n-k formulations
+SCENARIO_KEYS = ['SC', 'scenario', 'scenario_failed_gen', 'scenario_rate', 'scenario_failed_line']
+
+
+
+def _read_sets(d, tables, advanced):
+    # SETS (inferred from the tables of the case folder, in order of appearance)
+    d['node'] = table_labels(tables['demand'], 'i')
+    d['generator'] = table_labels(tables['fc_gen'], 'k')
+    d['dispatch_gen'] = table_labels(tables['min_opt_gen'], 'k')
+    d['renewable_gen'] = [k for k in d['generator'] if k not in d['dispatch_gen']]
+    d['gen_pn'] = table_labels(tables['ic_gen'], 'k')
+    d['dis_pn'] = [k for k in d['gen_pn'] if k in d['dispatch_gen']]
+    d['res_pn'] = [k for k in d['gen_pn'] if k in d['renewable_gen']]
+    d['gen_ex'] = [k for k in d['generator'] if k not in d['gen_pn']]
+    d['line'] = table_labels(tables['fc_line'], 'l')
+    d['line_pn'] = table_labels(tables['ic_line'], 'l')
+    d['line_ex'] = [l for l in d['line'] if l not in d['line_pn']]
+    d['year'] = table_labels(tables['res_target'], 't')
+    d['rpdn'] = table_labels(tables['weight'], 'n')
+    d['sub'] = table_labels(tables['operation_time'], 'b')
+
+
+    # DIMENSIONS
+    d['ND'] = len(d['node'])     # Number of nodes
+    d['LN'] = len(d['line'])     # Number of lines
+    d['TN'] = len(d['year'])     # Number of planning periods
+    d['NN'] = len(d['rpdn'])     # Number of representative days
+    d['BN'] = len(d['sub'])      # Number of subperiods
+
+    if advanced in ['n-1','n-2']:
+        d['SC'] = max(table_labels(tables[f"scenario_rate_{advanced.replace('-', '')}"], 'sc'))   # Number of scenarios (0 is the base case)
+
+    elif advanced in ['dual-no','dual-yes','prod']:
+        d['ST'] = len(table_labels(tables['prob'], 'st'))    # Number of states
+
+
+    # INDEXED SETS
+    line_map = tables['node_line_map'].dropna(subset=["line"]).astype({"line": int})
+
+    line_to_node = (
+        line_map[line_map["direction"] == "to"].groupby("node")["line"].apply(list).to_dict()
+    )
+
+    line_fr_node = (
+        line_map[line_map["direction"] == "fr"].groupby("node")["line"].apply(list).to_dict()
+    )
+
+    for n in d['node']:
+        line_to_node.setdefault(n, [])
+        line_fr_node.setdefault(n, [])
+
+    d['line_to_node'] = line_to_node
+    d['line_fr_node'] = line_fr_node
+
+    d['node_npn_gen'] = table_to_lists(tables['node_npn_gen'], 'node', 'gen')
+
+
+
+def _read_common_parameters(d, tables):
+    d['weight_time'] = table_to_array(tables['weight'], 'n', 'weight')
+    d['operation_time'] = table_to_array(tables['operation_time'], 'b', 'opt_time')
+    d['min_ins_cap'] = table_to_array(tables['min_cap_gen'], 'k', 'min_cap')
+    d['max_ins_cap'] = table_to_array(tables['max_cap_gen'], 'k', 'max_cap')
+    d['min_line'] = table_to_array(tables['min_cap_line'], 'l', 'min_cap')
+    d['max_line'] = table_to_array(tables['max_cap_line'], 'l', 'max_cap')
+
+    d['load_demand'] = table_to_array(tables['demand'], ['i','t','n','b'], 'D')
+    d['capacity_factor'] = table_to_array(tables['capacity_factor'], ['i','t','n','b'], 'CPF')
+    d['min_opt_dpt'] = table_to_array(tables['min_opt_gen'], 'k', 'min_opt')
+    d['max_opt_dpt'] = table_to_array(tables['max_opt_gen'], 'k', 'max_opt')
+    d['ramp_up'] = table_to_array(tables['ramp_up'], 'k', 'ramp_up')
+    d['ramp_down'] = table_to_array(tables['ramp_down'], 'k', 'ramp_down')
+    d['res_target'] = table_to_array(tables['res_target'], 't', 'res_target')
+    d['pre_cap'] = table_to_array(tables['pre_cap_gen'], ['i','k'], 'pre_cap')
+    d['pre_cap_line'] = table_to_array(tables['pre_cap_line'], 'l', 'pre_cap')
+
+    d['unit_IC'] = table_to_array(tables['ic_gen'], ['k','t'], 'ic_gen')                 # M$/MW
+    d['unit_IC_line'] = table_to_array(tables['ic_line'], ['l','t'], 'ic_line')          # M$/MW
+    d['unit_FC'] = table_to_array(tables['fc_gen'], ['k','t'], 'fc_gen')                 # M$/MW
+    d['unit_FC_line'] = table_to_array(tables['fc_line'], ['l','t'], 'fc_line')          # M$/MW
+    d['unit_VC'] = table_to_array(tables['vc_gen'], ['k','t'], 'vc_gen')         # $/MWh (including fuel cost)
+    d['unit_VC_line'] = table_to_array(tables['vc_line'], ['l','t'], 'vc_line')  # $/MWh
 
     d['UD_penalty'] = 9
+    d['reserve_ratio'] = 0.20    # Reserve capacity over demand
+    d['max_LOLE'] = 2.4          # h/year
 
     # Bounds
     d['ub_IC'] = {}
     for k in d['gen_pn']:
         for t in d['year']:
-            d['ub_IC'][k,t] = d['max_ins_cap'][k] * d['unit_IC'][k,t]    
-    
+            d['ub_IC'][k,t] = d['max_ins_cap'][k] * d['unit_IC'][k,t]
+
     d['ub_ICL'] = {}
     for l in d['line_pn']:
         for t in d['year']:
-            d['ub_ICL'][l,t] = d['max_line'][l] * d['unit_IC_line'][l,t]    
+            d['ub_ICL'][l,t] = d['max_line'][l] * d['unit_IC_line'][l,t]
+
+
+
+def _read_scenario_parameters(d, tables, n_k):
+    # n_k -> 'n1' or 'n2'
+    d['scenario'] = list(range(0,d['SC']+1))
+
+    d['scenario_failed_gen'] = read_failures(tables, f'scenario_indicator_gen_{n_k}', ['i','k','t','n'], 'sc', 'sc_gen')
+    d['scenario_rate'] = table_to_array(tables[f'scenario_rate_{n_k}'], 'sc', 'sc_rate')
+    d['scenario_failed_line'] = read_failures(tables, f'scenario_indicator_line_{n_k}', ['l','t','n'], 'sc', 'sc_line')
+
+
+
+def _read_state_parameters(d, tables, backup_table):
+    # backup_table -> 'state_indicator_backup_nodual' or 'state_indicator_backup_dual'
+    d['state'] = list(range(1,d['ST']+1))
+
+    d['prob'] = table_to_array(tables['prob'], 'st', 'prob')
+
+    # Failure lists {state: [failed component]}, every other component is available in the state
+    d['state_failed_gen'] = read_failures(tables, 'state_indicator_gen', ['i','k'], 'st', 'state_gen')
+    d['state_failed_line'] = read_failures(tables, 'state_indicator_line', 'l', 'st', 'state_line')
+    d['state_failed_backup'] = read_failures(tables, backup_table, ['i','k'], 'st', 'state_backup')
+
+    d['min_ins_cap_backup'] = table_to_array(tables['min_cap_backup'], 'k', 'min_cap')
+    d['max_ins_cap_backup'] = table_to_array(tables['max_cap_backup'], 'k', 'max_cap')
+    d['unit_IC_backup'] = table_to_array(tables['ic_backup'], ['k','t'], 'ic_backup')    # M$/MW
+    d['unit_FC_backup'] = table_to_array(tables['fc_backup'], ['k','t'], 'fc_backup')    # M$/MW
 
     d['ub_IC_backup'] = {}
     for k in d['dis_pn']:
         for t in d['year']:
-            d['ub_IC_backup'][k,t] = d['max_ins_cap_backup'][k] * d['unit_IC_backup'][k,t]               
-    
-    
-    return d
\ No newline at end of file
+            d['ub_IC_backup'][k,t] = d['max_ins_cap_backup'][k] * d['unit_IC_backup'][k,t]
@@ -1,12 +1,12 @@
-from example_data_large_scale import read_data, read_prod_data
-from large_scale_utilities import solve_model, solve_prob_model, export_results, export_results_congestion
+from example_data_large_scale import CaseData
+from large_scale_utilities import solve_model, solve_prob_model, export_results, export_results_congestion, model_statistics
 from large_scale_no_model import no_reliability_model
 from large_scale_reserve_model import reserve_reliability_model
 from large_scale_n_k_model import n_k_reliability_model
 from large_scale_prob_model import prob_reliability_model
 
 
-def solution_algorithm(datafolder, advanced, renewable, time_limit, abs_gap):
+def solution_algorithm(datafolder, advanced, renewable, time_limit, abs_gap, statistics=False, transformation='bigm', zones=None):
     """
     Solves the optimization problem using a two-level modeling approach.
     
@@ -16,32 +16,43 @@ def solution_algorithm(datafolder, advanced, renewable, time_limit, abs_gap):
         renewable (str): Whether the renewable constraint is included or not -> True or False
         time_limit (num): Computational time limit
         abs_gap (num): Optimality gap
+        statistics (bool): Print the size of each model (see model_statistics) before it is solved
+        transformation (str): GDP reformulation of both levels -> 'bigm', 'hull', 'mbigm', 'binary_multiplication'
+        zones: Loss of load indicated per node (None), for the whole system ('system') or per zone ({node: zone}) in the probabilistic models
     
     Returns:
         dict: A dictionary containing upper- and lower-level results.
     """
 
-    # Call the corresponding data
-    data = read_data(datafolder, advanced)
+    if statistics and transformation == 'binary_multiplication':
+        raise ValueError("statistics=True needs a linear model, gdp.binary_multiplication gives quadratic rows")
+
+    # Call the corresponding data (the tables are read once for both levels)
+    case_data = CaseData(datafolder, advanced)
+    data = case_data.data()
 
 
     # Call the upper models
     if advanced == 'no':
         print('Planning without reliability is selected...')
-        upper_model = no_reliability_model(data, renewable)
+        upper_model = no_reliability_model(data, renewable, transformation=transformation)
 
     elif advanced == 'reserve':
         print('Planning using reserve margin is selected...')
-        upper_model = reserve_reliability_model(data, renewable)
+        upper_model = reserve_reliability_model(data, renewable, transformation=transformation)
 
     elif advanced in ['n-1','n-2']:
         print('Planning using n-k reliability is selected...')
-        upper_model = n_k_reliability_model(data, renewable)
+        upper_model = n_k_reliability_model(data, renewable, transformation=transformation)
 
     else:
         print('Planning using the probability of failure is selected...')
-        upper_model = prob_reliability_model(data, renewable)    
+        upper_model = prob_reliability_model(data, renewable, transformation=transformation, zones=zones)    
+
 
+    if statistics:
+        print("Upper-level model statistics...")
+        model_statistics(upper_model)
 
     # Solve the models of interest and print the results 
     print("Solving upper-level model...")
@@ -98,8 +109,8 @@ def solution_algorithm(datafolder, advanced, renewable, time_limit, abs_gap):
         
         
         # Call data & probabilistic models
-        prob_data = read_prod_data(datafolder)
-        lower_model = prob_reliability_model(prob_data, renewable)
+        prob_data = case_data.prod_data()
+        lower_model = prob_reliability_model(prob_data, renewable, transformation=transformation, zones=zones)
 
         
         # Fix the investment results using the upper models' results
@@ -127,6 +138,10 @@ def solution_algorithm(datafolder, advanced, renewable, time_limit, abs_gap):
             lower_model.renewable_gen_power.deactivate()
 
         
+        if statistics:
+            print("Lower-level model statistics...")
+            model_statistics(lower_model)
+
         # Run the lower model (probabilistic model)
         print("Solving lower-level model...")
         lower_model = solve_prob_model(lower_model, renewable, time_limit, abs_gap)
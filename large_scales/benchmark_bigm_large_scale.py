@@ -0,0 +1,76 @@
+import time
+import pyomo.environ as pyo
+from pyomo.common.collections import ComponentMap
+from example_data_large_scale import read_data
+import large_scale_no_model
+import large_scale_reserve_model
+import large_scale_n_k_model
+import large_scale_prob_model
+
+
+# (formulation, builder module, builder)
+BUILDERS = [('no', large_scale_no_model, 'no_reliability_model'),
+            ('reserve', large_scale_reserve_model, 'reserve_reliability_model'),
+            ('n-1', large_scale_n_k_model, 'n_k_reliability_model'),
+            ('dual-no', large_scale_prob_model, 'prob_reliability_model')]
+
+
+def bounds_reference(m):
+    # No M values given, gdp.bigm derives them from the variable bounds (previous transformation)
+    return ComponentMap()
+
+
+def benchmark_bigm(datafolder, advanced, module, builder, time_limit=1000, abs_gap=0.01, renewable=False):
+    """
+    Solves a model transformed with the M values gdp.bigm derives from the variable bounds and
+    with the data-derived M values of bigm_values.
+
+    Returns:
+        dict: Root gap (LP relaxation against the objective), solve time (seconds) and objective, for each
+    """
+
+    data = read_data(datafolder, advanced)
+    bigm_values = module.bigm_values
+
+    results = {}
+    for run, values in [('bounds', bounds_reference), ('data', bigm_values)]:
+        module.bigm_values = values
+        try:
+            m = getattr(module, builder)(data, renewable)
+        finally:
+            module.bigm_values = bigm_values
+        results[run] = root_gap_and_solve(m, time_limit, abs_gap)
+
+    return results
+
+
+def root_gap_and_solve(m, time_limit, abs_gap):
+    opt = pyo.SolverFactory('gurobi')
+
+    relaxed = m.clone()
+    pyo.TransformationFactory('core.relax_integer_domains').apply_to(relaxed)
+    opt.solve(relaxed)
+    root_bound = pyo.value(relaxed.obj)
+
+    opt.options['TimeLimit'] = time_limit
+    opt.options['MIPGap'] = abs_gap
+    opt.options['Threads'] = 8
+
+    start_time = time.time()
+    opt.solve(m)
+    solve_time = time.time() - start_time
+
+    objective = pyo.value(m.obj)
+    return {'root gap': (objective - root_bound) / abs(objective), 'root bound': root_bound,
+            'time': solve_time, 'objective': objective}
+
+
+
+if __name__ == "__main__":
+    datafolder = "Case 1"
+
+    print(f"{'Model':<9}{'Root gap bounds':>17}{'Root gap data':>15}{'Solve bounds [s]':>18}{'Solve data [s]':>16}")
+    for advanced, module, builder in BUILDERS:
+        r = benchmark_bigm(datafolder, advanced, module, builder)
+        print(f"{advanced:<9}{r['bounds']['root gap']:>17.2%}{r['data']['root gap']:>15.2%}"
+              f"{r['bounds']['time']:>18.2f}{r['data']['time']:>16.2f}")
@@ -0,0 +1,99 @@
+import os
+import time
+import importlib
+import multiprocessing
+from example_data_large_scale import read_data
+from large_scale_model_profiler import BuildProfiler
+from large_scale_prob_matrix_model import prob_reliability_matrix_model
+
+
+# Components built with linear_sum, reported separately
+LINEAR_COMPONENTS = ['nodal_power_balance', 'total_LOLE', 'total_EENS', 'LOLE_limit',
+                     'IC_generator', 'IC_line', 'IC_backup', 'FOC_generator', 'FOC_line', 'FOC_backup',
+                     'VOC_generator', 'VOC_backup', 'VOC_line', 'EENS_penalties']
+
+# (formulation, builder module, builder)
+BUILDERS = [('no', 'large_scale_no_model', 'no_reliability_model'),
+            ('reserve', 'large_scale_reserve_model', 'reserve_reliability_model'),
+            ('n-1', 'large_scale_n_k_model', 'n_k_reliability_model'),
+            ('dual-no', 'large_scale_prob_model', 'prob_reliability_model')]
+
+
+def sum_reference(variables, coefs=None, constant=0):
+    # Previous construction with sum(), one term at a time, kept here as the reference point
+    if coefs is None:
+        return constant + sum(variables)
+    return constant + sum(c * v for c, v in zip(coefs, variables))
+
+
+def _build_time(datafolder, advanced, module_name, builder, reference, renewable):
+    # Runs in a fresh process, so neither build pays for the garbage of the other
+    module = importlib.import_module(module_name)
+    if reference:
+        module.linear_sum = sum_reference
+
+    data = read_data(datafolder, advanced)
+
+    start_time = time.time()
+    with BuildProfiler(memory=False) as profiler:
+        getattr(module, builder)(data, renewable)
+    build_time = time.time() - start_time
+
+    return {
+        'linear components': sum(r['time'] for r in profiler.records if r['name'] in LINEAR_COMPONENTS),
+        'build': build_time,
+    }
+
+
+def benchmark_build(datafolder, advanced, module_name, builder, renewable=False):
+    """
+    Builds a model with the previous sum() construction of the linear families (nodal balance,
+    LOLE/EENS totals, cost terms) and with linear_sum, each in a fresh process.
+
+    Returns:
+        dict: Time (seconds) of the linear families and of the whole build, for each construction.
+    """
+
+    times = {}
+    ctx = multiprocessing.get_context('spawn')
+    for run, reference in [('sum', True), ('linear', False)]:
+        with ctx.Pool(1) as pool:
+            times[run] = pool.apply(_build_time, (datafolder, advanced, module_name, builder, reference, renewable))
+
+    return times
+
+
+
+def benchmark_state_blocks(datafolder, advanced='dual-no', workers=(1, 2, 4, 8, 16)):
+    """
+    Builds the matrix model of the probabilistic formulation with its state blocks built by
+    1, 2, 4, ... worker processes (as many as there are cores), until the sparse matrices are assembled.
+
+    Returns:
+        dict: Build time (seconds) for each number of workers.
+    """
+
+    data = read_data(datafolder, advanced)
+
+    times = {}
+    for w in [w for w in workers if w <= os.cpu_count()]:
+        start_time = time.time()
+        m = prob_reliability_matrix_model(data, renewable=False, workers=w)
+        m.matrices()
+        times[w] = time.time() - start_time
+
+    return times
+
+
+
+if __name__ == "__main__":
+    print(f"{'Case':<8}{'Model':>9}{'sum() [s]':>12}{'linear_sum [s]':>16}{'Build sum() [s]':>17}{'Build linear_sum [s]':>22}")
+    for datafolder in ['Case 2', 'Case 3']:
+        for advanced, module_name, builder in BUILDERS:
+            r = benchmark_build(datafolder, advanced, module_name, builder)
+            print(f"{datafolder:<8}{advanced:>9}{r['sum']['linear components']:>12.2f}{r['linear']['linear components']:>16.2f}"
+                  f"{r['sum']['build']:>17.2f}{r['linear']['build']:>22.2f}")
+
+    print(f"\n{'Workers':<9}{'Case 3 dual-no build [s]':>26}")
+    for w, build_time in benchmark_state_blocks('Case 3').items():
+        print(f"{w:<9}{build_time:>26.2f}")
@@ -0,0 +1,163 @@
+import os
+import glob
+import time
+import shutil
+import resource
+import multiprocessing
+import pandas as pd
+from large_scale_data_utilities import table_to_dict, read_cached_table, CaseTables, CACHE_FOLDER
+
+
+# (file, index columns, value column) for every parameter table converted in read_data
+TABLES = [
+    ('weight.csv', 'n', 'weight'),
+    ('operation_time.csv', 'b', 'opt_time'),
+    ('min_cap_gen.csv', 'k', 'min_cap'),
+    ('max_cap_gen.csv', 'k', 'max_cap'),
+    ('min_cap_line.csv', 'l', 'min_cap'),
+    ('max_cap_line.csv', 'l', 'max_cap'),
+    ('min_cap_backup.csv', 'k', 'min_cap'),
+    ('max_cap_backup.csv', 'k', 'max_cap'),
+    ('demand.csv', ['i','t','n','b'], 'D'),
+    ('capacity_factor.csv', ['i','t','n','b'], 'CPF'),
+    ('min_opt_gen.csv', 'k', 'min_opt'),
+    ('max_opt_gen.csv', 'k', 'max_opt'),
+    ('ramp_up.csv', 'k', 'ramp_up'),
+    ('ramp_down.csv', 'k', 'ramp_down'),
+    ('res_target.csv', 't', 'res_target'),
+    ('pre_cap_gen.csv', ['i','k'], 'pre_cap'),
+    ('pre_cap_line.csv', 'l', 'pre_cap'),
+    ('ic_gen.csv', ['k','t'], 'ic_gen'),
+    ('ic_line.csv', ['l','t'], 'ic_line'),
+    ('ic_backup.csv', ['k','t'], 'ic_backup'),
+    ('fc_gen.csv', ['k','t'], 'fc_gen'),
+    ('fc_line.csv', ['l','t'], 'fc_line'),
+    ('fc_backup.csv', ['k','t'], 'fc_backup'),
+    ('vc_gen.csv', ['k','t'], 'vc_gen'),
+    ('vc_line.csv', ['l','t'], 'vc_line'),
+    ('prob.csv', 'st', 'prob'),
+    ('state_indicator_gen.csv', ['i','k','st'], 'state_gen'),
+    ('state_indicator_line.csv', ['l','st'], 'state_line'),
+    ('state_indicator_backup_nodual.csv', ['i','k','st'], 'state_backup'),
+    ('state_indicator_backup_dual.csv', ['i','k','st'], 'state_backup'),
+    ('scenario_rate_n1.csv', 'sc', 'sc_rate'),
+    ('scenario_rate_n2.csv', 'sc', 'sc_rate'),
+    ('scenario_indicator_gen_n1.csv', ['i','k','t','n','sc'], 'sc_gen'),
+    ('scenario_indicator_gen_n2.csv', ['i','k','t','n','sc'], 'sc_gen'),
+    ('scenario_indicator_line_n1.csv', ['l','t','n','sc'], 'sc_line'),
+    ('scenario_indicator_line_n2.csv', ['l','t','n','sc'], 'sc_line'),
+]
+
+
+def iterrows_to_dict(df, keys, value):
+    # Previous implementation of read_data, kept here as the reference point
+    if isinstance(keys, str):
+        return {row[keys]: row[value] for _, row in df.iterrows()}
+    return {tuple(row[c] for c in keys): row[value] for _, row in df.iterrows()}
+
+
+def benchmark_loading(datafolder):
+    """
+    Times the conversion of every parameter table of a case with the previous per-row
+    loop (iterrows) and with the column-wise loader used by read_data.
+
+    Returns:
+        dict: Number of rows and conversion times (seconds) for the case.
+    """
+
+    curPath = os.path.join(os.path.abspath(os.path.curdir), 'data3', datafolder)
+    tables = [(pd.read_csv(os.path.join(curPath, f), header=0), keys, value) for f, keys, value in TABLES]
+
+    start_time = time.time()
+    for df, keys, value in tables:
+        iterrows_to_dict(df, keys, value)
+    iterrows_time = time.time() - start_time
+
+    start_time = time.time()
+    for df, keys, value in tables:
+        table_to_dict(df, keys, value)
+    vectorized_time = time.time() - start_time
+
+    return {
+        "rows": sum(len(df) for df, _, _ in tables),
+        "iterrows": iterrows_time,
+        "vectorized": vectorized_time,
+    }
+
+
+def benchmark_cache(datafolder):
+    """
+    Times reading every table of a case from CSV, through an empty cache (which parses the
+    CSV files and writes the cache) and through a warm cache.
+
+    Returns:
+        dict: Reading times (seconds) for the case.
+    """
+
+    curPath = os.path.join(os.path.abspath(os.path.curdir), 'data3', datafolder)
+    shutil.rmtree(os.path.join(curPath, CACHE_FOLDER), ignore_errors=True)
+
+    times = {}
+    for run in ['csv', 'cold', 'warm']:
+        start_time = time.time()
+        for f, _, _ in TABLES:
+            if run == 'csv':
+                pd.read_csv(os.path.join(curPath, f), header=0)
+            else:
+                read_cached_table(curPath, f[:-len('.csv')])
+        times[run] = time.time() - start_time
+
+    return times
+
+
+def _load_peak_rss(datafolder, advanced, cache):
+    # Runs in a fresh process, so the peak RSS only covers this load
+    from example_data_large_scale import read_data
+
+    curPath = os.path.join(os.path.abspath(os.path.curdir), 'data3', datafolder)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    read_data(datafolder, advanced, CaseTables(curPath, advanced, cache=cache))
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return before / 1024, after / 1024     # ru_maxrss is in KB on Linux
+
+
+def benchmark_memory(datafolder, advanced='dual-no'):
+    """
+    Measures the peak RSS of loading a case in a fresh process: from CSV into full DataFrames
+    (no cache), through the streaming ingestion of the indicator tables (empty cache) and
+    from the memory-mapped tensors (warm cache).
+
+    Returns:
+        dict: (peak RSS before loading, peak RSS after loading) in MB for each run.
+    """
+
+    curPath = os.path.join(os.path.abspath(os.path.curdir), 'data3', datafolder)
+    for ext in ['npy', 'json']:
+        for path in glob.glob(os.path.join(curPath, CACHE_FOLDER, f'*.{ext}')):
+            os.remove(path)
+
+    results = {}
+    ctx = multiprocessing.get_context('spawn')
+    for run, cache in [('dataframe', False), ('streaming', True), ('memory-mapped', True)]:
+        with ctx.Pool(1) as pool:
+            results[run] = pool.apply(_load_peak_rss, (datafolder, advanced, cache))
+
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'Case':<8}{'Rows':>10}{'iterrows [s]':>15}{'vectorized [s]':>17}{'Speedup':>10}")
+    for datafolder in ['Case 1', 'Case 2', 'Case 3']:
+        r = benchmark_loading(datafolder)
+        print(f"{datafolder:<8}{r['rows']:>10}{r['iterrows']:>15.3f}{r['vectorized']:>17.3f}{r['iterrows'] / r['vectorized']:>9.1f}x")
+
+    print(f"\n{'Case':<8}{'CSV [s]':>10}{'cold cache [s]':>17}{'warm cache [s]':>17}")
+    for datafolder in ['Case 1', 'Case 2', 'Case 3']:
+        r = benchmark_cache(datafolder)
+        print(f"{datafolder:<8}{r['csv']:>10.3f}{r['cold']:>17.3f}{r['warm']:>17.3f}")
+
+    print(f"\n{'Case':<8}{'Load':>15}{'imports [MB]':>14}{'peak RSS [MB]':>15}")
+    for datafolder in ['Case 1', 'Case 2', 'Case 3']:
+        for run, (before, after) in benchmark_memory(datafolder).items():
+            print(f"{datafolder:<8}{run:>15}{before:>14.1f}{after:>15.1f}")
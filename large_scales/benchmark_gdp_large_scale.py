@@ -0,0 +1,63 @@
+import time
+from example_data_large_scale import read_data
+from large_scale_model_profiler import BuildProfiler
+from large_scale_utilities import model_statistics, GDP_TRANSFORMATIONS
+from benchmark_bigm_large_scale import BUILDERS, root_gap_and_solve
+
+
+def benchmark_transformations(datafolder, advanced, module, builder, transformations=GDP_TRANSFORMATIONS,
+                              time_limit=1000, abs_gap=0.01, renewable=False):
+    """
+    Builds and solves a model with each GDP reformulation of its disjunctions.
+
+    gdp.binary_multiplication gives bilinear rows (indicator times constraint body), which the
+    standard form compiler does not take, its size is not reported and Gurobi solves it as a
+    nonconvex MIQCP. gdp.mbigm solves an LP per disjunct to compute its M values, which is part
+    of its transformation time.
+
+    Returns:
+        dict: For each transformation, its transformation and build time (seconds), model size
+              (rows, columns, binaries, nonzeros), LP bound, root gap and time to the target gap
+    """
+
+    data = read_data(datafolder, advanced)
+
+    results = {}
+    for transformation in transformations:
+        start_time = time.perf_counter()
+        with BuildProfiler(memory=False) as profiler:
+            m = getattr(module, builder)(data, renewable, transformation=transformation)
+        build_time = time.perf_counter() - start_time
+        transformation_time = sum(r['time'] for r in profiler.records if r['type'] == 'Transformation')
+
+        try:
+            size = model_statistics(m, verbose=False)
+        except ValueError:
+            size = {'rows': None, 'columns': None, 'binaries': None, 'nonzeros': None}
+
+        solve = root_gap_and_solve(m, time_limit, abs_gap)
+        results[transformation] = {'transformation time': transformation_time, 'build time': build_time,
+                                   'rows': size['rows'], 'columns': size['columns'],
+                                   'binaries': size['binaries'], 'nonzeros': size['nonzeros'],
+                                   'LP bound': solve['root bound'], 'root gap': solve['root gap'],
+                                   'time to gap': solve['time'], 'objective': solve['objective']}
+
+    return results
+
+
+def _fmt(value, spec='d'):
+    return '-' if value is None else format(value, spec)
+
+
+
+if __name__ == "__main__":
+    cases = ["Case 1", "Case 2"]
+
+    print(f"{'Case':<14}{'Model':<9}{'GDP':<23}{'Transf. [s]':>12}{'Rows':>10}{'Columns':>10}{'Binaries':>10}"
+          f"{'Nonzeros':>11}{'LP bound':>14}{'Root gap':>10}{'To gap [s]':>12}")
+    for datafolder in cases:
+        for advanced, module, builder in BUILDERS:
+            for transformation, r in benchmark_transformations(datafolder, advanced, module, builder).items():
+                print(f"{datafolder:<14}{advanced:<9}{transformation:<23}{r['transformation time']:>12.2f}"
+                      f"{_fmt(r['rows']):>10}{_fmt(r['columns']):>10}{_fmt(r['binaries']):>10}{_fmt(r['nonzeros']):>11}"
+                      f"{r['LP bound']:>14.4g}{r['root gap']:>10.2%}{r['time to gap']:>12.2f}")
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import tracemalloc
+import pyomo.environ as pyo
+from pyomo.core.base.block import BlockData
+from pyomo.core.base.transformation import Transformation
+from pyomo.core.expr.visitor import identify_variables
+from example_data_large_scale import read_data
+from large_scale_no_model import no_reliability_model
+from large_scale_reserve_model import reserve_reliability_model
+from large_scale_n_k_model import n_k_reliability_model
+from large_scale_prob_model import prob_reliability_model
+
+
+class BuildProfiler:
+    """
+    Opt-in profiler of model construction, used as a context manager around a model builder.
+
+    While active, every component added to a model (Set, Param, Var, Constraint, Disjunct,
+    Disjunction, Expression, ...) and every transformation applied to it (gdp.bigm) is timed,
+    and the memory it allocates is traced. Components built inside another one (the constraints
+    of a Disjunct, the blocks created by gdp.bigm) are counted in the outer one.
+
+    Parameters:
+        memory (bool): Trace the incremental memory of each component with tracemalloc (slower)
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.records = []
+        self._depth = 0
+
+    def __enter__(self):
+        self._add_component = BlockData.add_component
+        self._apply_to = Transformation.apply_to
+        self._tracing = self.memory and not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+
+        profiler = self
+
+        def add_component(block, name, val):
+            if profiler._depth:
+                return profiler._add_component(block, name, val)
+            profiler._measure(name, lambda: profiler._add_component(block, name, val),
+                              lambda: _component_record(block.component(name)))
+
+        def apply_to(transformation, model, **kwds):
+            if profiler._depth:
+                return profiler._apply_to(transformation, model, **kwds)
+            profiler._measure(_transformation_name(transformation), lambda: profiler._apply_to(transformation, model, **kwds),
+                              lambda: {'type': 'Transformation', 'indices': None, 'nonzeros': None})
+
+        BlockData.add_component = add_component
+        Transformation.apply_to = apply_to
+        return self
+
+    def __exit__(self, *exc):
+        BlockData.add_component = self._add_component
+        Transformation.apply_to = self._apply_to
+        if self._tracing:
+            tracemalloc.stop()
+        return False
+
+    def _measure(self, name, run, describe):
+        self._depth += 1
+        try:
+            memory_before = tracemalloc.get_traced_memory()[0] if self.memory else 0
+            start_time = time.perf_counter()
+            run()
+            build_time = time.perf_counter() - start_time
+            memory_after = tracemalloc.get_traced_memory()[0] if self.memory else 0
+
+            record = {'name': name}
+            record.update(describe())
+            record['time'] = build_time
+            record['memory'] = (memory_after - memory_before) / 1024**2 if self.memory else None
+            self.records.append(record)
+        finally:
+            self._depth -= 1
+
+    def table(self, sort='time'):
+        """
+        Returns:
+            str: One row per component, sorted by decreasing sort ('time', 'memory', 'nonzeros' or 'indices')
+        """
+
+        records = sorted(self.records, key=lambda r: r[sort] or 0, reverse=True)
+        lines = [f"{'Component':<36}{'Type':<16}{'Time [s]':>10}{'Indices':>11}{'Nonzeros':>11}{'Memory [MB]':>13}"]
+        for r in records:
+            lines.append(f"{r['name']:<36}{r['type']:<16}{r['time']:>10.3f}{_fmt(r['indices']):>11}{_fmt(r['nonzeros']):>11}"
+                         f"{_fmt(r['memory'], '.1f'):>13}")
+        lines.append(f"{'Total':<52}{sum(r['time'] for r in records):>10.3f}{'':>22}"
+                     f"{_fmt(sum(r['memory'] for r in records) if self.memory else None, '.1f'):>13}")
+        return '\n'.join(lines)
+
+    def to_json(self, path, **info):
+        # info: extra fields identifying the run (case, formulation, ...)
+        report = dict(info, total_time=sum(r['time'] for r in self.records), components=self.records)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+
+def profile_build(builder, data, renewable, memory=True):
+    """
+    Builds a model with builder(data, renewable) under a BuildProfiler.
+
+    Returns:
+        tuple: The model and the profiler with its records
+    """
+
+    with BuildProfiler(memory) as profiler:
+        m = builder(data, renewable)
+    return m, profiler
+
+
+
+def _component_record(comp):
+    # Type, number of indices and number of nonzeros (variables in constraint bodies and expressions)
+    ctype = comp.ctype.__name__
+    indices = len(comp)
+
+    if ctype in ['Constraint', 'Expression']:
+        nonzeros = sum(_count_variables(c.expr) for c in comp.values())
+    elif ctype == 'Disjunct':
+        nonzeros = sum(_count_variables(c.body)
+                       for d in comp.values() for c in d.component_data_objects(pyo.Constraint, active=True))
+    elif ctype == 'Objective':
+        nonzeros = sum(_count_variables(o.expr) for o in comp.values())
+    else:
+        nonzeros = None
+
+    return {'type': ctype, 'indices': indices, 'nonzeros': nonzeros}
+
+
+def _count_variables(expr):
+    return sum(1 for _ in identify_variables(expr, include_fixed=False))
+
+
+def _transformation_name(transformation):
+    # Registered alias (gdp.bigm) when the transformation was created from the TransformationFactory
+    for alias in pyo.TransformationFactory:
+        if pyo.TransformationFactory.get_class(alias) is type(transformation):
+            return alias
+    return type(transformation).__name__
+
+
+def _fmt(value, spec='d'):
+    return '-' if value is None else format(value, spec)
+
+
+
+if __name__ == "__main__":
+    datafolder = "Case 1"
+    renewable_status = False
+
+    builders = [('no', no_reliability_model), ('reserve', reserve_reliability_model),
+                ('n-1', n_k_reliability_model), ('dual-yes', prob_reliability_model)]
+
+    for formulation, builder in builders:
+        data = read_data(datafolder=datafolder, advanced=formulation)
+        m, profiler = profile_build(builder, data, renewable_status)
+
+        print(f"\n{builder.__name__} ({datafolder}, {formulation})")
+        print(profiler.table())
+        profiler.to_json(os.path.join(os.path.abspath(os.path.curdir), f"{datafolder}_build_profile_{formulation}.json"),
+                         case=datafolder, formulation=formulation, builder=builder.__name__)
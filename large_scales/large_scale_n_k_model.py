@@ -1,11 +1,19 @@
 __author__ = "Seolhee Cho"
 
+import math
 import pyomo.environ as pyo
+from pyomo.environ import value
 from example_data_large_scale import read_data
-from large_scale_utilities import solve_model
+from large_scale_utilities import solve_model, linear_sum, bigm_values, presolve_disjuncts
+from large_scale_data_utilities import failures_to_indicator, failures_by_component
 
 
-def n_k_reliability_model(data, renewable):
+def n_k_reliability_model(data, renewable, compact=False, mutable=False, transformation='bigm', presolve=True, cuts=False):
+    # compact=True substitutes the survived capacities (cap_sv, cap_sv_avg, cap_sv_line, cap_sv_line_avg) as expressions of the available capacities
+    # mutable=True declares load_demand, res_target, scenario_rate as mutable Params, to be changed in place with update_model
+    # transformation: GDP reformulation applied to the disjunctions -> 'bigm', 'hull', 'mbigm', 'binary_multiplication'
+    # presolve=True fixes the installations decided by the data before the transformation (see presolve_disjuncts)
+    # cuts=True adds the capacity adequacy cuts (capacity_adequacy, system_adequacy, installation_cover) to tighten the LP relaxation
     
     m = pyo.ConcreteModel()
     
@@ -40,7 +48,7 @@ def n_k_reliability_model(data, renewable):
     m.max_ins_cap = pyo.Param(m.gen_pn, within=pyo.NonNegativeReals, initialize=data['max_ins_cap'])
     m.min_line = pyo.Param(m.line_pn, within=pyo.NonNegativeReals, initialize=data['min_line'])
     m.max_line = pyo.Param(m.line_pn, within=pyo.NonNegativeReals, initialize=data['max_line'])
-    m.load_demand = pyo.Param(m.node, m.year, m.rpdn, m.sub, within=pyo.NonNegativeReals, initialize=data['load_demand'])
+    m.load_demand = pyo.Param(m.node, m.year, m.rpdn, m.sub, within=pyo.NonNegativeReals, initialize=data['load_demand'], mutable=mutable)
     m.capacity_factor = pyo.Param(m.node, m.year, m.rpdn, m.sub, within=pyo.NonNegativeReals, initialize=data['capacity_factor'])
     m.min_opt_dpt = pyo.Param(m.dispatch_gen, within=pyo.NonNegativeReals, initialize=data['min_opt_dpt'])
     m.max_opt_dpt = pyo.Param(m.dispatch_gen, within=pyo.NonNegativeReals, initialize=data['max_opt_dpt'])
@@ -55,7 +63,7 @@ def n_k_reliability_model(data, renewable):
     m.unit_FC_line = pyo.Param(m.line, m.year, within=pyo.NonNegativeReals, initialize=data['unit_FC_line']) # unit: M$/MW    
     m.unit_VC = pyo.Param(m.generator, m.year, within=pyo.NonNegativeReals, initialize=data['unit_VC'])   # unit: $/MWh  
     m.unit_VC_line = pyo.Param(m.line, m.year, within=pyo.NonNegativeReals, initialize=data['unit_VC_line'])   # unit: $/MWh
-    m.res_target = pyo.Param(m.year, within=pyo.NonNegativeReals, initialize=data['res_target'])
+    m.res_target = pyo.Param(m.year, within=pyo.NonNegativeReals, initialize=data['res_target'], mutable=mutable)
    
     # Bounds
     def _bounds_cap_ins_rule(m, i, k, t):
@@ -159,59 +167,99 @@ def n_k_reliability_model(data, renewable):
 
     m.scenario = pyo.Set(initialize=data['scenario'])   
     
-    m.scenario_indicator_gen = pyo.Param(m.node, m.dis_pn, m.year, m.rpdn, m.scenario, within=pyo.NonNegativeReals, initialize=data['scenario_indicator_gen'])
-    m.scenario_indicator_line = pyo.Param(m.line, m.year, m.rpdn, m.scenario, within=pyo.NonNegativeReals, initialize=data['scenario_indicator_line'])
-    m.scenario_rate = pyo.Param(m.scenario, within=pyo.NonNegativeReals, initialize=data['scenario_rate'])
-
-    m.cap_sv = pyo.Var(m.node, m.gen_pn, m.year, m.rpdn, m.scenario, within=pyo.NonNegativeReals, doc='Generation capacity survived in scenario')
-    m.cap_sv_line = pyo.Var(m.line, m.year, m.rpdn, m.scenario, within=pyo.NonNegativeReals, doc='Line capacity survived in scenario')
-    m.cap_sv_avg = pyo.Var(m.node, m.generator, m.year, m.scenario, within=pyo.NonNegativeReals, doc='Average generation capacity survived in scenario')
-    m.cap_sv_line_avg = pyo.Var(m.line, m.year, m.scenario, within=pyo.NonNegativeReals, doc='Average line capacity survived in scenario')
-    
-    m.ppd = pyo.Var(m.node, m.generator, m.year, m.rpdn, m.sub, m.scenario, within=pyo.NonNegativeReals, doc='Power produced in scenario')
-    m.flow = pyo.Var(m.line, m.year, m.rpdn, m.sub, m.scenario, within=pyo.Reals, doc='Power flow in scenario')
-    m.flow_pos = pyo.Var(m.line, m.year, m.rpdn, m.sub, m.scenario, within=pyo.NonNegativeReals, doc='Positive power flow in scenario')
-    m.flow_neg = pyo.Var(m.line, m.year, m.rpdn, m.sub, m.scenario, within=pyo.NonPositiveReals, doc='Negative power flow in scenario')  
+    m.scenario_indicator_gen = pyo.Param(m.node, m.dis_pn, m.year, m.rpdn, m.scenario, within=pyo.NonNegativeReals, default=1, initialize=failures_to_indicator(data['scenario_failed_gen']))
+    m.scenario_indicator_line = pyo.Param(m.line, m.year, m.rpdn, m.scenario, within=pyo.NonNegativeReals, default=1, initialize=failures_to_indicator(data['scenario_failed_line']))
+    m.scenario_rate = pyo.Param(m.scenario, within=pyo.NonNegativeReals, initialize=data['scenario_rate'], mutable=mutable)
+
+
+    # Sparse index sets of the operation: a component that failed in a scenario produces no power and
+    # carries no flow, so its (component, scenario) combinations are left out of the model
+    failed_gen = failures_by_component(data['scenario_failed_gen'])
+    failed_line = failures_by_component(data['scenario_failed_line'])
+
+    available_gen = {(i,k,t,n): [sc for sc in m.scenario if sc not in failed_gen.get((i,k,t,n), ())]
+                     for i in m.node for k in m.generator for t in m.year for n in m.rpdn}
+    available_line = {(l,t,n): [sc for sc in m.scenario if sc not in failed_line.get((l,t,n), ())]
+                      for l in m.line for t in m.year for n in m.rpdn}
+
+    m.ppd_index = pyo.Set(dimen=6, initialize=_available_index(available_gen, m.sub), doc='(node, generator, year, rpdn, sub, scenario) of the generators available')
+    m.dispatch_pn_index = pyo.Set(dimen=6, initialize=_available_index(available_gen, m.sub, 1, m.dis_pn))
+    m.flow_index = pyo.Set(dimen=5, initialize=_available_index(available_line, m.sub), doc='(line, year, rpdn, sub, scenario) of the lines available')
+    m.flow_pn_index = pyo.Set(dimen=5, initialize=_available_index(available_line, m.sub, 0, m.line_pn))
+
+    if compact:
+        # Survived capacities as expressions, no variables nor defining equalities (zero for failed components)
+        @m.Expression(m.node, m.dis_pn, m.year, m.rpdn, m.scenario, doc='Generation capacity survived in scenario')
+        def cap_sv(m, i, k, t, n, sc):
+            return m.cap_ava[i,k,t] if m.scenario_indicator_gen[i,k,t,n,sc] else 0
+
+        @m.Expression(m.line, m.year, m.rpdn, m.scenario, doc='Line capacity survived in scenario')
+        def cap_sv_line(m, l, t, n, sc):
+            return m.cap_ava_line[l,t] if m.scenario_indicator_line[l,t,n,sc] else 0
+
+        @m.Expression(m.node, m.generator, m.year, m.scenario, doc='Average generation capacity survived in scenario')
+        def cap_sv_avg(m, i, k, t, sc):
+            if k in m.dis_pn:
+                return sum(m.scenario_indicator_gen[i,k,t,n,sc] for n in m.rpdn) / len(m.rpdn) * m.cap_ava[i,k,t]
+            return m.cap_ava[i,k,t]
+
+        @m.Expression(m.line, m.year, m.scenario, doc='Average line capacity survived in scenario')
+        def cap_sv_line_avg(m, l, t, sc):
+            return sum(m.scenario_indicator_line[l,t,n,sc] for n in m.rpdn) / len(m.rpdn) * m.cap_ava_line[l,t]
+
+    else:
+        m.cap_sv = pyo.Var(m.node, m.gen_pn, m.year, m.rpdn, m.scenario, within=pyo.NonNegativeReals, doc='Generation capacity survived in scenario')
+        m.cap_sv_line = pyo.Var(m.line, m.year, m.rpdn, m.scenario, within=pyo.NonNegativeReals, doc='Line capacity survived in scenario')
+        m.cap_sv_avg = pyo.Var(m.node, m.generator, m.year, m.scenario, within=pyo.NonNegativeReals, doc='Average generation capacity survived in scenario')
+        m.cap_sv_line_avg = pyo.Var(m.line, m.year, m.scenario, within=pyo.NonNegativeReals, doc='Average line capacity survived in scenario')
+    
+    m.ppd = pyo.Var(m.ppd_index, within=pyo.NonNegativeReals, doc='Power produced in scenario')
+    m.flow = pyo.Var(m.flow_index, within=pyo.Reals, doc='Power flow in scenario')
+    m.flow_pos = pyo.Var(m.flow_index, within=pyo.NonNegativeReals, doc='Positive power flow in scenario')
+    m.flow_neg = pyo.Var(m.flow_index, within=pyo.NonPositiveReals, doc='Negative power flow in scenario')  
     m.over_gen = pyo.Var(m.node, m.year, m.rpdn, m.sub, m.scenario, within=pyo.NonNegativeReals, doc='Over-generation')       
     
     # Potential generators
-    @m.Constraint(m.node, m.dis_pn, m.year, m.rpdn, m.scenario)
-    def dis_survived_capacity_pn(m, i, k, t, n, sc):
-        return m.cap_sv[i,k,t,n,sc] == m.scenario_indicator_gen[i,k,t,n,sc] * m.cap_ava[i,k,t]
+    if not compact:
+        @m.Constraint(m.node, m.dis_pn, m.year, m.rpdn, m.scenario)
+        def dis_survived_capacity_pn(m, i, k, t, n, sc):
+            return m.cap_sv[i,k,t,n,sc] == m.scenario_indicator_gen[i,k,t,n,sc] * m.cap_ava[i,k,t]
 
 
-    @m.Constraint(m.node, m.dis_pn, m.year, m.rpdn, m.sub, m.scenario)
+    @m.Constraint(m.dispatch_pn_index)
     def power_generation_lb_pn(m, i, k, t, n, b, sc):
         return m.min_opt_dpt[k] * m.cap_sv[i,k,t,n,sc] <= m.ppd[i,k,t,n,b,sc]
     
-    @m.Constraint(m.node, m.dis_pn, m.year, m.rpdn, m.sub, m.scenario)
+    @m.Constraint(m.dispatch_pn_index)
     def power_generation_ub_pn(m, i, k, t, n, b, sc):
         return m.ppd[i,k,t,n,b,sc] <= m.max_opt_dpt[k] * m.cap_sv[i,k,t,n,sc]  
 
-    @m.Constraint(m.node, m.dis_pn, m.year, m.rpdn, m.sub, m.scenario)
+    @m.Constraint(m.dispatch_pn_index)
     def ramp_up_constraint_pn(m, i, k, t, n, b, sc):
         if b == 1:
             return m.ppd[i,k,t,n,b,sc] <= m.ramp_up[k] * m.cap_sv[i,k,t,n,sc]  
         else:
             return m.ppd[i,k,t,n,b,sc] - m.ppd[i,k,t,n,b-1,sc] <= m.ramp_up[k] * m.cap_sv[i,k,t,n,sc]    
 
-    @m.Constraint(m.node, m.dis_pn, m.year, m.rpdn, m.sub, m.scenario)
+    @m.Constraint(m.dispatch_pn_index)
     def ramp_down_constraint_pn(m, i, k, t, n, b, sc):
         if b == 1:
             return -m.ppd[i,k,t,n,b,sc] <= m.ramp_down[k] * m.cap_sv[i,k,t,n,sc] 
         else:
             return m.ppd[i,k,t,n,b-1,sc] - m.ppd[i,k,t,n,b,sc] <= m.ramp_down[k] * m.cap_sv[i,k,t,n,sc]   
     
-    @m.Constraint(m.node, m.dis_pn, m.year, m.scenario)
-    def aggregated_cap_gen_pn(m, i, k, t, sc):
-        return m.cap_sv_avg[i,k,t,sc] == sum(m.cap_sv[i,k,t,n,sc] for n in m.rpdn) / len(m.rpdn)        
+    if not compact:
+        @m.Constraint(m.node, m.dis_pn, m.year, m.scenario)
+        def aggregated_cap_gen_pn(m, i, k, t, sc):
+            return m.cap_sv_avg[i,k,t,sc] == sum(m.cap_sv[i,k,t,n,sc] for n in m.rpdn) / len(m.rpdn)        
     
     
     
     # Existing generators
-    @m.Constraint(m.node, m.gen_ex, m.year, m.scenario)
-    def aggregated_cap_gen_ex(m, i, k, t, sc):
-        return m.cap_sv_avg[i,k,t,sc] == m.cap_ava[i,k,t]        
+    if not compact:
+        @m.Constraint(m.node, m.gen_ex, m.year, m.scenario)
+        def aggregated_cap_gen_ex(m, i, k, t, sc):
+            return m.cap_sv_avg[i,k,t,sc] == m.cap_ava[i,k,t]        
     
     @m.Constraint(m.node, m.gen_ex, m.year, m.rpdn, m.sub, m.scenario)
     def power_generation_lb_ex(m, i, k, t, n, b, sc):
@@ -236,9 +284,10 @@ def n_k_reliability_model(data, renewable):
             return m.ppd[i,k,t,n,b-1,sc] - m.ppd[i,k,t,n,b,sc] <= m.ramp_down[k] * m.cap_sv_avg[i,k,t,sc]          
 
 
-    @m.Constraint(m.node, m.res_pn, m.year, m.scenario)
-    def res_survived_capacity_pn(m, i, k, t, sc):
-        return m.cap_sv_avg[i,k,t,sc] == m.cap_ava[i,k,t]  
+    if not compact:
+        @m.Constraint(m.node, m.res_pn, m.year, m.scenario)
+        def res_survived_capacity_pn(m, i, k, t, sc):
+            return m.cap_sv_avg[i,k,t,sc] == m.cap_ava[i,k,t]  
 
     @m.Constraint(m.node, m.res_pn, m.year, m.rpdn, m.sub, m.scenario)
     def res_power_generation_pn(m, i, k, t, n, b, sc):
@@ -246,35 +295,37 @@ def n_k_reliability_model(data, renewable):
     
 
     # Transmission lines        
-    @m.Constraint(m.line, m.year, m.rpdn, m.scenario)
-    def survived_capacity_line(m, l, t, n, sc):
-        return m.cap_sv_line[l,t,n,sc] == m.scenario_indicator_line[l,t,n,sc] * m.cap_ava_line[l,t]
+    if not compact:
+        @m.Constraint(m.line, m.year, m.rpdn, m.scenario)
+        def survived_capacity_line(m, l, t, n, sc):
+            return m.cap_sv_line[l,t,n,sc] == m.scenario_indicator_line[l,t,n,sc] * m.cap_ava_line[l,t]
         
-    @m.Constraint(m.line, m.year, m.rpdn, m.sub, m.scenario)
+    @m.Constraint(m.flow_index)
     def flows_lb_n1(m, l, t, n, b, sc):
         return -m.cap_sv_line[l,t,n,sc] <= m.flow[l,t,n,b,sc]
     
-    @m.Constraint(m.line, m.year, m.rpdn, m.sub, m.scenario)
+    @m.Constraint(m.flow_index)
     def flows_ub_n1(m, l, t, n, b, sc):
         return m.flow[l,t,n,b,sc] <= m.cap_sv_line[l,t,n,sc]   
     
-    @m.Constraint(m.line, m.year, m.scenario)
-    def aggregated_cap_line(m, l, t, sc):
-        return m.cap_sv_line_avg[l,t,sc] == sum(m.cap_sv_line[l,t,n,sc] for n in m.rpdn) / len(m.rpdn)            
+    if not compact:
+        @m.Constraint(m.line, m.year, m.scenario)
+        def aggregated_cap_line(m, l, t, sc):
+            return m.cap_sv_line_avg[l,t,sc] == sum(m.cap_sv_line[l,t,n,sc] for n in m.rpdn) / len(m.rpdn)            
                 
     
             
     
     # Power flows
-    @m.Constraint(m.line_pn, m.year, m.rpdn, m.sub, m.scenario)
+    @m.Constraint(m.flow_pn_index)
     def flows_lb_pn(m, l, t, n, b, sc):
         return -m.cap_sv_line_avg[l,t,sc] <= m.flow[l,t,n,b,sc]
     
-    @m.Constraint(m.line_pn, m.year, m.rpdn, m.sub, m.scenario)
+    @m.Constraint(m.flow_pn_index)
     def flows_ub_pn(m, l, t, n, b, sc):
         return m.flow[l,t,n,b,sc] <= m.cap_sv_line_avg[l,t,sc]         
     
-    @m.Constraint(m.line, m.year, m.rpdn, m.sub, m.scenario)
+    @m.Constraint(m.flow_index)
     def flows_pos_neg(m, l, t, n, b, sc):
         return m.flow[l,t,n,b,sc] == m.flow_pos[l,t,n,b,sc] + m.flow_neg[l,t,n,b,sc]
     
@@ -282,8 +333,51 @@ def n_k_reliability_model(data, renewable):
     # Demand satisfaction
     @m.Constraint(m.node, m.year, m.rpdn, m.sub, m.scenario)
     def nodal_power_balance(m, i, t, n, b, sc):
-        return sum(m.ppd[i,k,t,n,b,sc] for k in m.generator) + sum(m.flow[l,t,n,b,sc] for l in m.line_to_node[i]) == \
-                m.load_demand[i,t,n,b] + sum(m.flow[l,t,n,b,sc] for l in m.line_fr_node[i]) + m.over_gen[i,t,n,b,sc]        
+        supply = [m.ppd[i,k,t,n,b,sc] for k in m.generator if (i,k,t,n,b,sc) in m.ppd_index] + \
+            [m.flow[l,t,n,b,sc] for l in m.line_to_node[i] if (l,t,n,b,sc) in m.flow_index]
+        demand = [m.flow[l,t,n,b,sc] for l in m.line_fr_node[i] if (l,t,n,b,sc) in m.flow_index] + [m.over_gen[i,t,n,b,sc]]
+        return linear_sum(supply + demand, [1] * len(supply) + [-1] * len(demand)) == m.load_demand[i,t,n,b]
+
+
+    if cuts:
+        ## Capacity adequacy cuts, valid inequalities derived from the operation constraints and the data
+        def _supply_terms(i, t, n, b, sc):
+            # (coefficient, capacity) bounding the production of node i with its survived capacities
+            return [(m.max_opt_dpt[k], m.cap_sv[i,k,t,n,sc]) for k in m.dis_pn if (i,k,t,n,b,sc) in m.ppd_index] + \
+                [(m.max_opt_dpt[k] if k in m.dispatch_gen else m.capacity_factor[i,t,n,b], m.cap_sv_avg[i,k,t,sc]) for k in m.gen_ex] + \
+                [(m.capacity_factor[i,t,n,b], m.cap_sv_avg[i,k,t,sc]) for k in m.res_pn]
+
+        # The survived capacity of a node and the capacity of its lines cover its demand
+        @m.Constraint(m.node, m.year, m.rpdn, m.sub, m.scenario)
+        def capacity_adequacy(m, i, t, n, b, sc):
+            terms = _supply_terms(i,t,n,b,sc) + \
+                [(1, m.cap_sv_line[l,t,n,sc]) for l in list(m.line_to_node[i]) + list(m.line_fr_node[i]) if (l,t,n,b,sc) in m.flow_index]
+            return linear_sum([v for _, v in terms], [c for c, _ in terms]) >= m.load_demand[i,t,n,b]
+
+        # Over the system the flows cancel
+        @m.Constraint(m.year, m.rpdn, m.sub, m.scenario)
+        def system_adequacy(m, t, n, b, sc):
+            terms = [term for i in m.node for term in _supply_terms(i,t,n,b,sc)]
+            return linear_sum([v for _, v in terms], [c for c, _ in terms]) >= sum(m.load_demand[i,t,n,b] for i in m.node)
+
+        # Rounded system adequacy: the demand the existing generators cannot cover takes at least
+        # ceil(deficit / largest share) installations, as each installation (at its maximum capacity)
+        # covers at most the largest share. Its right-hand side is computed from the demand, so mutable
+        # models leave it out
+        if not mutable:
+            @m.Constraint(m.year, m.rpdn, m.sub, m.scenario)
+            def installation_cover(m, t, n, b, sc):
+                existing = sum(value(m.max_opt_dpt[k] if k in m.dispatch_gen else m.capacity_factor[i,t,n,b]) * value(m.pre_cap[i,k])
+                               for i in m.node for k in m.gen_ex)
+                shares = [(value(m.max_opt_dpt[k]) * value(m.max_ins_cap[k]), m.gen_install[i,k,tq].binary_indicator_var)
+                          for i in m.node for k in m.dis_pn for tq in m.year if tq <= t and (i,k,t,n,b,sc) in m.ppd_index] + \
+                    [(value(m.capacity_factor[i,t,n,b]) * value(m.max_ins_cap[k]), m.gen_install[i,k,tq].binary_indicator_var)
+                     for i in m.node for k in m.res_pn for tq in m.year if tq <= t]
+                deficit = sum(value(m.load_demand[i,t,n,b]) for i in m.node) - existing
+                largest = max((u for u, _ in shares), default=0)
+                if deficit <= 0 or largest <= 0:
+                    return pyo.Constraint.Skip
+                return linear_sum([y for _, y in shares]) >= math.ceil(deficit / largest - 1e-9)
 
     if renewable == True:
         @m.Constraint(m.year)
@@ -298,63 +392,73 @@ def n_k_reliability_model(data, renewable):
             )                           
     # In N-k reliability, this constraint is only applied to the normal scenario
     
-    @m.Expression()  # unit: M$
-    def capital_expenditure(m):
-        return sum(m.IC[i,k,t] for i in m.node for k in m.gen_pn for t in m.year) + sum(m.ICL[l,t] for l in m.line_pn for t in m.year) 
-
     @m.Expression()
     def IC_generator(m):
-        return sum(m.IC[i,k,t] for i in m.node for k in m.gen_pn for t in m.year)
-    
+        return linear_sum([m.IC[i,k,t] for i in m.node for k in m.gen_pn for t in m.year])
+
     @m.Expression()
     def IC_line(m):
-        return sum(m.ICL[l,t] for l in m.line_pn for t in m.year)
-    
-    @m.Expression() 
-    def operating_expenses(m):
-        return sum(m.scenario_rate[sc] * m.unit_FC[k,t] * m.cap_sv_avg[i,k,t,sc] for i in m.node for k in m.generator for t in m.year for sc in m.scenario) + \
-            sum(m.scenario_rate[sc] * m.unit_FC_line[l,t] * m.cap_sv_line_avg[l,t,sc] for l in m.line for t in m.year for sc in m.scenario) +\
-                sum(m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.unit_VC[k,t] * m.ppd[i,k,t,n,b,sc] 
-                    for i in m.node for k in m.generator for t in m.year for n in m.rpdn for b in m.sub for sc in m.scenario)/1000000  +\
-                        sum(m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.unit_VC_line[l,t] * (m.flow_pos[l,t,n,b,sc] - m.flow_neg[l,t,n,b,sc]) 
-                            for l in m.line for t in m.year for n in m.rpdn for b in m.sub for sc in m.scenario)/1000000 
+        return linear_sum([m.ICL[l,t] for l in m.line_pn for t in m.year])
+
+    @m.Expression()  # unit: M$
+    def capital_expenditure(m):
+        return m.IC_generator + m.IC_line
+
 
     @m.Expression()
     def FOC_generator(m):
-        return sum(m.scenario_rate[sc] * m.unit_FC[k,t] * m.cap_sv_avg[i,k,t,sc] for i in m.node for k in m.generator for t in m.year for sc in m.scenario)
+        keys = [(i,k,t,sc) for i in m.node for k in m.generator for t in m.year for sc in m.scenario]
+        return linear_sum([m.cap_sv_avg[i,k,t,sc] for (i,k,t,sc) in keys], [m.scenario_rate[sc] * m.unit_FC[k,t] for (i,k,t,sc) in keys])
 
     @m.Expression()
     def FOC_line(m):
-        return sum(m.scenario_rate[sc] * m.unit_FC_line[l,t] * m.cap_sv_line_avg[l,t,sc] for l in m.line for t in m.year for sc in m.scenario)
-    
+        keys = [(l,t,sc) for l in m.line for t in m.year for sc in m.scenario]
+        return linear_sum([m.cap_sv_line_avg[l,t,sc] for (l,t,sc) in keys], [m.scenario_rate[sc] * m.unit_FC_line[l,t] for (l,t,sc) in keys])
+
     @m.Expression()
     def VOC_generator(m):
-        return sum(m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.unit_VC[k,t] * m.ppd[i,k,t,n,b,sc] 
-                    for i in m.node for k in m.generator for t in m.year for n in m.rpdn for b in m.sub for sc in m.scenario)/1000000 
-    
+        return linear_sum([m.ppd[i,k,t,n,b,sc] for (i,k,t,n,b,sc) in m.ppd_index],
+                          [m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.unit_VC[k,t] / 1000000
+                           for (i,k,t,n,b,sc) in m.ppd_index])
+
     @m.Expression()
     def VOC_line(m):
-        return sum(m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.unit_VC_line[l,t] * (m.flow_pos[l,t,n,b,sc] - m.flow_neg[l,t,n,b,sc])  
-                    for l in m.line for t in m.year for n in m.rpdn for b in m.sub for sc in m.scenario)/1000000    
+        coefs = [m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.unit_VC_line[l,t] / 1000000
+                 for (l,t,n,b,sc) in m.flow_index]
+        return linear_sum([m.flow_pos[key] for key in m.flow_index] + [m.flow_neg[key] for key in m.flow_index],
+                          coefs + [-c for c in coefs])
 
-            
+    @m.Expression() # unit: M$
+    def operating_expenses(m):
+        return m.FOC_generator + m.FOC_line + m.VOC_generator + m.VOC_line
+
+
+    # The objective is composed of the cost aggregates above, so each large sum is generated once
     @m.Objective(sense=pyo.minimize)   # unit: M$
     def obj(m):
-        return sum(m.IC[i,k,t] for i in m.node for k in m.gen_pn for t in m.year) + sum(m.ICL[l,t] for l in m.line_pn for t in m.year) +\
-            sum(m.scenario_rate[sc] * m.unit_FC[k,t] * m.cap_sv_avg[i,k,t,sc] for i in m.node for k in m.generator for t in m.year for sc in m.scenario) + \
-                sum(m.scenario_rate[sc] * m.unit_FC_line[l,t] * m.cap_sv_line_avg[l,t,sc] for l in m.line for t in m.year for sc in m.scenario) +\
-                    sum(m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.unit_VC[k,t] * m.ppd[i,k,t,n,b,sc] 
-                        for i in m.node for k in m.generator for t in m.year for n in m.rpdn for b in m.sub for sc in m.scenario)/1000000 +\
-                            sum(m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.unit_VC_line[l,t] * (m.flow_pos[l,t,n,b,sc] - m.flow_neg[l,t,n,b,sc]) 
-                                for l in m.line for t in m.year for n in m.rpdn for b in m.sub for sc in m.scenario)/1000000     
-    
+        return m.capital_expenditure + m.operating_expenses
+
+
+    if presolve:
+        presolve_disjuncts(m)
 
-    transformation_string = 'gdp.bigm'
-    pyo.TransformationFactory(transformation_string).apply_to(m)
+    transformation_string = 'gdp.' + transformation
+    if transformation == 'bigm':
+        pyo.TransformationFactory(transformation_string).apply_to(m, bigM=bigm_values(m))
+    else:
+        pyo.TransformationFactory(transformation_string).apply_to(m)
 
        
     return m
 
+
+
+def _available_index(available, subs, position=None, components=None):
+    # (component..., sub, scenario) for every subperiod and every scenario the component is available in,
+    # available: {(component..., year, rpdn): [scenarios]}, components: only the ones with that label at position
+    return [c + (b, sc) for c, scenarios in available.items() if components is None or c[position] in components
+            for b in subs for sc in scenarios]
+
 if __name__ == "__main__":
     formulation = 'n-2'    # no, reserve, n-1, n-2, dual-no, dual-yes
     renewable_status = False
@@ -1,11 +1,23 @@
 __author__ = "Seolhee Cho"
 
+import math
+import itertools
 import pyomo.environ as pyo
+from pyomo.environ import value
 from example_data_large_scale import read_data
-from large_scale_utilities import solve_model
+from large_scale_utilities import solve_model, linear_sum, bigm_values, presolve_disjuncts
+from large_scale_data_utilities import failures_to_indicator, failures_by_component
 
 
-def prob_reliability_model(data, renewable):
+def prob_reliability_model(data, renewable, compact=False, mutable=False, transformation='bigm', zones=None, presolve=True, cuts=False):
+    # compact=True substitutes the survived capacities (cap_sv, cap_sv_b, cap_sv_line) as expressions of the available capacities
+    # mutable=True declares load_demand, res_target, prob, UD_penalty, max_LOLE as mutable Params, to be changed in place with update_model
+    # transformation: GDP reformulation applied to the disjunctions -> 'bigm', 'hull', 'mbigm', 'binary_multiplication'
+    # zones: loss of load indicated per node (None), for the whole system ('system') or per zone ({node: zone}),
+    #        one disjunction per (area, year, rpdn, sub, state) while EENS stays exact per node
+    # presolve=True fixes the installations decided by the data before the transformation, 'load_shedding' also the load shedding
+    #          the existing generators dominate (opt-in, not with mutable=True, see presolve_disjuncts)
+    # cuts=True adds the capacity adequacy cuts (capacity_adequacy, system_adequacy, installation_cover) to tighten the LP relaxation
     
     m = pyo.ConcreteModel()
     
@@ -40,7 +52,7 @@ def prob_reliability_model(data, renewable):
     m.max_ins_cap = pyo.Param(m.gen_pn, within=pyo.NonNegativeReals, initialize=data['max_ins_cap'])
     m.min_line = pyo.Param(m.line_pn, within=pyo.NonNegativeReals, initialize=data['min_line'])
     m.max_line = pyo.Param(m.line_pn, within=pyo.NonNegativeReals, initialize=data['max_line'])
-    m.load_demand = pyo.Param(m.node, m.year, m.rpdn, m.sub, within=pyo.NonNegativeReals, initialize=data['load_demand'])
+    m.load_demand = pyo.Param(m.node, m.year, m.rpdn, m.sub, within=pyo.NonNegativeReals, initialize=data['load_demand'], mutable=mutable)
     m.capacity_factor = pyo.Param(m.node, m.year, m.rpdn, m.sub, within=pyo.NonNegativeReals, initialize=data['capacity_factor'])
     m.min_opt_dpt = pyo.Param(m.dispatch_gen, within=pyo.NonNegativeReals, initialize=data['min_opt_dpt'])
     m.max_opt_dpt = pyo.Param(m.dispatch_gen, within=pyo.NonNegativeReals, initialize=data['max_opt_dpt'])
@@ -55,7 +67,7 @@ def prob_reliability_model(data, renewable):
     m.unit_FC_line = pyo.Param(m.line, m.year, within=pyo.NonNegativeReals, initialize=data['unit_FC_line']) # unit: M$/MW    
     m.unit_VC = pyo.Param(m.generator, m.year, within=pyo.NonNegativeReals, initialize=data['unit_VC'])   # unit: $/MWh  
     m.unit_VC_line = pyo.Param(m.line, m.year, within=pyo.NonNegativeReals, initialize=data['unit_VC_line'])   # unit: $/MWh
-    m.res_target = pyo.Param(m.year, within=pyo.NonNegativeReals, initialize=data['res_target'])
+    m.res_target = pyo.Param(m.year, within=pyo.NonNegativeReals, initialize=data['res_target'], mutable=mutable)
    
     # Bounds
     def _bounds_cap_ins_rule(m, i, k, t):
@@ -166,12 +178,31 @@ def prob_reliability_model(data, renewable):
     m.unit_FC_backup = pyo.Param(m.dis_pn, m.year, within=pyo.NonNegativeReals, initialize=data['unit_FC_backup']) # unit: M$/MW 
     m.unit_VC_backup = pyo.Param(m.dis_pn, m.year, within=pyo.NonNegativeReals, initialize=data['unit_VC_backup']) # unit: M$/MW 
 
-    m.prob = pyo.Param(m.state, within=pyo.NonNegativeReals, initialize=data['prob'])
-    m.state_indicator_gen = pyo.Param(m.node, m.dis_pn, m.state, within=pyo.NonNegativeReals, initialize=data['state_indicator_gen'])   
-    m.state_indicator_line = pyo.Param(m.line, m.state, within=pyo.NonNegativeReals, initialize=data['state_indicator_line'])
-    m.state_indicator_backup = pyo.Param(m.node, m.dis_pn, m.state, within=pyo.NonNegativeReals, initialize=data['state_indicator_backup'])   
+    m.prob = pyo.Param(m.state, within=pyo.NonNegativeReals, initialize=data['prob'], mutable=mutable)
+    m.state_indicator_gen = pyo.Param(m.node, m.dis_pn, m.state, within=pyo.NonNegativeReals, default=1, initialize=failures_to_indicator(data['state_failed_gen']))   
+    m.state_indicator_line = pyo.Param(m.line, m.state, within=pyo.NonNegativeReals, default=1, initialize=failures_to_indicator(data['state_failed_line']))
+    m.state_indicator_backup = pyo.Param(m.node, m.dis_pn, m.state, within=pyo.NonNegativeReals, default=1, initialize=failures_to_indicator(data['state_failed_backup']))   
 
-    m.UD_penalty = pyo.Param(within=pyo.NonNegativeReals, initialize=data['UD_penalty'])
+    m.UD_penalty = pyo.Param(within=pyo.NonNegativeReals, initialize=data['UD_penalty'], mutable=mutable)
+    m.max_LOLE = pyo.Param(within=pyo.NonNegativeReals, initialize=data['max_LOLE'], mutable=mutable, doc='LOLE limit (h/year)')
+
+
+    # Sparse index sets of the operation: a component that failed in a state produces no power and
+    # carries no flow, so its (component, state) combinations are left out of the model
+    failed_gen = failures_by_component(data['state_failed_gen'])
+    failed_backup = failures_by_component(data['state_failed_backup'])
+    failed_line = failures_by_component(data['state_failed_line'])
+
+    available_gen = {(i,k): [st for st in m.state if st not in failed_gen.get((i,k), ())] for i in m.node for k in m.generator}
+    available_backup = {(i,k): [st for st in m.state if st not in failed_backup.get((i,k), ())] for i in m.node for k in m.dis_pn}
+    available_line = {(l,): [st for st in m.state if st not in failed_line.get(l, ())] for l in m.line}
+    periods = list(itertools.product(m.year, m.rpdn, m.sub))
+
+    m.ppd_index = pyo.Set(dimen=6, initialize=_available_index(available_gen, periods), doc='(node, generator, year, rpdn, sub, state) of the generators available')
+    m.dispatch_index = pyo.Set(dimen=6, initialize=_available_index(available_gen, periods, 1, m.dispatch_gen))
+    m.renewable_index = pyo.Set(dimen=6, initialize=_available_index(available_gen, periods, 1, m.renewable_gen))
+    m.ppd_b_index = pyo.Set(dimen=6, initialize=_available_index(available_backup, periods), doc='(node, dis_pn, year, rpdn, sub, state) of the backups available')
+    m.flow_index = pyo.Set(dimen=5, initialize=_available_index(available_line, periods), doc='(line, year, rpdn, sub, state) of the lines available')
 
     # Bounds
     m.ub_IC_backup = pyo.Param(m.dis_pn, m.year, within=pyo.NonNegativeReals, initialize=data['ub_IC_backup'])
@@ -195,20 +226,47 @@ def prob_reliability_model(data, renewable):
     m.cap_b = pyo.Var(m.node, m.dis_pn, m.year, within=pyo.NonNegativeReals, doc='Capacity of backup generators available')
     m.ICB = pyo.Var(m.node, m.dis_pn, m.year, bounds=_bounds_IC_backup_rule, within=pyo.NonNegativeReals, doc='Investment cost of backup generator')
 
-    m.cap_sv = pyo.Var(m.node, m.generator, m.year, m.state, within=pyo.NonNegativeReals, doc='Generation capacity survived in state')
-    m.cap_sv_b = pyo.Var(m.node, m.dis_pn, m.year, m.state, within=pyo.NonNegativeReals, doc='Backup capacity survived in state')
-    m.cap_sv_line = pyo.Var(m.line, m.year, m.state, within=pyo.NonNegativeReals, doc='Line capacity survived in state')
-    m.ppd = pyo.Var(m.node, m.generator, m.year, m.rpdn, m.sub, m.state, within=pyo.NonNegativeReals, doc='Power produced from the main generator in state')
-    m.ppd_b = pyo.Var(m.node, m.dis_pn, m.year, m.rpdn, m.sub, m.state, within=pyo.NonNegativeReals, doc='Power produced from the backup in state')
-    m.flow = pyo.Var(m.line, m.year, m.rpdn, m.sub, m.state, within=pyo.Reals, doc='Power flow in state')
-    m.flow_pos = pyo.Var(m.line, m.year, m.rpdn, m.sub, m.state, within=pyo.NonNegativeReals, doc='Positive power flow in state')
-    m.flow_neg = pyo.Var(m.line, m.year, m.rpdn, m.sub, m.state, within=pyo.NonPositiveReals, doc='Negative power flow in state')            
+    if compact:
+        # Survived capacities as expressions, no variables nor defining equalities (zero for failed components)
+        @m.Expression(m.node, m.generator, m.year, m.state, doc='Generation capacity survived in state')
+        def cap_sv(m, i, k, t, st):
+            if k in m.dis_pn:
+                return m.cap_ava[i,k,t] if m.state_indicator_gen[i,k,st] else 0
+            return m.cap_ava[i,k,t]
+
+        @m.Expression(m.node, m.dis_pn, m.year, m.state, doc='Backup capacity survived in state')
+        def cap_sv_b(m, i, k, t, st):
+            return m.cap_b[i,k,t] if m.state_indicator_backup[i,k,st] else 0
+
+        @m.Expression(m.line, m.year, m.state, doc='Line capacity survived in state')
+        def cap_sv_line(m, l, t, st):
+            return m.cap_ava_line[l,t] if m.state_indicator_line[l,st] else 0
+
+    else:
+        m.cap_sv = pyo.Var(m.node, m.generator, m.year, m.state, within=pyo.NonNegativeReals, doc='Generation capacity survived in state')
+        m.cap_sv_b = pyo.Var(m.node, m.dis_pn, m.year, m.state, within=pyo.NonNegativeReals, doc='Backup capacity survived in state')
+        m.cap_sv_line = pyo.Var(m.line, m.year, m.state, within=pyo.NonNegativeReals, doc='Line capacity survived in state')
+
+    m.ppd = pyo.Var(m.ppd_index, within=pyo.NonNegativeReals, doc='Power produced from the main generator in state')
+    m.ppd_b = pyo.Var(m.ppd_b_index, within=pyo.NonNegativeReals, doc='Power produced from the backup in state')
+    m.flow = pyo.Var(m.flow_index, within=pyo.Reals, doc='Power flow in state')
+    m.flow_pos = pyo.Var(m.flow_index, within=pyo.NonNegativeReals, doc='Positive power flow in state')
+    m.flow_neg = pyo.Var(m.flow_index, within=pyo.NonPositiveReals, doc='Negative power flow in state')            
     m.ls = pyo.Var(m.node, m.year, m.rpdn, m.sub, m.state, within=pyo.NonNegativeReals, bounds=_bounds_load_shedding_rule, doc='Load shedding in state')
     m.over_gen = pyo.Var(m.node, m.year, m.rpdn, m.sub, m.state, within=pyo.NonNegativeReals, doc='Over-generation in state')
     
-    m.LOLE = pyo.Var(m.node, m.year, m.rpdn, m.sub, m.state, within=pyo.NonNegativeReals, bounds=_bounds_LOLE_rule, doc='LOLE in state')
+    # Areas the loss of load is indicated for: the nodes, or the zones grouping them
+    if zones is None:
+        area = m.node
+    else:
+        zone_of = {i: 'system' for i in m.node} if zones == 'system' else zones
+        m.zone = pyo.Set(initialize=list(dict.fromkeys(zone_of[i] for i in m.node)))
+        m.zone_node = pyo.Set(m.zone, within=m.node, initialize={z: [i for i in m.node if zone_of[i] == z] for z in m.zone})
+        area = m.zone
+
+    m.LOLE = pyo.Var(area, m.year, m.rpdn, m.sub, m.state, within=pyo.NonNegativeReals, bounds=_bounds_LOLE_rule, doc='LOLE in state')
     m.EENS = pyo.Var(m.node, m.year, m.rpdn, m.sub, m.state, within=pyo.NonNegativeReals, bounds=_bounds_EENS_rule, doc='EENS in state')
-    m.TLOLE = pyo.Var(m.node, m.year, m.rpdn, m.sub, within=pyo.NonNegativeReals, doc='Total LOLE')
+    m.TLOLE = pyo.Var(area, m.year, m.rpdn, m.sub, within=pyo.NonNegativeReals, doc='Total LOLE')
     m.TEENS = pyo.Var(m.node, m.year, m.rpdn, m.sub, within=pyo.NonNegativeReals, doc='Total EENS')        
 
             
@@ -244,77 +302,78 @@ def prob_reliability_model(data, renewable):
     # m.availability_capacity_gen.pprint()        
     
 
-    @m.Constraint(m.node, m.dis_pn, m.year, m.state)
-    def dis_survived_main_capacity_pn(m, i, k, t, st):
-        return m.cap_sv[i,k,t,st] == m.state_indicator_gen[i,k,st] * m.cap_ava[i,k,t] 
-    
-    @m.Constraint(m.node, m.res_pn, m.year, m.state)
-    def res_survived_main_capacity_ex(m, i, k, t, st):
-        return m.cap_sv[i,k,t,st] == m.cap_ava[i,k,t]                 
-    
+    if not compact:
+        @m.Constraint(m.node, m.dis_pn, m.year, m.state)
+        def dis_survived_main_capacity_pn(m, i, k, t, st):
+            return m.cap_sv[i,k,t,st] == m.state_indicator_gen[i,k,st] * m.cap_ava[i,k,t] 
+        
+        @m.Constraint(m.node, m.res_pn, m.year, m.state)
+        def res_survived_main_capacity_ex(m, i, k, t, st):
+            return m.cap_sv[i,k,t,st] == m.cap_ava[i,k,t]                 
+        
 
-    @m.Constraint(m.node, m.gen_ex, m.year, m.state)
-    def survived_main_capacity_ex(m, i, k, t, st):
-        return m.cap_sv[i,k,t,st] == m.cap_ava[i,k,t]         
-    
-    
-    @m.Constraint(m.node, m.dis_pn, m.year, m.state)
-    def survived_backup_capacity(m, i, k, t, st):
-        return m.cap_sv_b[i,k,t,st] == m.state_indicator_backup[i,k,st] * m.cap_b[i,k,t]        
-    
-    
-    @m.Constraint(m.line, m.year, m.state)
-    def survived_capacity_line(m, l, t, st):
-        return m.cap_sv_line[l,t,st] == m.state_indicator_line[l,st] * m.cap_ava_line[l,t]        
+        @m.Constraint(m.node, m.gen_ex, m.year, m.state)
+        def survived_main_capacity_ex(m, i, k, t, st):
+            return m.cap_sv[i,k,t,st] == m.cap_ava[i,k,t]         
+        
+        
+        @m.Constraint(m.node, m.dis_pn, m.year, m.state)
+        def survived_backup_capacity(m, i, k, t, st):
+            return m.cap_sv_b[i,k,t,st] == m.state_indicator_backup[i,k,st] * m.cap_b[i,k,t]        
+        
+        
+        @m.Constraint(m.line, m.year, m.state)
+        def survived_capacity_line(m, l, t, st):
+            return m.cap_sv_line[l,t,st] == m.state_indicator_line[l,st] * m.cap_ava_line[l,t]        
     
             
     
-    @m.Constraint(m.node, m.dispatch_gen, m.year, m.rpdn, m.sub, m.state)
+    @m.Constraint(m.dispatch_index)
     def power_generation_lb(m, i, k, t, n, b, st):
         return m.min_opt_dpt[k] * m.cap_sv[i,k,t,st] <= m.ppd[i,k,t,n,b,st]
     
-    @m.Constraint(m.node, m.dispatch_gen, m.year, m.rpdn, m.sub, m.state)
+    @m.Constraint(m.dispatch_index)
     def power_generation_ub(m, i, k, t, n, b, st):
         return m.ppd[i,k,t,n,b,st] <= m.max_opt_dpt[k] * m.cap_sv[i,k,t,st]  
 
 
-    @m.Constraint(m.node, m.dis_pn, m.year, m.rpdn, m.sub, m.state)
+    @m.Constraint(m.ppd_b_index)
     def backup_power_generation_lb(m, i, k, t, n, b, st):
         return m.min_opt_dpt[k] * m.cap_sv_b[i,k,t,st] <= m.ppd_b[i,k,t,n,b,st]
     
-    @m.Constraint(m.node, m.dis_pn, m.year, m.rpdn, m.sub, m.state)
+    @m.Constraint(m.ppd_b_index)
     def backup_power_generation_ub(m, i, k, t, n, b, st):
         return m.ppd_b[i,k,t,n,b,st] <= m.max_opt_dpt[k] * m.cap_sv_b[i,k,t,st]  
     
     
-    @m.Constraint(m.node, m.dispatch_gen, m.year, m.rpdn, m.sub, m.state)
+    @m.Constraint(m.dispatch_index)
     def ramp_up_constraint_prob(m, i, k, t, n, b, st):
         if b == 1:
             return m.ppd[i,k,t,n,b,st] <= m.ramp_up[k] * m.cap_sv[i,k,t,st]  
         else:
             return m.ppd[i,k,t,n,b,st] - m.ppd[i,k,t,n,b-1,st] <= m.ramp_up[k] * m.cap_sv[i,k,t,st] 
 
-    @m.Constraint(m.node, m.dispatch_gen, m.year, m.rpdn, m.sub, m.state)
+    @m.Constraint(m.dispatch_index)
     def ramp_down_constraint_prob(m, i, k, t, n, b, st):
         if b == 1:
             return -m.ppd[i,k,t,n,b,st] <= m.ramp_down[k] * m.cap_sv[i,k,t,st] 
         else:
             return m.ppd[i,k,t,n,b-1,st] - m.ppd[i,k,t,n,b,st] <= m.ramp_down[k] * m.cap_sv[i,k,t,st]          
 
-    @m.Constraint(m.node, m.renewable_gen, m.year, m.rpdn, m.sub, m.state)
+    @m.Constraint(m.renewable_index)
     def res_power_generation(m, i, k, t, n, b, st):
         return m.ppd[i,k,t,n,b,st] == m.capacity_factor[i,t,n,b] * m.cap_sv[i,k,t,st]  
 
 
 
-    @m.Constraint(m.node, m.dis_pn, m.year, m.rpdn, m.sub, m.state)
+    @m.Constraint(m.ppd_b_index)
     def backup_ramp_up_constraint_prob(m, i, k, t, n, b, st):
         if b == 1:
             return m.ppd_b[i,k,t,n,b,st] <= m.ramp_up[k] * m.cap_sv_b[i,k,t,st]  
         else:
             return m.ppd_b[i,k,t,n,b,st] - m.ppd_b[i,k,t,n,b-1,st] <= m.ramp_up[k] * m.cap_sv_b[i,k,t,st] 
 
-    @m.Constraint(m.node, m.dis_pn, m.year, m.rpdn, m.sub, m.state)
+    @m.Constraint(m.ppd_b_index)
     def backup_ramp_down_constraint_prob(m, i, k, t, n, b, st):
         if b == 1:
             return -m.ppd_b[i,k,t,n,b,st] <= m.ramp_down[k] * m.cap_sv_b[i,k,t,st] 
@@ -322,57 +381,121 @@ def prob_reliability_model(data, renewable):
             return m.ppd_b[i,k,t,n,b-1,st] - m.ppd_b[i,k,t,n,b,st] <= m.ramp_down[k] * m.cap_sv_b[i,k,t,st]   
         
 
-    @m.Constraint(m.line, m.year, m.rpdn, m.sub, m.state)
+    @m.Constraint(m.flow_index)
     def flows_lb(m, l, t, n, b, st):
         return -m.cap_sv_line[l,t,st] <= m.flow[l,t,n,b,st]
     
-    @m.Constraint(m.line, m.year, m.rpdn, m.sub, m.state)
+    @m.Constraint(m.flow_index)
     def flows_ub(m, l, t, n, b, st):
         return m.flow[l,t,n,b,st] <= m.cap_sv_line[l,t,st]     
     
 
-    @m.Constraint(m.line, m.year, m.rpdn, m.sub, m.state)
+    @m.Constraint(m.flow_index)
     def flows_pos_neg(m, l, t, n, b, st):
         return m.flow[l,t,n,b,st] == m.flow_pos[l,t,n,b,st] + m.flow_neg[l,t,n,b,st]           
         
     
     @m.Constraint(m.node, m.year, m.rpdn, m.sub, m.state)
     def nodal_power_balance(m, i, t, n, b, st):
-        return sum(m.ppd[i,k,t,n,b,st] for k in m.generator) + sum(m.ppd_b[i,k,t,n,b,st] for k in m.dis_pn) + sum(m.flow[l,t,n,b,st] for l in m.line_to_node[i]) + m.ls[i,t,n,b,st] == \
-                m.load_demand[i,t,n,b] + sum(m.flow[l,t,n,b,st] for l in m.line_fr_node[i]) + m.over_gen[i,t,n,b,st]
+        supply = [m.ppd[i,k,t,n,b,st] for k in m.generator if (i,k,t,n,b,st) in m.ppd_index] + \
+            [m.ppd_b[i,k,t,n,b,st] for k in m.dis_pn if (i,k,t,n,b,st) in m.ppd_b_index] + \
+                [m.flow[l,t,n,b,st] for l in m.line_to_node[i] if (l,t,n,b,st) in m.flow_index] + [m.ls[i,t,n,b,st]]
+        demand = [m.flow[l,t,n,b,st] for l in m.line_fr_node[i] if (l,t,n,b,st) in m.flow_index] + [m.over_gen[i,t,n,b,st]]
+        return linear_sum(supply + demand, [1] * len(supply) + [-1] * len(demand)) == m.load_demand[i,t,n,b]
     # m.nodel_power_balance.pprint()           
     
     
     ## LOLE and EENS evaluation
-    @m.Disjunct(m.node, m.year, m.rpdn, m.sub, m.state)
-    def load_shdding_yes(disj, i, t, n, b, st):
-        disj.load_shedding_state = pyo.Constraint(expr= m.ls[i,t,n,b,st] >= 0.00002)
-        disj.LOLE_state = pyo.Constraint(expr= m.LOLE[i,t,n,b,st] == m.operation_time[b])
-        disj.EENS_state = pyo.Constraint(expr= m.EENS[i,t,n,b,st] == m.ls[i,t,n,b,st])
+    def _area_ls(a, t, n, b, st):
+        # Load shedding of a node, or of all the nodes of a zone
+        if zones is None:
+            return m.ls[a,t,n,b,st]
+        return linear_sum([m.ls[i,t,n,b,st] for i in m.zone_node[a]])
+
+    @m.Disjunct(area, m.year, m.rpdn, m.sub, m.state)
+    def load_shdding_yes(disj, a, t, n, b, st):
+        disj.load_shedding_state = pyo.Constraint(expr= _area_ls(a,t,n,b,st) >= 0.00002)
+        disj.LOLE_state = pyo.Constraint(expr= m.LOLE[a,t,n,b,st] == m.operation_time[b])
+        if zones is None:
+            disj.EENS_state = pyo.Constraint(expr= m.EENS[a,t,n,b,st] == m.ls[a,t,n,b,st])
     # m.load_shdding_yes[1,1,1,1,1].pprint()
 
-    @m.Disjunct(m.node, m.year, m.rpdn, m.sub, m.state)
-    def load_shdding_no(disj, i, t, n, b, st):
-        disj.load_shedding_state_no = pyo.Constraint(expr= m.ls[i,t,n,b,st] <= 0.00001)
-        disj.LOLE_state_no = pyo.Constraint(expr= m.LOLE[i,t,n,b,st] == 0)
-        disj.EENS_state_no = pyo.Constraint(expr= m.EENS[i,t,n,b,st] == 0)
+    @m.Disjunct(area, m.year, m.rpdn, m.sub, m.state)
+    def load_shdding_no(disj, a, t, n, b, st):
+        disj.load_shedding_state_no = pyo.Constraint(expr= _area_ls(a,t,n,b,st) <= 0.00001)
+        disj.LOLE_state_no = pyo.Constraint(expr= m.LOLE[a,t,n,b,st] == 0)
+        if zones is None:
+            disj.EENS_state_no = pyo.Constraint(expr= m.EENS[a,t,n,b,st] == 0)
     # m.load_shdding_no[1,1,1,1,1].pprint()
         
-    @m.Disjunction(m.node, m.year, m.rpdn, m.sub, m.state)
-    def Ornot_load_shedding(m, i, t, n, b, st):
-        return [m.load_shdding_yes[i,t,n,b,st], m.load_shdding_no[i,t,n,b,st]]        
+    @m.Disjunction(area, m.year, m.rpdn, m.sub, m.state)
+    def Ornot_load_shedding(m, a, t, n, b, st):
+        return [m.load_shdding_yes[a,t,n,b,st], m.load_shdding_no[a,t,n,b,st]]        
 
-    @m.Constraint(m.node, m.year, m.rpdn, m.sub)
-    def total_LOLE(m, i, t, n, b):
-        return m.TLOLE[i,t,n,b] == sum(m.prob[st] * m.LOLE[i,t,n,b,st] for st in m.state)
+    if zones is not None:
+        # The indicators of the zones do not say which node sheds load, so EENS is the load shedding of every node
+        @m.Constraint(m.node, m.year, m.rpdn, m.sub, m.state)
+        def EENS_state(m, i, t, n, b, st):
+            return m.EENS[i,t,n,b,st] == m.ls[i,t,n,b,st]
+
+    @m.Constraint(area, m.year, m.rpdn, m.sub)
+    def total_LOLE(m, a, t, n, b):
+        return linear_sum([m.TLOLE[a,t,n,b]] + [m.LOLE[a,t,n,b,st] for st in m.state],
+                          [1] + [-m.prob[st] for st in m.state]) == 0
 
     @m.Constraint(m.node, m.year, m.rpdn, m.sub)
     def total_EENS(m, i, t, n, b):
-        return m.TEENS[i,t,n,b] == sum(m.prob[st] * m.EENS[i,t,n,b,st] for st in m.state)
+        return linear_sum([m.TEENS[i,t,n,b]] + [m.EENS[i,t,n,b,st] for st in m.state],
+                          [1] + [-m.prob[st] for st in m.state]) == 0
 
     @m.Constraint(m.year)
     def LOLE_limit(m, t):
-        return sum(m.weight_time[n] * m.TLOLE[i,t,n,b] for i in m.node for n in m.rpdn for b in m.sub) <= 2.4 
+        keys = [(a,n,b) for a in area for n in m.rpdn for b in m.sub]
+        return linear_sum([m.TLOLE[a,t,n,b] for (a,n,b) in keys], [m.weight_time[n] for (a,n,b) in keys]) <= m.max_LOLE
+
+
+    if cuts:
+        ## Capacity adequacy cuts, valid inequalities derived from the operation constraints and the data
+        def _supply_terms(i, t, n, b, st):
+            # (coefficient, capacity) bounding the production of node i with its survived capacities
+            return [(m.max_opt_dpt[k], m.cap_sv[i,k,t,st]) for k in m.dispatch_gen if (i,k,t,n,b,st) in m.ppd_index] + \
+                [(m.capacity_factor[i,t,n,b], m.cap_sv[i,k,t,st]) for k in m.renewable_gen if (i,k,t,n,b,st) in m.ppd_index] + \
+                [(m.max_opt_dpt[k], m.cap_sv_b[i,k,t,st]) for k in m.dis_pn if (i,k,t,n,b,st) in m.ppd_b_index]
+
+        # The survived capacity of a node and the capacity of its lines cover the demand not shed
+        @m.Constraint(m.node, m.year, m.rpdn, m.sub, m.state)
+        def capacity_adequacy(m, i, t, n, b, st):
+            terms = _supply_terms(i,t,n,b,st) + [(1, m.ls[i,t,n,b,st])] + \
+                [(1, m.cap_sv_line[l,t,st]) for l in list(m.line_to_node[i]) + list(m.line_fr_node[i]) if (l,t,n,b,st) in m.flow_index]
+            return linear_sum([v for _, v in terms], [c for c, _ in terms]) >= m.load_demand[i,t,n,b]
+
+        # Over the system the flows cancel
+        @m.Constraint(m.year, m.rpdn, m.sub, m.state)
+        def system_adequacy(m, t, n, b, st):
+            terms = [term for i in m.node for term in _supply_terms(i,t,n,b,st) + [(1, m.ls[i,t,n,b,st])]]
+            return linear_sum([v for _, v in terms], [c for c, _ in terms]) >= sum(m.load_demand[i,t,n,b] for i in m.node)
+
+        # Rounded system adequacy: the demand the existing generators cannot cover takes at least
+        # ceil(deficit / largest share) installations or areas shedding load, as each installation
+        # (at its maximum capacity) or area (its whole demand) covers at most the largest share.
+        # Its right-hand side is computed from the demand, so mutable models leave it out
+        if not mutable:
+            @m.Constraint(m.year, m.rpdn, m.sub, m.state)
+            def installation_cover(m, t, n, b, st):
+                existing = sum(value(m.max_opt_dpt[k] if k in m.dispatch_gen else m.capacity_factor[i,t,n,b]) * value(m.pre_cap[i,k])
+                               for i in m.node for k in m.gen_ex if (i,k,t,n,b,st) in m.ppd_index)
+                shares = [(value(m.max_opt_dpt[k] if k in m.dispatch_gen else m.capacity_factor[i,t,n,b]) * value(m.max_ins_cap[k]),
+                           m.gen_install[i,k,tq].binary_indicator_var)
+                          for i in m.node for k in m.gen_pn for tq in m.year if tq <= t and (i,k,t,n,b,st) in m.ppd_index] + \
+                    [(value(m.max_opt_dpt[k] * m.max_ins_cap_backup[k]), m.backup_install[i,k,tq].binary_indicator_var)
+                     for i in m.node for k in m.dis_pn for tq in m.year if tq <= t and (i,k,t,n,b,st) in m.ppd_b_index] + \
+                    [(sum(value(m.load_demand[i,t,n,b]) for i in (m.zone_node[a] if zones is not None else [a])),
+                      m.load_shdding_yes[a,t,n,b,st].binary_indicator_var) for a in area]
+                deficit = sum(value(m.load_demand[i,t,n,b]) for i in m.node) - existing - 0.00001 * len(area)
+                largest = max((u for u, _ in shares), default=0)
+                if deficit <= 0 or largest <= 0:
+                    return pyo.Constraint.Skip
+                return linear_sum([y for _, y in shares]) >= math.ceil(deficit / largest - 1e-9)
 
 
     if renewable == True:
@@ -388,90 +511,100 @@ def prob_reliability_model(data, renewable):
             )          
 
     
-    @m.Expression()  # unit: M$
-    def capital_expenditure(m):
-        return sum(m.IC[i,k,t] for i in m.node for k in m.gen_pn for t in m.year) + sum(m.ICB[i,k,t] for i in m.node for k in m.dis_pn for t in m.year) +\
-            + sum(m.ICL[l,t] for l in m.line_pn for t in m.year)
-
     @m.Expression()
     def IC_generator(m):
-        return sum(m.IC[i,k,t] for i in m.node for k in m.gen_pn for t in m.year)
-    
+        return linear_sum([m.IC[i,k,t] for i in m.node for k in m.gen_pn for t in m.year])
+
     @m.Expression()
     def IC_line(m):
-        return sum(m.ICL[l,t] for l in m.line_pn for t in m.year)
+        return linear_sum([m.ICL[l,t] for l in m.line_pn for t in m.year])
 
     @m.Expression()
     def IC_backup(m):
-        return sum(m.ICB[i,k,t] for i in m.node for k in m.dis_pn for t in m.year)
-    
-    @m.Expression() 
-    def operating_expenses(m):
-        return sum(m.prob[st] * m.unit_FC[k,t] * m.cap_sv[i,k,t,st] for i in m.node for k in m.generator for t in m.year for st in m.state) + \
-            sum(m.prob[st] * m.unit_FC_line[l,t] * m.cap_sv_line[l,t,st] for l in m.line for t in m.year for st in m.state) +\
-                sum(m.prob[st] * m.unit_FC_backup[k,t] * m.cap_sv_b[i,k,t,st] for i in m.node for k in m.dis_pn for t in m.year for st in m.state) +\
-                    sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.unit_VC[k,t] * m.ppd[i,k,t,n,b,st] 
-                        for i in m.node for k in m.generator for t in m.year for n in m.rpdn for b in m.sub for st in m.state)/1000000 +\
-                            sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.unit_VC_backup[k,t] * m.ppd_b[i,k,t,n,b,st]
-                                for i in m.node for k in m.dis_pn for t in m.year for n in m.rpdn for b in m.sub for st in m.state)/1000000 +\
-                                    sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.unit_VC_line[l,t] * (m.flow_pos[l,t,n,b,st] - m.flow_neg[l,t,n,b,st])  
-                                        for l in m.line for t in m.year for n in m.rpdn for b in m.sub for st in m.state)/1000000
+        return linear_sum([m.ICB[i,k,t] for i in m.node for k in m.dis_pn for t in m.year])
+
+    @m.Expression()  # unit: M$
+    def capital_expenditure(m):
+        return m.IC_generator + m.IC_line + m.IC_backup
+
 
     @m.Expression()
     def FOC_generator(m):
-        return sum(m.prob[st] * m.unit_FC[k,t] * m.cap_sv[i,k,t,st] for i in m.node for k in m.generator for t in m.year for st in m.state) 
+        keys = [(i,k,t,st) for i in m.node for k in m.generator for t in m.year for st in m.state]
+        return linear_sum([m.cap_sv[i,k,t,st] for (i,k,t,st) in keys], [m.prob[st] * m.unit_FC[k,t] for (i,k,t,st) in keys])
 
     @m.Expression()
     def FOC_line(m):
-        return sum(m.prob[st] * m.unit_FC_line[l,t] * m.cap_sv_line[l,t,st] for l in m.line for t in m.year for st in m.state)
+        keys = [(l,t,st) for l in m.line for t in m.year for st in m.state]
+        return linear_sum([m.cap_sv_line[l,t,st] for (l,t,st) in keys], [m.prob[st] * m.unit_FC_line[l,t] for (l,t,st) in keys])
 
     @m.Expression()
     def FOC_backup(m):
-        return sum(m.prob[st] * m.unit_FC_backup[k,t] * m.cap_sv_b[i,k,t,st] for i in m.node for k in m.dis_pn for t in m.year for st in m.state)
-    
-    
+        keys = [(i,k,t,st) for i in m.node for k in m.dis_pn for t in m.year for st in m.state]
+        return linear_sum([m.cap_sv_b[i,k,t,st] for (i,k,t,st) in keys], [m.prob[st] * m.unit_FC_backup[k,t] for (i,k,t,st) in keys])
+
     @m.Expression()
     def VOC_generator(m):
-        return sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.unit_VC[k,t] * m.ppd[i,k,t,n,b,st] 
-                    for i in m.node for k in m.generator for t in m.year for n in m.rpdn for b in m.sub for st in m.state)/1000000 
+        return linear_sum([m.ppd[i,k,t,n,b,st] for (i,k,t,n,b,st) in m.ppd_index],
+                          [m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.unit_VC[k,t] / 1000000
+                           for (i,k,t,n,b,st) in m.ppd_index])
 
     @m.Expression()
     def VOC_backup(m):
-        return sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.unit_VC_backup[k,t] * m.ppd_b[i,k,t,n,b,st]
-                    for i in m.node for k in m.dis_pn for t in m.year for n in m.rpdn for b in m.sub for st in m.state)/1000000 
+        return linear_sum([m.ppd_b[i,k,t,n,b,st] for (i,k,t,n,b,st) in m.ppd_b_index],
+                          [m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.unit_VC_backup[k,t] / 1000000
+                           for (i,k,t,n,b,st) in m.ppd_b_index])
 
     @m.Expression()
     def VOC_line(m):
-        return sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.unit_VC_line[l,t] * (m.flow_pos[l,t,n,b,st] - m.flow_neg[l,t,n,b,st])  
-                    for l in m.line for t in m.year for n in m.rpdn for b in m.sub for st in m.state)/1000000  
-                
+        coefs = [m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.unit_VC_line[l,t] / 1000000
+                 for (l,t,n,b,st) in m.flow_index]
+        return linear_sum([m.flow_pos[key] for key in m.flow_index] + [m.flow_neg[key] for key in m.flow_index],
+                          coefs + [-c for c in coefs])
+
+    @m.Expression() # unit: M$
+    def operating_expenses(m):
+        return m.FOC_generator + m.FOC_line + m.FOC_backup + m.VOC_generator + m.VOC_backup + m.VOC_line
+
 
     @m.Expression() # unit: M$
     def EENS_penalties(m):
-        return sum(m.weight_time[n] * m.operation_time[b] * m.UD_penalty * m.TEENS[i,t,n,b] for i in m.node for t in m.year for n in m.rpdn for b in m.sub)/1000     
-            
+        keys = [(i,t,n,b) for i in m.node for t in m.year for n in m.rpdn for b in m.sub]
+        return linear_sum([m.TEENS[i,t,n,b] for (i,t,n,b) in keys],
+                          [m.weight_time[n] * m.operation_time[b] * m.UD_penalty / 1000 for (i,t,n,b) in keys])
+
+
+    # The objective is composed of the cost aggregates above, so each large sum is generated once
     @m.Objective(sense=pyo.minimize)   # unit: M$
     def obj(m):
-        return sum(m.IC[i,k,t] for i in m.node for k in m.gen_pn for t in m.year) + \
-            sum(m.ICB[i,k,t] for i in m.node for k in m.dis_pn for t in m.year) + sum(m.ICL[l,t] for l in m.line_pn for t in m.year) +\
-                sum(m.prob[st] * m.unit_FC[k,t] * m.cap_sv[i,k,t,st] for i in m.node for k in m.generator for t in m.year for st in m.state) + \
-                    sum(m.prob[st] * m.unit_FC_line[l,t] * m.cap_sv_line[l,t,st] for l in m.line for t in m.year for st in m.state) +\
-                        sum(m.prob[st] * m.unit_FC_backup[k,t] * m.cap_sv_b[i,k,t,st] for i in m.node for k in m.dis_pn for t in m.year for st in m.state) +\
-                            sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.unit_VC[k,t] * m.ppd[i,k,t,n,b,st] 
-                                for i in m.node for k in m.generator for t in m.year for n in m.rpdn for b in m.sub for st in m.state)/1000000 +\
-                                    sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.unit_VC_backup[k,t] * m.ppd_b[i,k,t,n,b,st]
-                                        for i in m.node for k in m.dis_pn for t in m.year for n in m.rpdn for b in m.sub for st in m.state)/1000000 +\
-                                            sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.unit_VC_line[l,t] * (m.flow_pos[l,t,n,b,st] - m.flow_neg[l,t,n,b,st]) 
-                                                for l in m.line for t in m.year for n in m.rpdn for b in m.sub for st in m.state)/1000000 +\
-                                                    sum(m.weight_time[n] * m.operation_time[b] * m.UD_penalty * m.TEENS[i,t,n,b] for i in m.node for t in m.year for n in m.rpdn for b in m.sub)/1000     
+        return m.capital_expenditure + m.operating_expenses + m.EENS_penalties
 
 
-    transformation_string = 'gdp.bigm'
-    pyo.TransformationFactory(transformation_string).apply_to(m)
+    if presolve:
+        presolve_disjuncts(m, load_shedding=presolve == 'load_shedding')
+
+    transformation_string = 'gdp.' + transformation
+    if transformation == 'bigm':
+        pyo.TransformationFactory(transformation_string).apply_to(m, bigM=bigm_values(m))
+    else:
+        pyo.TransformationFactory(transformation_string).apply_to(m)
+
+    if mutable:
+        # bigm_values derives the M values of the load shedding disjuncts from the demand, so the demand
+        # can be lowered but not raised above these values without rebuilding the model
+        m.bigm_demand = pyo.Param(m.node, m.year, m.rpdn, m.sub, within=pyo.NonNegativeReals, initialize=data['load_demand'])
 
     
     return m
 
+
+
+def _available_index(available, periods, position=None, components=None):
+    # (component..., year, rpdn, sub, state) for every period and every state the component is available in,
+    # available: {(component...): [states]}, components: only the ones with that label at position
+    return [c + p + (st,) for c, states in available.items() if components is None or c[position] in components
+            for p in periods for st in states]
+
 if __name__ == "__main__":
     formulation = 'dual-yes'    # no, reserve, n-1, n-2, dual-no, dual-yes
     renewable_status = False
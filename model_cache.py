@@ -0,0 +1,170 @@
+import os
+import glob
+import gzip
+import json
+import shutil
+import hashlib
+import tempfile
+from data_utilities import CaseTables, CACHE_FOLDER, _file_hash, _write_atomic
+from example_data import read_data, read_prod_data
+from no_model import no_reliability_model
+from reserve_model import reserve_reliability_model
+from n_k_model import n_k_reliability_model
+from prob_model import prob_reliability_model
+
+
+# Folder (inside the cache folder of each case) holding the transformed model files
+MODEL_CACHE_FOLDER = os.path.join(CACHE_FOLDER, 'models')
+
+# Modules defining the data and the models, a change in any of them gives new model files
+SOURCE_FILES = ['data_utilities.py', 'example_data.py', 'utilities.py', 'no_model.py', 'reserve_model.py', 'n_k_model.py', 'prob_model.py']
+
+BUILDERS = {'no': no_reliability_model, 'reserve': reserve_reliability_model,
+            'n-1': n_k_reliability_model, 'n-2': n_k_reliability_model,
+            'dual-no': prob_reliability_model, 'dual-yes': prob_reliability_model, 'prod': prob_reliability_model}
+
+
+def model_key(datafolder, advanced, renewable, **options):
+    """
+    Hash identifying a transformed model: the content of the CSV files the formulation reads,
+    the formulation, the renewable flag, the builder options (compact, ...) and the source of
+    the data and model modules.
+    """
+
+    curPath = os.path.join(os.path.abspath(os.path.curdir), 'data2', datafolder)
+    tables = CaseTables(curPath, advanced)
+    sourcePath = os.path.dirname(os.path.abspath(__file__))
+
+    h = hashlib.blake2b(digest_size=10)
+    h.update(json.dumps({'advanced': advanced, 'renewable': renewable, 'options': options}, sort_keys=True).encode())
+    for name in sorted(tables.files):
+        # Optional tables of the manifest (e.g. the sparse failure lists) may not be in the case folder
+        path = os.path.join(curPath, f"{name}.csv")
+        h.update(f'{name}:{_file_hash(path) if os.path.exists(path) else "missing"}'.encode())
+    for source in SOURCE_FILES:
+        h.update(f'{source}:{_file_hash(os.path.join(sourcePath, source))}'.encode())
+    return h.hexdigest()
+
+
+
+def cached_model_file(datafolder, advanced, renewable, file_format='lp', **options):
+    """
+    Returns the compressed model file of a case and formulation, and its symbol map.
+
+    On a miss the model is built with the builder of the formulation, transformed (gdp.bigm is
+    applied by the builders), and written with short solver labels. The symbol map links the
+    labels of the file to the Pyomo names of the variables. Files of the same case, formulation
+    and options with another key in the same format are removed.
+
+    Parameters:
+        datafolder (str): Case folder in data2 -> e.g. 'Illustrative' or 'San Diego'
+        advanced (str): Type of reliability modelings -> 'no', 'reserve', 'n-1', 'n-2', 'dual-no', 'dual-yes', 'prod'
+        renewable (bool): Whether the renewable constraint is included or not
+        file_format (str): 'lp' or 'mps'
+        options: Keyword arguments of the builder (compact=True, ...)
+
+    Returns:
+        tuple: Paths of the model file (.lp.gz or .mps.gz) and of its symbol map (.lp.json.gz or .mps.json.gz)
+    """
+
+    curPath = os.path.join(os.path.abspath(os.path.curdir), 'data2', datafolder)
+    prefix = '_'.join([advanced, f'res-{renewable}'] + [f'{k}-{v}' for k, v in sorted(options.items())])
+    key = model_key(datafolder, advanced, renewable, **options)
+
+    model_path = os.path.join(curPath, MODEL_CACHE_FOLDER, f'{prefix}-{key}.{file_format}.gz')
+    symbols_path = os.path.join(curPath, MODEL_CACHE_FOLDER, f'{prefix}-{key}.{file_format}.json.gz')
+    if os.path.exists(model_path) and os.path.exists(symbols_path):
+        return model_path, symbols_path
+
+    data = read_prod_data(datafolder) if advanced == 'prod' else read_data(datafolder, advanced)
+    m = BUILDERS[advanced](data, renewable, **options)
+    write_model_file(m, model_path, symbols_path, file_format)
+
+    # Only the files of this format are replaced, the labels of an lp and an mps file differ
+    for old_path in glob.glob(os.path.join(curPath, MODEL_CACHE_FOLDER, f'{glob.escape(prefix)}-*.{file_format}.*')):
+        if old_path not in [model_path, symbols_path]:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+    return model_path, symbols_path
+
+
+
+def write_model_file(m, model_path, symbols_path, file_format='lp'):
+    # The writer needs a file name, the file is written uncompressed to a temporary folder first
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_path = os.path.join(tmp_folder, f'model.{file_format}')
+        _, smap_id = m.write(tmp_path, io_options={'symbolic_solver_labels': False})
+        symbol_map = m.solutions.symbol_map[smap_id]
+        symbols = {symbol: obj.name for symbol, obj in symbol_map.bySymbol.items() if obj.is_variable_type()}
+
+        with open(tmp_path, 'rb') as src:
+            _write_atomic(model_path, lambda f: _gzip_copy(src, f))
+
+    _write_atomic(symbols_path, lambda f: _gzip_copy(None, f, json.dumps(symbols).encode()))
+
+
+def _gzip_copy(src, f, content=None):
+    with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=6) as gz:
+        if content is None:
+            shutil.copyfileobj(src, gz)
+        else:
+            gz.write(content)
+
+
+
+def solve_model_file(model_path, symbols_path, time_limit, abs_gap):
+    """
+    Solves a cached model file with Gurobi, without building the Pyomo model.
+
+    Returns:
+        dict: Objective value and the solution by Pyomo variable name (e.g. 'cap_ins[1,1,1]')
+    """
+    import time
+    import gurobipy as gp
+
+    with gzip.open(symbols_path, 'rt') as f:
+        symbols = json.load(f)
+
+    # Gurobi reads the compressed file directly
+    model = gp.read(model_path)
+    model.Params.TimeLimit = time_limit
+    model.Params.MIPGap = abs_gap
+    model.Params.Threads = 8
+
+    # Solve the model and track time
+    start_time = time.time()
+    model.optimize()
+    solve_time = time.time() - start_time
+
+    print(f"\nSolve time: {solve_time:.2f} seconds")
+
+    if model.SolCount == 0:
+        return {'objective': None, 'values': {}}
+
+    values = {symbols[v.VarName]: v.X for v in model.getVars() if v.VarName in symbols}
+    return {'objective': model.ObjVal, 'values': values}
+
+
+
+def solve_cached(datafolder, advanced, renewable, time_limit, abs_gap, **options):
+    """
+    Solves a case and formulation from the model file cache, the model is only built when
+    the cache has no file for the current data and code.
+    """
+
+    model_path, symbols_path = cached_model_file(datafolder, advanced, renewable, **options)
+    solution = solve_model_file(model_path, symbols_path, time_limit, abs_gap)
+    print("Objective", None if solution['objective'] is None else round(solution['objective'], 2))
+    return solution
+
+
+
+if __name__ == "__main__":
+    datafolder = "Illustrative"
+    advanced = "dual-no"
+    renewable_status = False
+
+    solution = solve_cached(datafolder, advanced, renewable_status, time_limit=1000, abs_gap=0.01)
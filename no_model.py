@@ -2,9 +2,12 @@ __author__ = "Seolhee Cho"
 
 import pyomo.environ as pyo
 from example_data import read_data
-from utilities import solve_model
+from utilities import solve_model, linear_sum, bigm_values, presolve_disjuncts
 
-def no_reliability_model(data, renewable):
+def no_reliability_model(data, renewable, mutable=False, transformation='bigm', presolve=True):
+    # mutable=True declares load_demand, res_target as mutable Params, to be changed in place with update_model
+    # transformation: GDP reformulation applied to the disjunctions -> 'bigm', 'hull', 'mbigm', 'binary_multiplication'
+    # presolve=True fixes the installations decided by the data before the transformation (see presolve_disjuncts)
     
     m = pyo.ConcreteModel()
     
@@ -39,7 +42,7 @@ def no_reliability_model(data, renewable):
     m.max_ins_cap = pyo.Param(m.gen_pn, within=pyo.NonNegativeReals, initialize=data['max_ins_cap'])
     m.min_line = pyo.Param(m.line_pn, within=pyo.NonNegativeReals, initialize=data['min_line'])
     m.max_line = pyo.Param(m.line_pn, within=pyo.NonNegativeReals, initialize=data['max_line'])
-    m.load_demand = pyo.Param(m.node, m.year, m.rpdn, m.sub, within=pyo.NonNegativeReals, initialize=data['load_demand'])
+    m.load_demand = pyo.Param(m.node, m.year, m.rpdn, m.sub, within=pyo.NonNegativeReals, initialize=data['load_demand'], mutable=mutable)
     m.capacity_factor = pyo.Param(m.node, m.year, m.rpdn, m.sub, within=pyo.NonNegativeReals, initialize=data['capacity_factor'])
     m.min_opt_dpt = pyo.Param(m.dispatch_gen, within=pyo.NonNegativeReals, initialize=data['min_opt_dpt'])
     m.max_opt_dpt = pyo.Param(m.dispatch_gen, within=pyo.NonNegativeReals, initialize=data['max_opt_dpt'])
@@ -54,7 +57,7 @@ def no_reliability_model(data, renewable):
     m.unit_FC_line = pyo.Param(m.line, m.year, within=pyo.NonNegativeReals, initialize=data['unit_FC_line']) # unit: M$/MW    
     m.unit_VC = pyo.Param(m.generator, m.year, within=pyo.NonNegativeReals, initialize=data['unit_VC'])   # unit: $/MWh  
     m.unit_VC_line = pyo.Param(m.line, m.year, within=pyo.NonNegativeReals, initialize=data['unit_VC_line'])   # unit: $/MWh
-    m.res_target = pyo.Param(m.year, within=pyo.NonNegativeReals, initialize=data['res_target'])
+    m.res_target = pyo.Param(m.year, within=pyo.NonNegativeReals, initialize=data['res_target'], mutable=mutable)
    
     # Bounds
     def _bounds_cap_ins_rule(m, i, k, t):
@@ -206,8 +209,9 @@ def no_reliability_model(data, renewable):
     
     @m.Constraint(m.node, m.year, m.rpdn, m.sub)
     def nodal_power_balance(m, i, t, n, b):
-        return sum(m.ppd[i,k,t,n,b] for k in m.generator) + sum(m.flow[l,t,n,b] for l in m.line_to_node[i]) == \
-                m.load_demand[i,t,n,b] + sum(m.flow[l,t,n,b] for l in m.line_fr_node[i]) + m.over_gen[i,t,n,b]
+        supply = [m.ppd[i,k,t,n,b] for k in m.generator] + [m.flow[l,t,n,b] for l in m.line_to_node[i]]
+        demand = [m.flow[l,t,n,b] for l in m.line_fr_node[i]] + [m.over_gen[i,t,n,b]]
+        return linear_sum(supply + demand, [1] * len(supply) + [-1] * len(demand)) == m.load_demand[i,t,n,b]
     # m.nodel_power_balance.pprint()                
 
 
@@ -224,59 +228,61 @@ def no_reliability_model(data, renewable):
             )
 
 
-    @m.Expression()  # unit: M$
-    def capital_expenditure(m):
-        return sum(m.IC[i,k,t] for i in m.node for k in m.gen_pn for t in m.year) + sum(m.ICL[l,t] for l in m.line_pn for t in m.year)
-    
     @m.Expression()
     def IC_generator(m):
-        return sum(m.IC[i,k,t] for i in m.node for k in m.gen_pn for t in m.year)
-    
+        return linear_sum([m.IC[i,k,t] for i in m.node for k in m.gen_pn for t in m.year])
+
     @m.Expression()
     def IC_line(m):
-        return sum(m.ICL[l,t] for l in m.line_pn for t in m.year) 
-    
-    @m.Expression() # unit: M$
-    def operating_expenses(m):
-        return sum(m.unit_FC[k,t] * m.cap_ava[i,k,t] for i in m.node for k in m.generator for t in m.year) + \
-            sum(m.unit_FC_line[l,t] * m.cap_ava_line[l,t] for l in m.line for t in m.year) +\
-                sum(m.weight_time[n] * m.operation_time[b] * m.unit_VC[k,t] * m.ppd[i,k,t,n,b] 
-                    for i in m.node for k in m.generator for t in m.year for n in m.rpdn for b in m.sub)/1000000 +\
-                    sum(m.weight_time[n] * m.operation_time[b] * m.unit_VC_line[l,t] * (m.flow_pos[l,t,n,b] - m.flow_neg[l,t,n,b])  
-                        for l in m.line for t in m.year for n in m.rpdn for b in m.sub)/1000000
+        return linear_sum([m.ICL[l,t] for l in m.line_pn for t in m.year])
+
+    @m.Expression()  # unit: M$
+    def capital_expenditure(m):
+        return m.IC_generator + m.IC_line
+
 
     @m.Expression() # unit: M$
     def FOC_generator(m):
-        return sum(m.unit_FC[k,t] * m.cap_ava[i,k,t] for i in m.node for k in m.generator for t in m.year)
+        keys = [(i,k,t) for i in m.node for k in m.generator for t in m.year]
+        return linear_sum([m.cap_ava[i,k,t] for (i,k,t) in keys], [m.unit_FC[k,t] for (i,k,t) in keys])
 
     @m.Expression() # unit: M$
     def FOC_line(m):
-        return sum(m.unit_FC_line[l,t] * m.cap_ava_line[l,t] for l in m.line for t in m.year)
-    
+        keys = [(l,t) for l in m.line for t in m.year]
+        return linear_sum([m.cap_ava_line[l,t] for (l,t) in keys], [m.unit_FC_line[l,t] for (l,t) in keys])
+
     @m.Expression() # unit: M$
     def VOC_generator(m):
-        return sum(m.weight_time[n] * m.operation_time[b] * m.unit_VC[k,t] * m.ppd[i,k,t,n,b] 
-                    for i in m.node for k in m.generator for t in m.year for n in m.rpdn for b in m.sub)/1000000 
-    
+        keys = [(i,k,t,n,b) for i in m.node for k in m.generator for t in m.year for n in m.rpdn for b in m.sub]
+        return linear_sum([m.ppd[i,k,t,n,b] for (i,k,t,n,b) in keys],
+                          [m.weight_time[n] * m.operation_time[b] * m.unit_VC[k,t] / 1000000 for (i,k,t,n,b) in keys])
+
     @m.Expression() # unit: M$
     def VOC_line(m):
-        return sum(m.weight_time[n] * m.operation_time[b] * m.unit_VC_line[l,t] * (m.flow_pos[l,t,n,b] - m.flow_neg[l,t,n,b])  
-                    for l in m.line for t in m.year for n in m.rpdn for b in m.sub)/1000000       
+        keys = [(l,t,n,b) for l in m.line for t in m.year for n in m.rpdn for b in m.sub]
+        coefs = [m.weight_time[n] * m.operation_time[b] * m.unit_VC_line[l,t] / 1000000 for (l,t,n,b) in keys]
+        return linear_sum([m.flow_pos[l,t,n,b] for (l,t,n,b) in keys] + [m.flow_neg[l,t,n,b] for (l,t,n,b) in keys],
+                          coefs + [-c for c in coefs])
 
-            
+    @m.Expression() # unit: M$
+    def operating_expenses(m):
+        return m.FOC_generator + m.FOC_line + m.VOC_generator + m.VOC_line
+
+
+    # The objective is composed of the cost aggregates above, so each large sum is generated once
     @m.Objective(sense=pyo.minimize)   # unit: M$
     def obj(m):
-        return sum(m.IC[i,k,t] for i in m.node for k in m.gen_pn for t in m.year) + sum(m.ICL[l,t] for l in m.line_pn for t in m.year) +\
-                sum(m.unit_FC[k,t] * m.cap_ava[i,k,t] for i in m.node for k in m.generator for t in m.year) + \
-                    sum(m.unit_FC_line[l,t] * m.cap_ava_line[l,t] for l in m.line for t in m.year) +\
-                        sum(m.weight_time[n] * m.operation_time[b] * m.unit_VC[k,t] * m.ppd[i,k,t,n,b] 
-                            for i in m.node for k in m.generator for t in m.year for n in m.rpdn for b in m.sub)/1000000 +\
-                                sum(m.weight_time[n] * m.operation_time[b] * m.unit_VC_line[l,t] * (m.flow_pos[l,t,n,b] - m.flow_neg[l,t,n,b]) 
-                                    for l in m.line for t in m.year for n in m.rpdn for b in m.sub)/1000000
+        return m.capital_expenditure + m.operating_expenses
+
 
+    if presolve:
+        presolve_disjuncts(m)
 
-    transformation_string = 'gdp.bigm'
-    pyo.TransformationFactory(transformation_string).apply_to(m)
+    transformation_string = 'gdp.' + transformation
+    if transformation == 'bigm':
+        pyo.TransformationFactory(transformation_string).apply_to(m, bigM=bigm_values(m))
+    else:
+        pyo.TransformationFactory(transformation_string).apply_to(m)
        
     return m
 
@@ -0,0 +1,765 @@
+__author__ = "Seolhee Cho"
+
+import os
+import json
+import itertools
+import tempfile
+import multiprocessing
+from collections import namedtuple
+from collections.abc import Mapping
+import numpy as np
+import scipy.sparse as sp
+from example_data import read_data
+from utilities import solve_matrix_model
+
+
+# Value of one entry of a matrix variable, read like a Pyomo variable (var.value)
+VarValue = namedtuple('VarValue', ['value'])
+
+
+class MatrixVar(Mapping):
+    """
+    Variable of a MatrixModel, a block of columns with one axis per index.
+
+    It reads like an indexed Pyomo variable, m.cap_ins[i,k,t].value and m.cap_ins.items(),
+    so the results can be passed to export_results the same way.
+
+    Parameters:
+        model (MatrixModel): Model the columns belong to
+        axes (list): Labels of each axis, in the order of the index
+        cols (ndarray): Column of every entry, one axis per index
+    """
+
+    def __init__(self, model, axes, cols):
+        self.model = model
+        self.axes = axes
+        self.cols = cols
+        self._positions = [{label: p for p, label in enumerate(labels)} for labels in axes]
+
+    def __getitem__(self, key):
+        key = key if isinstance(key, tuple) else (key,)
+        try:
+            col = self.cols[tuple(positions[label] for positions, label in zip(self._positions, key))]
+        except (KeyError, IndexError):
+            raise KeyError(key) from None
+
+        if len(key) != self.cols.ndim:
+            raise KeyError(key)
+
+        x = self.model.x
+        return VarValue(None if x is None else x[col].item())
+
+    def __iter__(self):
+        keys = itertools.product(*self.axes)
+        return keys if len(self.axes) > 1 else (key[0] for key in keys)
+
+    def __len__(self):
+        return self.cols.size
+
+    def items(self):
+        # Index tuples (also for one-dimensional variables), as the Pyomo variables give them
+        x = self.model.x
+        for key, col in zip(itertools.product(*self.axes), self.cols.ravel()):
+            yield key, VarValue(None if x is None else x[col].item())
+
+    def values_array(self):
+        # Solution values with one axis per index
+        return self.model.x[self.cols]
+
+
+
+class MatrixModel:
+    """
+    Linear model assembled directly as sparse matrices:  min c x  s.t.  A x (sense) rhs,  lb <= x <= ub.
+
+    Variables are blocks of columns and constraints are blocks of rows, both shaped like their
+    index sets, so a constraint family is added with NumPy index arithmetic instead of one
+    Pyomo expression per index. The variables are available as attributes (m.cap_ins, m.ppd, ...).
+    """
+
+    def __init__(self):
+        self.variables = {}
+        self.constraints = {}
+        self.n_cols = 0
+        self.n_rows = 0
+        self.x = None
+        self.objective = None
+
+        self._lb, self._ub, self._vtype = [], [], []
+        self._sense, self._rhs = [], []
+        self._rows, self._cols, self._vals = [], [], []
+        self._obj_cols, self._obj_vals = [], []
+
+        # First column of a block and the variables of the model it continues (see block)
+        self._col_start = 0
+        self._linked = set()
+
+    def __getattr__(self, name):
+        variables = self.__dict__.get('variables', {})
+        if name in variables:
+            return variables[name]
+        raise AttributeError(name)
+
+    def add_var(self, name, axes, lb=0, ub=np.inf, vtype='C'):
+        shape = tuple(len(labels) for labels in axes)
+        cols = self.n_cols + np.arange(int(np.prod(shape))).reshape(shape)
+        self.n_cols += cols.size
+
+        self._lb.append(np.broadcast_to(np.asarray(lb, dtype=float), shape).ravel())
+        self._ub.append(np.broadcast_to(np.asarray(ub, dtype=float), shape).ravel())
+        self._vtype.append(np.full(cols.size, vtype))
+
+        self.variables[name] = MatrixVar(self, axes, cols)
+        return cols
+
+    def add_constraint(self, name, shape, sense, rhs=0):
+        rows = self.n_rows + np.arange(int(np.prod(shape))).reshape(shape)
+        self.n_rows += rows.size
+
+        self._sense.append(np.full(rows.size, sense))
+        self._rhs.append(np.broadcast_to(np.asarray(rhs, dtype=float), shape).ravel())
+
+        self.constraints[name] = rows
+        return rows
+
+    def add_terms(self, rows, cols, vals=1.0):
+        # Coefficients vals of columns cols in rows rows, broadcast against each other
+        rows, cols, vals = np.broadcast_arrays(rows, cols, np.asarray(vals, dtype=float))
+        self._rows.append(rows.ravel())
+        self._cols.append(cols.ravel())
+        self._vals.append(vals.ravel())
+
+    def add_disjunct_constraint(self, name, indicator, terms, sense, rhs=0, M=None):
+        """
+        Adds a constraint that only holds when the binary indicator is 1, in the big-M form of gdp.bigm.
+
+        M is the bound of the body over the variable bounds, so the relaxed row is redundant
+        when the indicator is 0:  body + M y >= rhs + M  (M = min body - rhs)  for '>', and
+        body + M y <= rhs + M  (M = max body - rhs)  for '<'. Equalities get both rows.
+
+        Parameters:
+            indicator (ndarray): Column of the binary indicator of every row
+            terms (list): (cols, vals) of the body, each broadcast to the shape of indicator
+            M (tuple): M of the '>' and '<' rows (as in bigm_values), derived from the variable bounds when None
+        """
+
+        shape = indicator.shape
+        rhs = np.broadcast_to(np.asarray(rhs, dtype=float), shape)
+        lb = np.concatenate(self._lb)
+        ub = np.concatenate(self._ub)
+
+        body_lb, body_ub = np.zeros(shape), np.zeros(shape)
+        for cols, vals in terms:
+            cols, vals = np.broadcast_arrays(cols, np.asarray(vals, dtype=float))
+            body_lb = body_lb + np.where(vals > 0, vals * lb[cols], vals * ub[cols])
+            body_ub = body_ub + np.where(vals > 0, vals * ub[cols], vals * lb[cols])
+
+        bounds = {'>': body_lb - rhs, '<': body_ub - rhs}
+        if M is not None:
+            bounds.update({s: np.broadcast_to(np.asarray(Ms, dtype=float), shape) for s, Ms in zip(['>', '<'], M) if Ms is not None})
+
+        for s in (['>', '<'] if sense == '=' else [sense]):
+            Ms = bounds[s]
+            if not np.isfinite(Ms).all():
+                raise ValueError(f"Cannot compute big-M of {name}, the body is not bounded")
+
+            rows = self.add_constraint(name + ({'>': '_lb', '<': '_ub'}[s] if sense == '=' else ''), shape, s, rhs + Ms)
+            for cols, vals in terms:
+                self.add_terms(rows, cols, vals)
+            self.add_terms(rows, indicator, Ms)
+
+    def add_objective(self, cols, vals=1.0):
+        cols, vals = np.broadcast_arrays(cols, np.asarray(vals, dtype=float))
+        self._obj_cols.append(cols.ravel())
+        self._obj_vals.append(vals.ravel())
+
+    def fix(self, name, values):
+        # Fixes every entry of a variable (lb = ub = values, shaped like the variable)
+        cols = self.variables[name].cols.ravel()
+        values = np.broadcast_to(np.asarray(values, dtype=float), self.variables[name].cols.shape).ravel()
+        lb, ub = np.concatenate(self._lb), np.concatenate(self._ub)
+        lb[cols] = values
+        ub[cols] = values
+        self._lb, self._ub = [lb], [ub]
+
+    def matrices(self):
+        """
+        Returns:
+            tuple: A (csr_matrix), sense (array of '<', '>', '='), rhs, c, lb, ub, vtype (array of 'C', 'B')
+        """
+
+        A = sp.csr_matrix(
+            (np.concatenate(self._vals), (np.concatenate(self._rows), np.concatenate(self._cols))),
+            shape=(self.n_rows, self.n_cols),
+        )
+        A.eliminate_zeros()
+
+        c = np.zeros(self.n_cols)
+        np.add.at(c, np.concatenate(self._obj_cols), np.concatenate(self._obj_vals))
+
+        return (A, np.concatenate(self._sense), np.concatenate(self._rhs), c,
+                np.concatenate(self._lb), np.concatenate(self._ub), np.concatenate(self._vtype))
+
+    def value(self, name):
+        return self.variables[name].values_array()
+
+    def block(self):
+        """
+        Empty model continuing the columns of this one, for a part of the model built apart (e.g. in
+        a worker process), written with write_block and added back with add_blocks. Its terms can use
+        the variables of this model.
+        """
+
+        b = MatrixModel()
+        b.variables = dict(self.variables)
+        b.n_cols = self.n_cols
+        b._lb, b._ub, b._vtype = [np.concatenate(self._lb)], [np.concatenate(self._ub)], [np.concatenate(self._vtype)]
+        b._col_start = self.n_cols
+        b._linked = set(self.variables)
+        return b
+
+    def write_block(self, path):
+        # Own columns, rows and terms of a block as a fragment file (.npz), the rows numbered from 0
+        start = self._col_start
+        own = [name for name in self.variables if name not in self._linked]
+
+        meta = {'col_start': start,
+                'variables': {name: self.variables[name].axes for name in own},
+                'constraints': list(self.constraints)}
+        arrays = {f'var_{name}': self.variables[name].cols for name in own}
+        arrays.update({f'con_{name}': rows for name, rows in self.constraints.items()})
+
+        np.savez(path, meta=json.dumps(meta),
+                 lb=np.concatenate(self._lb)[start:], ub=np.concatenate(self._ub)[start:], vtype=np.concatenate(self._vtype)[start:],
+                 sense=np.concatenate(self._sense), rhs=np.concatenate(self._rhs),
+                 rows=np.concatenate(self._rows), cols=np.concatenate(self._cols), vals=np.concatenate(self._vals),
+                 obj_cols=np.concatenate(self._obj_cols), obj_vals=np.concatenate(self._obj_vals), **arrays)
+
+    def add_blocks(self, paths):
+        """
+        Adds the fragments written by write_block, in order. The own columns of every block are moved
+        after the columns of this model, and the variables and constraints of the blocks are joined
+        along their last axis (the states).
+        """
+
+        variables, constraints = {}, {}
+        for path in paths:
+            with np.load(path) as f:
+                meta = json.loads(f['meta'].item())
+                start = meta['col_start']
+                col_shift, row_shift = self.n_cols - start, self.n_rows
+
+                cols, lb, sense = f['cols'], f['lb'], f['sense']
+                self._rows.append(f['rows'] + row_shift)
+                self._cols.append(np.where(cols >= start, cols + col_shift, cols))
+                self._vals.append(f['vals'])
+                self._obj_cols.append(f['obj_cols'] + col_shift)
+                self._obj_vals.append(f['obj_vals'])
+                self._lb.append(lb)
+                self._ub.append(f['ub'])
+                self._vtype.append(f['vtype'])
+                self._sense.append(sense)
+                self._rhs.append(f['rhs'])
+
+                for name, axes in meta['variables'].items():
+                    variables.setdefault(name, []).append((axes, f[f'var_{name}'] + col_shift))
+                for name in meta['constraints']:
+                    constraints.setdefault(name, []).append(f[f'con_{name}'] + row_shift)
+
+                self.n_cols += len(lb)
+                self.n_rows += len(sense)
+
+        for name, parts in variables.items():
+            axes = parts[0][0][:-1] + [[label for part_axes, _ in parts for label in part_axes[-1]]]
+            self.variables[name] = MatrixVar(self, axes, np.concatenate([cols for _, cols in parts], axis=-1))
+        for name, parts in constraints.items():
+            self.constraints[name] = np.concatenate(parts, axis=-1)
+
+
+
+def _param_array(param, *axes):
+    # Values of a parameter over the given sets, one axis per set
+    keys = itertools.product(*axes)
+    values = [param[key] for key in keys] if len(axes) > 1 else [param[key[0]] for key in keys]
+    return np.array(values, dtype=float).reshape([len(labels) for labels in axes])
+
+
+def _indicator_array(failures, components, states):
+    # 0/1 availability of every component in every state, from the failure lists {state: [component]}
+    positions = {c: p for p, c in enumerate(components)}
+    state_positions = {st: p for p, st in enumerate(states)}
+
+    indicator = np.ones((len(components), len(states)))
+    for st, failed in failures.items():
+        for c in failed:
+            indicator[positions[c], state_positions[st]] = 0
+    return indicator
+
+
+def _positions(labels, within):
+    positions = {label: p for p, label in enumerate(within)}
+    return np.array([positions[label] for label in labels], dtype=int)
+
+
+
+def prob_reliability_matrix_model(data, renewable, workers=1, fragment_folder=None, zones=None):
+    """
+    Builds the probabilistic model of prob_model.prob_reliability_model as sparse matrices.
+
+    The variables, constraints and objective are the same as the Pyomo model after gdp.bigm,
+    with one binary per disjunct and the M values of bigm_values, but every family is assembled
+    over the whole index grid at once, so no Pyomo component or expression is created.
+
+    Everything indexed by the states only shares the capacities of the investment part, so with
+    workers > 1 the states are split into blocks built in worker processes, each written to a
+    numbered fragment file (state_block_0000.npz, ...). The fragments are added in order, then
+    the rows coupling the states (total_LOLE, total_EENS, LOLE_limit and the renewable target).
+
+    Parameters:
+        data (dict): Case data from read_data (dual-no or dual-yes)
+        renewable (bool): Whether the renewable constraint is included or not
+        workers (int): Number of processes building the state blocks, 1 builds the whole model in this process
+        fragment_folder (str): Folder the fragments are written to, a temporary folder removed after the assembly when None
+        zones: Loss of load indicated per node (None), for the whole system ('system') or per zone ({node: zone})
+
+    Returns:
+        MatrixModel: The model, to be solved with solve_matrix_model
+    """
+
+    m = MatrixModel()
+    p = _parameters(data, zones)
+
+    # Sets
+    node, gen_pn, dis_pn, gen_ex = p['node'], p['gen_pn'], p['dis_pn'], p['gen_ex']
+    line, line_pn, line_ex = p['line'], p['line_pn'], p['line_ex']
+    year, rpdn, sub, state = p['year'], p['rpdn'], p['sub'], p['state']
+
+    N, P, D, T = (len(s) for s in [node, gen_pn, dis_pn, year])
+    pn_g, dis_g, ex_g, pn_l, ex_l = p['pn_g'], p['dis_g'], p['ex_g'], p['pn_l'], p['ex_l']
+
+    # Kept on the model for reporting, like the sets and parameters of the Pyomo model
+    m.node, m.year, m.rpdn, m.sub, m.state = node, year, rpdn, sub, state
+    m.weight_time, m.operation_time = data['weight_time'], data['operation_time']
+
+
+    # Parameters
+    weight_time = p['weight_time']
+    operation_time = p['operation_time']
+    min_ins_cap = _param_array(data['min_ins_cap'], gen_pn)
+    max_ins_cap = _param_array(data['max_ins_cap'], gen_pn)
+    min_line = _param_array(data['min_line'], line_pn)
+    max_line = _param_array(data['max_line'], line_pn)
+    load_demand = p['load_demand']
+    pre_cap = _param_array(data['pre_cap'], node, gen_ex)
+    pre_cap_line = _param_array(data['pre_cap_line'], line_ex)
+    res_target = _param_array(data['res_target'], year)
+
+    unit_IC = _param_array(data['unit_IC'], gen_pn, year)
+    unit_IC_line = _param_array(data['unit_IC_line'], line_pn, year)
+    ub_IC = _param_array(data['ub_IC'], gen_pn, year)
+    ub_ICL = _param_array(data['ub_ICL'], line_pn, year)
+
+    min_ins_cap_backup = _param_array(data['min_ins_cap_backup'], dis_pn)
+    max_ins_cap_backup = _param_array(data['max_ins_cap_backup'], dis_pn)
+    unit_IC_backup = _param_array(data['unit_IC_backup'], dis_pn, year)
+    ub_IC_backup = _param_array(data['ub_IC_backup'], dis_pn, year)
+
+    prob = p['prob']
+    UD_penalty = data['UD_penalty']
+
+
+    # Variables
+    cap_ins = m.add_var('cap_ins', [node, gen_pn, year], ub=max_ins_cap[None, :, None])
+    cap_ins_line = m.add_var('cap_ins_line', [line_pn, year], ub=max_line[:, None])
+    cap_ava = m.add_var('cap_ava', [node, p['generator'], year])
+    cap_ava_line = m.add_var('cap_ava_line', [line, year])
+    IC = m.add_var('IC', [node, gen_pn, year], ub=ub_IC[None, :, :])
+    ICL = m.add_var('ICL', [line_pn, year], ub=ub_ICL)
+
+    cap_bn = m.add_var('cap_bn', [node, dis_pn, year], ub=max_ins_cap_backup[None, :, None])
+    cap_b = m.add_var('cap_b', [node, dis_pn, year])
+    ICB = m.add_var('ICB', [node, dis_pn, year], ub=ub_IC_backup[None, :, :])
+
+    TLOLE = m.add_var('TLOLE', [p['area'], year, rpdn, sub])
+    TEENS = m.add_var('TEENS', [node, year, rpdn, sub])
+
+    # Binary indicators of the disjuncts (the ones of load shedding are in the state blocks)
+    npn = np.zeros((N, P, T), dtype=bool)
+    for i_p, i in enumerate(node):
+        npn[i_p, _positions(data['node_npn_gen'].get(i, []), gen_pn), :] = True
+
+    gen_install = m.add_var('gen_install', [node, gen_pn, year], ub=np.where(npn, 0, 1), vtype='B')
+    gen_install_no = m.add_var('gen_install_no', [node, gen_pn, year], ub=1, vtype='B')
+    line_install = m.add_var('line_install', [line_pn, year], ub=1, vtype='B')
+    line_install_no = m.add_var('line_install_no', [line_pn, year], ub=1, vtype='B')
+    backup_install = m.add_var('backup_install', [node, dis_pn, year], ub=1, vtype='B')
+    backup_install_no = m.add_var('backup_install_no', [node, dis_pn, year], ub=1, vtype='B')
+
+
+    # CONSTRAINTS
+    ############################################################################################
+    ##                Investment of generators, batteries, and transmission lines             ##
+    ############################################################################################
+
+    ## Installation of generators (gen_pn that do not exist in a node keep gen_install at 0)
+    m.add_disjunct_constraint('install_cap_res1', gen_install, [(cap_ins, 1)], '>', min_ins_cap[None, :, None])
+    m.add_disjunct_constraint('install_cap_res2', gen_install, [(cap_ins, 1)], '<', max_ins_cap[None, :, None])
+    m.add_disjunct_constraint('invest_cost_res', gen_install, [(IC, 1), (cap_ins, -unit_IC[None, :, :])], '=', M=(0, 0))
+    m.add_disjunct_constraint('invest_cost_res_no', gen_install_no, [(cap_ins, 1)], '=')
+    m.add_disjunct_constraint('install_cap_res_no', gen_install_no, [(IC, 1)], '=')
+
+    rows = m.add_constraint('Ornot_gen_install', (N, P, T), '=', 1)
+    m.add_terms(rows, gen_install)
+    m.add_terms(rows, gen_install_no)
+
+    ## Installation of transmission lines
+    m.add_disjunct_constraint('ins_cap_lb', line_install, [(cap_ins_line, 1)], '>', min_line[:, None])
+    m.add_disjunct_constraint('ins_cap_ub', line_install, [(cap_ins_line, 1)], '<', max_line[:, None])
+    m.add_disjunct_constraint('invest_cost', line_install, [(ICL, 1), (cap_ins_line, -unit_IC_line)], '=', M=(0, 0))
+    m.add_disjunct_constraint('ins_cap_no', line_install_no, [(cap_ins_line, 1)], '=')
+    m.add_disjunct_constraint('invest_cost_no', line_install_no, [(ICL, 1)], '=')
+
+    rows = m.add_constraint('Ornot_line_install', (len(line_pn), T), '=', 1)
+    m.add_terms(rows, line_install)
+    m.add_terms(rows, line_install_no)
+
+    ## Available capacity of generators and lines (cumulative installations up to year t)
+    cumulative = np.tril(np.ones((T, T)))
+
+    rows = m.add_constraint('availability_capacity_gen_pn', (N, P, T), '=')
+    m.add_terms(rows, cap_ava[:, pn_g, :])
+    m.add_terms(rows[..., None], cap_ins[:, :, None, :], -cumulative)
+
+    rows = m.add_constraint('availability_capacity_gen_ex', (N, len(gen_ex), T), '=', pre_cap[:, :, None])
+    m.add_terms(rows, cap_ava[:, ex_g, :])
+
+    rows = m.add_constraint('available_capacity_line_pn', (len(line_pn), T), '=')
+    m.add_terms(rows, cap_ava_line[pn_l, :])
+    m.add_terms(rows[..., None], cap_ins_line[:, None, :], -cumulative)
+
+    rows = m.add_constraint('available_capacity_line_ex', (len(line_ex), T), '=', pre_cap_line[:, None])
+    m.add_terms(rows, cap_ava_line[ex_l, :])
+
+
+    ############################################################################################
+    ##                    Operation of generators and transmission lines                      ##
+    ############################################################################################
+
+    ## Installation of backup generators
+    m.add_disjunct_constraint('install_cap_bk1', backup_install, [(cap_bn, 1)], '>', min_ins_cap_backup[None, :, None])
+    m.add_disjunct_constraint('install_cap_bk2', backup_install, [(cap_bn, 1)], '<', max_ins_cap_backup[None, :, None])
+    m.add_disjunct_constraint('invest_cost_bk', backup_install, [(ICB, 1), (cap_bn, -unit_IC_backup[None, :, :])], '=', M=(0, 0))
+    m.add_disjunct_constraint('invest_cost_bk_no', backup_install_no, [(cap_bn, 1)], '=')
+    m.add_disjunct_constraint('install_cap_bk_no', backup_install_no, [(ICB, 1)], '=')
+
+    rows = m.add_constraint('Ornot_backup_install', (N, D, T), '=', 1)
+    m.add_terms(rows, backup_install)
+    m.add_terms(rows, backup_install_no)
+
+    rows = m.add_constraint('availability_capacity_backup', (N, D, T), '=')
+    m.add_terms(rows, cap_b)
+    m.add_terms(rows[..., None], cap_bn[:, :, None, :], -cumulative)
+
+    rows = m.add_constraint('main_backup_capacity', (N, D, T), '<')
+    m.add_terms(rows, cap_b)
+    m.add_terms(rows, cap_ava[:, dis_g, :], -1)
+
+    ## Survived capacities, operation and load shedding of every state
+    if workers > 1:
+        _add_state_blocks(m, p, workers, fragment_folder)
+    else:
+        _add_state_block(m, p, slice(None))
+
+    ## Rows coupling the states
+    LOLE, EENS = m.LOLE.cols, m.EENS.cols
+
+    rows = m.add_constraint('total_LOLE', (len(p['area']), T, len(rpdn), len(sub)), '=')
+    m.add_terms(rows, TLOLE)
+    m.add_terms(rows[..., None], LOLE, -prob)
+
+    rows = m.add_constraint('total_EENS', (N, T, len(rpdn), len(sub)), '=')
+    m.add_terms(rows, TEENS)
+    m.add_terms(rows[..., None], EENS, -prob)
+
+    rows = m.add_constraint('LOLE_limit', (T,), '<', data['max_LOLE'])
+    m.add_terms(rows[None, :, None, None], TLOLE, weight_time[None, None, :, None])
+
+
+    if renewable == True:
+        st = state.index(1)
+        rows = m.add_constraint('renewable_gen_power', (T,), '>', res_target * load_demand.sum(axis=(0, 2, 3)))
+        m.add_terms(rows[None, None, :, None, None], m.ppd.cols[:, p['rg_g'], :, :, :, st])
+        m.add_terms(rows[None, :, None, None], m.over_gen.cols[..., st], -1)
+
+
+    # Objective (unit: M$), the same cost terms as prob_model (the operating costs are added with the states)
+    m.add_objective(IC)
+    m.add_objective(ICB)
+    m.add_objective(ICL)
+    m.add_objective(TEENS, weight_time[:, None] * operation_time * UD_penalty / 1000)
+
+
+    return m
+
+
+
+def _parameters(data, zones=None):
+    # Sets, positions in the sets and parameter arrays shared by the investment part and the state blocks
+    p = {s: data[s] for s in ['node', 'generator', 'gen_pn', 'dis_pn', 'res_pn', 'gen_ex', 'dispatch_gen', 'renewable_gen',
+                              'line', 'line_pn', 'line_ex', 'year', 'rpdn', 'sub', 'state']}
+    node, generator, dis_pn, dispatch_gen, line, year, rpdn, sub, state = \
+        (p[s] for s in ['node', 'generator', 'dis_pn', 'dispatch_gen', 'line', 'year', 'rpdn', 'sub', 'state'])
+
+    p['pn_g'] = _positions(p['gen_pn'], generator)
+    p['dis_g'] = _positions(dis_pn, generator)
+    p['res_g'] = _positions(p['res_pn'], generator)
+    p['ex_g'] = _positions(p['gen_ex'], generator)
+    p['dg_g'] = _positions(dispatch_gen, generator)
+    p['rg_g'] = _positions(p['renewable_gen'], generator)
+    p['dis_dg'] = _positions(dis_pn, dispatch_gen)
+    p['pn_l'] = _positions(p['line_pn'], line)
+    p['ex_l'] = _positions(p['line_ex'], line)
+
+    # (node, line, sign) of the lines entering (+1) and leaving (-1) every node
+    pairs = [(i_p, l, 1.0) for i_p, i in enumerate(node) for l in data['line_to_node'][i]] + \
+            [(i_p, l, -1.0) for i_p, i in enumerate(node) for l in data['line_fr_node'][i]]
+    node_p, line_p, sign = zip(*pairs) if pairs else ((), (), ())
+    p['line_node'] = np.array(node_p, dtype=int)
+    p['line_line'] = _positions(line_p, line)
+    p['line_sign'] = np.array(sign)
+
+    # Areas the loss of load is indicated for (the nodes, or the zones grouping them) and the positions of
+    # their nodes, padded to the largest area with node 0 and a 0 coefficient in area_valid
+    p['zones'] = zones
+    if zones is None:
+        p['area'] = list(node)
+        members = [[i_p] for i_p in range(len(node))]
+    else:
+        zone_of = {i: 'system' for i in node} if zones == 'system' else zones
+        p['area'] = list(dict.fromkeys(zone_of[i] for i in node))
+        members = [[i_p for i_p, i in enumerate(node) if zone_of[i] == z] for z in p['area']]
+    K = max(len(nodes) for nodes in members)
+    p['area_nodes'] = np.array([nodes + [0] * (K - len(nodes)) for nodes in members], dtype=int)
+    p['area_valid'] = np.array([[1.0] * len(nodes) + [0.0] * (K - len(nodes)) for nodes in members])
+
+    p['weight_time'] = _param_array(data['weight_time'], rpdn)
+    p['operation_time'] = _param_array(data['operation_time'], sub)
+    p['load_demand'] = _param_array(data['load_demand'], node, year, rpdn, sub)
+    p['capacity_factor'] = _param_array(data['capacity_factor'], node, year, rpdn, sub)
+    p['min_opt_dpt'] = _param_array(data['min_opt_dpt'], dispatch_gen)
+    p['max_opt_dpt'] = _param_array(data['max_opt_dpt'], dispatch_gen)
+    p['ramp_up'] = _param_array(data['ramp_up'], dispatch_gen)
+    p['ramp_down'] = _param_array(data['ramp_down'], dispatch_gen)
+
+    p['unit_FC'] = _param_array(data['unit_FC'], generator, year)
+    p['unit_FC_line'] = _param_array(data['unit_FC_line'], line, year)
+    p['unit_VC'] = _param_array(data['unit_VC'], generator, year)
+    p['unit_VC_line'] = _param_array(data['unit_VC_line'], line, year)
+    p['unit_FC_backup'] = _param_array(data['unit_FC_backup'], dis_pn, year)
+
+    N, D = len(node), len(dis_pn)
+    p['prob'] = _param_array(data['prob'], state)
+    p['state_indicator_gen'] = _indicator_array(data['state_failed_gen'], list(itertools.product(node, dis_pn)), state).reshape(N, D, len(state))
+    p['state_indicator_line'] = _indicator_array(data['state_failed_line'], line, state)
+    p['state_indicator_backup'] = _indicator_array(data['state_failed_backup'], list(itertools.product(node, dis_pn)), state).reshape(N, D, len(state))
+
+    return p
+
+
+
+def _add_state_block(m, p, st):
+    # Variables, constraints and objective terms of the states st (a slice of the states), which only
+    # share the available capacities (cap_ava, cap_b, cap_ava_line) of the investment part
+    node, generator, dis_pn, res_pn, gen_ex, dispatch_gen, renewable_gen, line, year, rpdn, sub = \
+        (p[s] for s in ['node', 'generator', 'dis_pn', 'res_pn', 'gen_ex', 'dispatch_gen', 'renewable_gen', 'line', 'year', 'rpdn', 'sub'])
+    state = p['state'][st]
+
+    N, D, T, R, B, S = (len(s) for s in [node, dis_pn, year, rpdn, sub, state])
+    dis_g, res_g, ex_g, dg_g, rg_g, dis_dg = (p[s] for s in ['dis_g', 'res_g', 'ex_g', 'dg_g', 'rg_g', 'dis_dg'])
+
+    # Parameters
+    weight_time, operation_time, load_demand, capacity_factor = \
+        p['weight_time'], p['operation_time'], p['load_demand'], p['capacity_factor']
+    min_opt_dpt, max_opt_dpt, ramp_up, ramp_down = p['min_opt_dpt'], p['max_opt_dpt'], p['ramp_up'], p['ramp_down']
+
+    prob = p['prob'][st]
+    state_indicator_gen = p['state_indicator_gen'][..., st]
+    state_indicator_line = p['state_indicator_line'][..., st]
+    state_indicator_backup = p['state_indicator_backup'][..., st]
+
+    cap_ava, cap_b, cap_ava_line = m.cap_ava.cols, m.cap_b.cols, m.cap_ava_line.cols
+
+
+    # Variables
+    cap_sv = m.add_var('cap_sv', [node, generator, year, state])
+    cap_sv_b = m.add_var('cap_sv_b', [node, dis_pn, year, state])
+    cap_sv_line = m.add_var('cap_sv_line', [line, year, state])
+    ppd = m.add_var('ppd', [node, generator, year, rpdn, sub, state])
+    ppd_b = m.add_var('ppd_b', [node, dis_pn, year, rpdn, sub, state])
+    flow = m.add_var('flow', [line, year, rpdn, sub, state], lb=-np.inf)
+    flow_pos = m.add_var('flow_pos', [line, year, rpdn, sub, state])
+    flow_neg = m.add_var('flow_neg', [line, year, rpdn, sub, state], lb=-np.inf, ub=0)
+    ls = m.add_var('ls', [node, year, rpdn, sub, state], ub=load_demand[..., None])
+    over_gen = m.add_var('over_gen', [node, year, rpdn, sub, state])
+
+    area = p['area']
+    LOLE = m.add_var('LOLE', [area, year, rpdn, sub, state], ub=operation_time[None, None, None, :, None])
+    EENS = m.add_var('EENS', [node, year, rpdn, sub, state], ub=load_demand[..., None])
+
+    load_shdding_yes = m.add_var('load_shdding_yes', [area, year, rpdn, sub, state], ub=1, vtype='B')
+    load_shdding_no = m.add_var('load_shdding_no', [area, year, rpdn, sub, state], ub=1, vtype='B')
+
+
+    ## Capacities survived in each state
+    rows = m.add_constraint('dis_survived_main_capacity_pn', (N, D, T, S), '=')
+    m.add_terms(rows, cap_sv[:, dis_g])
+    m.add_terms(rows, cap_ava[:, dis_g, :, None], -state_indicator_gen[:, :, None, :])
+
+    rows = m.add_constraint('res_survived_main_capacity_ex', (N, len(res_pn), T, S), '=')
+    m.add_terms(rows, cap_sv[:, res_g])
+    m.add_terms(rows, cap_ava[:, res_g, :, None], -1)
+
+    rows = m.add_constraint('survived_main_capacity_ex', (N, len(gen_ex), T, S), '=')
+    m.add_terms(rows, cap_sv[:, ex_g])
+    m.add_terms(rows, cap_ava[:, ex_g, :, None], -1)
+
+    rows = m.add_constraint('survived_backup_capacity', (N, D, T, S), '=')
+    m.add_terms(rows, cap_sv_b)
+    m.add_terms(rows, cap_b[..., None], -state_indicator_backup[:, :, None, :])
+
+    rows = m.add_constraint('survived_capacity_line', (len(line), T, S), '=')
+    m.add_terms(rows, cap_sv_line)
+    m.add_terms(rows, cap_ava_line[..., None], -state_indicator_line[:, None, :])
+
+    ## Generation limits and ramping, over node x gen x year x rpdn x sub x state
+    def _operation(prefix, ppd_cols, sv, gen_dg):
+        # ppd_cols: production columns, sv: survived capacity columns, gen_dg: positions of the generators in dispatch_gen
+        shape = ppd_cols.shape
+        sv = sv[:, :, :, None, None, :]
+        per_gen = (slice(None), None, None, None, None)
+
+        rows = m.add_constraint(f'{prefix}power_generation_lb', shape, '>')
+        m.add_terms(rows, ppd_cols)
+        m.add_terms(rows, sv, -min_opt_dpt[gen_dg][per_gen])
+
+        rows = m.add_constraint(f'{prefix}power_generation_ub', shape, '<')
+        m.add_terms(rows, ppd_cols)
+        m.add_terms(rows, sv, -max_opt_dpt[gen_dg][per_gen])
+
+        # Subperiod b is compared with b-1, the first subperiod only with the capacity
+        rows = m.add_constraint(f'{prefix}ramp_up_constraint_prob', shape, '<')
+        m.add_terms(rows, ppd_cols)
+        m.add_terms(rows[:, :, :, :, 1:], ppd_cols[:, :, :, :, :-1], -1)
+        m.add_terms(rows, sv, -ramp_up[gen_dg][per_gen])
+
+        rows = m.add_constraint(f'{prefix}ramp_down_constraint_prob', shape, '<')
+        m.add_terms(rows, ppd_cols, -1)
+        m.add_terms(rows[:, :, :, :, 1:], ppd_cols[:, :, :, :, :-1])
+        m.add_terms(rows, sv, -ramp_down[gen_dg][per_gen])
+
+    _operation('', ppd[:, dg_g], cap_sv[:, dg_g], np.arange(len(dispatch_gen)))
+    _operation('backup_', ppd_b, cap_sv_b, dis_dg)
+
+    rows = m.add_constraint('res_power_generation', (N, len(renewable_gen), T, R, B, S), '=')
+    m.add_terms(rows, ppd[:, rg_g])
+    m.add_terms(rows, cap_sv[:, rg_g, :, None, None, :], -capacity_factor[:, None, :, :, :, None])
+
+    ## Power flows
+    rows = m.add_constraint('flows_lb', flow.shape, '>')
+    m.add_terms(rows, flow)
+    m.add_terms(rows, cap_sv_line[:, :, None, None, :])
+
+    rows = m.add_constraint('flows_ub', flow.shape, '<')
+    m.add_terms(rows, flow)
+    m.add_terms(rows, cap_sv_line[:, :, None, None, :], -1)
+
+    rows = m.add_constraint('flows_pos_neg', flow.shape, '=')
+    m.add_terms(rows, flow)
+    m.add_terms(rows, flow_pos, -1)
+    m.add_terms(rows, flow_neg, -1)
+
+    ## Nodal power balance, the lines enter through the (node, line) pairs of the line maps
+    rows = m.add_constraint('nodal_power_balance', (N, T, R, B, S), '=', load_demand[..., None])
+    m.add_terms(rows[:, None], ppd)
+    m.add_terms(rows[:, None], ppd_b)
+    m.add_terms(rows, ls)
+    m.add_terms(rows, over_gen, -1)
+
+    if len(p['line_sign']):
+        m.add_terms(rows[p['line_node']], flow[p['line_line']], p['line_sign'][:, None, None, None, None])
+
+    ## LOLE and EENS evaluation (without load shedding EENS is 0 and ls at most 0.00001, which bounds the M of EENS_state)
+    area_ls = [(ls[p['area_nodes'][:, k]], p['area_valid'][:, k, None, None, None, None]) for k in range(p['area_nodes'].shape[1])]
+    m.add_disjunct_constraint('load_shedding_state', load_shdding_yes, area_ls, '>', 0.00002)
+    m.add_disjunct_constraint('LOLE_state', load_shdding_yes, [(LOLE, 1)], '=', operation_time[None, None, None, :, None])
+    if p['zones'] is None:
+        m.add_disjunct_constraint('EENS_state', load_shdding_yes, [(EENS, 1), (ls, -1)], '=', M=(-0.00001, 0))
+    m.add_disjunct_constraint('load_shedding_state_no', load_shdding_no, area_ls, '<', 0.00001)
+    m.add_disjunct_constraint('LOLE_state_no', load_shdding_no, [(LOLE, 1)], '=')
+    if p['zones'] is None:
+        m.add_disjunct_constraint('EENS_state_no', load_shdding_no, [(EENS, 1)], '=')
+    else:
+        # The indicators of the zones do not say which node sheds load, so EENS is the load shedding of every node
+        rows = m.add_constraint('EENS_state', (N, T, R, B, S), '=')
+        m.add_terms(rows, EENS)
+        m.add_terms(rows, ls, -1)
+
+    rows = m.add_constraint('Ornot_load_shedding', (len(area), T, R, B, S), '=', 1)
+    m.add_terms(rows, load_shdding_yes)
+    m.add_terms(rows, load_shdding_no)
+
+
+    # Operating costs of the states (unit: M$)
+    weighted_time = prob[None, None, :] * weight_time[:, None, None] * operation_time[None, :, None]    # rpdn x sub x state
+
+    m.add_objective(cap_sv, prob * p['unit_FC'][None, :, :, None])
+    m.add_objective(cap_sv_line, prob * p['unit_FC_line'][:, :, None])
+    m.add_objective(cap_sv_b, prob * p['unit_FC_backup'][None, :, :, None])
+    m.add_objective(ppd, weighted_time * p['unit_VC'][None, :, :, None, None, None] / 1000000)
+    m.add_objective(ppd_b, weighted_time * p['unit_VC'][dis_g][None, :, :, None, None, None] / 1000000)
+    m.add_objective(flow_pos, weighted_time * p['unit_VC_line'][:, :, None, None, None] / 1000000)
+    m.add_objective(flow_neg, -weighted_time * p['unit_VC_line'][:, :, None, None, None] / 1000000)
+
+
+
+# Investment part of the model and parameters, set in every worker process by _init_worker
+_WORKER = {}
+
+
+def _init_worker(m, p):
+    _WORKER['model'], _WORKER['params'] = m, p
+
+
+def _build_state_block(args):
+    # Builds the states st as a block of the investment part and writes it to the numbered fragment j
+    j, st, folder = args
+    b = _WORKER['model'].block()
+    _add_state_block(b, _WORKER['params'], st)
+
+    path = os.path.join(folder, f'state_block_{j:04d}.npz')
+    b.write_block(path)
+    return path
+
+
+def _add_state_blocks(m, p, workers, fragment_folder=None):
+    # A few blocks of consecutive states per worker, so that the workers finishing first take the next ones
+    S = len(p['state'])
+    chunks = np.array_split(np.arange(S), min(S, 4 * workers))
+    tasks = [(j, slice(c[0], c[-1] + 1)) for j, c in enumerate(chunks)]
+
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        folder = tmp_folder if fragment_folder is None else fragment_folder
+        os.makedirs(folder, exist_ok=True)
+
+        # The fragments are added in order while the next ones are still being built
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(m, p)) as pool:
+            m.add_blocks(pool.imap(_build_state_block, [(j, st, folder) for j, st in tasks]))
+
+
+if __name__ == "__main__":
+    formulation = 'dual-yes'    # dual-no, dual-yes
+    renewable_status = False
+    data = read_data(datafolder="San Diego", advanced=formulation)
+    m = prob_reliability_matrix_model(data, renewable=renewable_status)
+
+    m = solve_matrix_model(m, renewable=renewable_status, time_limit=1000, abs_gap=0.01)
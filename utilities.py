@@ -1,7 +1,11 @@
 import pyomo.environ as pyo
 from pyomo.environ import value
+from pyomo.core.base.var import VarData
+from pyomo.core.expr.numeric_expr import LinearExpression, MonomialTermExpression
+from pyomo.gdp import GDP_Error
 import pandas as pd
 import csv
+import numpy as np
 
 
 def solve_model(m, advanced, renewable, time_limit, abs_gap):
@@ -29,17 +33,17 @@ def solve_model(m, advanced, renewable, time_limit, abs_gap):
     # Print results to quickly check them
     if advanced in ['no','reserve']:
         for t in m.year:
-            print("Demand every year", round(sum(m.weight_time[n] * m.operation_time[b] * m.load_demand[i,t,n,b] 
-                                                 for i in m.node for n in m.rpdn for b in m.sub), 3),
-                  "Over generation", round(sum(m.weight_time[n] * m.operation_time[b] * m.over_gen[i,t,n,b].value 
-                                               for i in m.node for n in m.rpdn for b in m.sub), 2), 
-                  "Dispatch_power", round(sum(m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b].value 
-                                              for i in m.node for k in m.dispatch_gen for n in m.rpdn for b in m.sub), 2)
+            print("Demand every year", round(value(sum(m.weight_time[n] * m.operation_time[b] * m.load_demand[i,t,n,b] 
+                                                 for i in m.node for n in m.rpdn for b in m.sub)), 3),
+                  "Over generation", round(value(sum(m.weight_time[n] * m.operation_time[b] * m.over_gen[i,t,n,b].value 
+                                               for i in m.node for n in m.rpdn for b in m.sub)), 2), 
+                  "Dispatch_power", round(value(sum(m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b].value 
+                                              for i in m.node for k in m.dispatch_gen for n in m.rpdn for b in m.sub)), 2)
             )
 
             if renewable == True:
-                print("RES_power", round(sum(m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b].value 
-                                             for i in m.node for k in m.renewable_gen for n in m.rpdn for b in m.sub), 2)
+                print("RES_power", round(value(sum(m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b].value 
+                                             for i in m.node for k in m.renewable_gen for n in m.rpdn for b in m.sub)), 2)
                 )    
         
         print("CAPEX", round(pyo.value(m.capital_expenditure()), 2), 
@@ -55,17 +59,18 @@ def solve_model(m, advanced, renewable, time_limit, abs_gap):
 
     elif advanced in ['n-1','n-2']:
         for t in m.year:
-            print("Demand every year", round(sum(m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.load_demand[i,t,n,b] 
-                                                 for i in m.node for n in m.rpdn for b in m.sub for sc in m.scenario), 3),
-                "Over generation", round(sum(m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.over_gen[i,t,n,b,sc].value 
-                                             for i in m.node for n in m.rpdn for b in m.sub for sc in m.scenario), 2),
-                "Dispatch_power", round(sum(m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b,sc].value 
-                                            for i in m.node for k in m.dispatch_gen for n in m.rpdn for b in m.sub for sc in m.scenario), 2)
+            print("Demand every year", round(value(sum(m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.load_demand[i,t,n,b] 
+                                                 for i in m.node for n in m.rpdn for b in m.sub for sc in m.scenario)), 3),
+                "Over generation", round(value(sum(m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.over_gen[i,t,n,b,sc].value 
+                                             for i in m.node for n in m.rpdn for b in m.sub for sc in m.scenario)), 2),
+                "Dispatch_power", round(value(sum(m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b,sc].value 
+                                            for i in m.node for k in m.dispatch_gen for n in m.rpdn for b in m.sub for sc in m.scenario
+                                            if (i,k,t,n,b,sc) in m.ppd)), 2)
             )
             
             if renewable == True:
-                print("RES_power", round(sum(m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b,sc].value 
-                                             for i in m.node for k in m.renewable_gen for n in m.rpdn for b in m.sub for sc in m.scenario), 2)
+                print("RES_power", round(value(sum(m.scenario_rate[sc] * m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b,sc].value 
+                                             for i in m.node for k in m.renewable_gen for n in m.rpdn for b in m.sub for sc in m.scenario)), 2)
                 )
             
         print("CAPEX", round(pyo.value(m.capital_expenditure()), 2), 
@@ -81,21 +86,22 @@ def solve_model(m, advanced, renewable, time_limit, abs_gap):
 
     else:
         for t in m.year:
-            print("LOLE every year", round(sum(m.weight_time[n] * m.TLOLE[i,t,n,b].value 
-                                               for i in m.node for n in m.rpdn for b in m.sub), 3),
-                "EENS every year", round(sum(m.weight_time[n] * m.operation_time[b] * m.TEENS[i,t,n,b].value 
-                                             for i in m.node for n in m.rpdn for b in m.sub), 3),
-                "Demand every year", round(sum(m.weight_time[n] * m.operation_time[b] * m.load_demand[i,t,n,b] 
-                                               for i in m.node for n in m.rpdn for b in m.sub), 3),
-                "Over generation", round(sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.over_gen[i,t,n,b,st].value 
-                                             for i in m.node for n in m.rpdn for b in m.sub for st in m.state), 2),
-                "Dispatch_power", round(sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b,st].value 
-                                            for i in m.node for k in m.dispatch_gen for n in m.rpdn for b in m.sub for st in m.state), 2)
+            print("LOLE every year", round(value(sum(m.weight_time[n] * TLOLE.value 
+                                               for (a,tt,n,b), TLOLE in m.TLOLE.items() if tt == t)), 3),
+                "EENS every year", round(value(sum(m.weight_time[n] * m.operation_time[b] * m.TEENS[i,t,n,b].value 
+                                             for i in m.node for n in m.rpdn for b in m.sub)), 3),
+                "Demand every year", round(value(sum(m.weight_time[n] * m.operation_time[b] * m.load_demand[i,t,n,b] 
+                                               for i in m.node for n in m.rpdn for b in m.sub)), 3),
+                "Over generation", round(value(sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.over_gen[i,t,n,b,st].value 
+                                             for i in m.node for n in m.rpdn for b in m.sub for st in m.state)), 2),
+                "Dispatch_power", round(value(sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b,st].value 
+                                            for i in m.node for k in m.dispatch_gen for n in m.rpdn for b in m.sub for st in m.state
+                                            if (i,k,t,n,b,st) in m.ppd)), 2)
             )
             
             if renewable == True:
-                print("RES_power", round(sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b,st].value 
-                                             for i in m.node for k in m.renewable_gen for n in m.rpdn for b in m.sub for st in m.state), 2)
+                print("RES_power", round(value(sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b,st].value 
+                                             for i in m.node for k in m.renewable_gen for n in m.rpdn for b in m.sub for st in m.state)), 2)
                 )
             
         print("CAPEX", round(pyo.value(m.capital_expenditure()), 2), 
@@ -184,21 +190,22 @@ def solve_prob_model(m, renewable, time_limit, abs_gap):
     m.results = opt.solve(m, tee=True)
 
     for t in m.year:
-        print("LOLE every year", round(sum(m.weight_time[n] * m.TLOLE[i,t,n,b].value 
-                                            for i in m.node for n in m.rpdn for b in m.sub), 3),
-            "EENS every year", round(sum(m.weight_time[n] * m.operation_time[b] * m.TEENS[i,t,n,b].value 
-                                            for i in m.node for n in m.rpdn for b in m.sub), 3),
-            "Demand every year", round(sum(m.weight_time[n] * m.operation_time[b] * m.load_demand[i,t,n,b] 
-                                            for i in m.node for n in m.rpdn for b in m.sub), 3),
-            "Over generation", round(sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.over_gen[i,t,n,b,st].value 
-                                            for i in m.node for n in m.rpdn for b in m.sub for st in m.state), 2),
-            "Dispatch_power", round(sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b,st].value 
-                                        for i in m.node for k in m.dispatch_gen for n in m.rpdn for b in m.sub for st in m.state), 2)
+        print("LOLE every year", round(value(sum(m.weight_time[n] * TLOLE.value 
+                                            for (a,tt,n,b), TLOLE in m.TLOLE.items() if tt == t)), 3),
+            "EENS every year", round(value(sum(m.weight_time[n] * m.operation_time[b] * m.TEENS[i,t,n,b].value 
+                                            for i in m.node for n in m.rpdn for b in m.sub)), 3),
+            "Demand every year", round(value(sum(m.weight_time[n] * m.operation_time[b] * m.load_demand[i,t,n,b] 
+                                            for i in m.node for n in m.rpdn for b in m.sub)), 3),
+            "Over generation", round(value(sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.over_gen[i,t,n,b,st].value 
+                                            for i in m.node for n in m.rpdn for b in m.sub for st in m.state)), 2),
+            "Dispatch_power", round(value(sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b,st].value 
+                                        for i in m.node for k in m.dispatch_gen for n in m.rpdn for b in m.sub for st in m.state
+                                        if (i,k,t,n,b,st) in m.ppd)), 2)
         )
         
         if renewable == True:
-            print("RES_power", round(sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b,st].value 
-                                            for i in m.node for k in m.renewable_gen for n in m.rpdn for b in m.sub for st in m.state), 2)
+            print("RES_power", round(value(sum(m.prob[st] * m.weight_time[n] * m.operation_time[b] * m.ppd[i,k,t,n,b,st].value 
+                                            for i in m.node for k in m.renewable_gen for n in m.rpdn for b in m.sub for st in m.state)), 2)
             )
         
     print("CAPEX", round(pyo.value(m.capital_expenditure()), 2), 
@@ -215,3 +222,442 @@ def solve_prob_model(m, renewable, time_limit, abs_gap):
         )
 
     return m
+
+
+
+def solve_matrix_model(m, renewable, time_limit, abs_gap):
+    # Matrix-level interface of Gurobi: the sparse matrices are passed as a whole, no Pyomo writer involved
+    import time
+    import gurobipy as gp
+
+    A, sense, rhs, c, lb, ub, vtype = m.matrices()
+
+    model = gp.Model()
+    model.Params.TimeLimit = time_limit
+    model.Params.MIPGap = abs_gap
+    model.Params.Threads = 8
+
+    x = model.addMVar(A.shape[1], lb=lb, ub=ub, obj=c, vtype=vtype)
+    model.addMConstr(A, x, sense, rhs)
+    model.ModelSense = gp.GRB.MINIMIZE
+
+    # Solve the model and track time
+    start_time = time.time()
+    model.optimize()
+    solve_time = time.time() - start_time
+
+    print(f"\nSolve time: {solve_time:.2f} seconds")
+
+    m.results = model
+    m.x = x.X
+    m.objective = model.ObjVal
+
+
+    # Print results to quickly check them
+    weight_time = np.array([m.weight_time[n] for n in m.rpdn])
+    operation_time = np.array([m.operation_time[b] for b in m.sub])
+    TLOLE = m.value('TLOLE').sum(axis=0)      # year x rpdn x sub
+    TEENS = m.value('TEENS').sum(axis=0)
+    for p, t in enumerate(m.year):
+        print("LOLE every year", round(float((weight_time[:, None] * TLOLE[p]).sum()), 3),
+              "EENS every year", round(float((weight_time[:, None] * operation_time * TEENS[p]).sum()), 3))
+
+    print("Objective", round(m.objective, 2))
+
+    return m
+
+
+
+# Parameters declared mutable by the model builders with mutable=True (key in the data dictionary = Param name)
+MUTABLE_PARAMS = ['load_demand', 'res_target', 'reserve_ratio', 'scenario_rate', 'prob', 'UD_penalty', 'max_LOLE']
+
+
+def update_model(m, data):
+    """
+    Pushes new values of the mutable parameters into a model built with mutable=True, without
+    rebuilding nor re-transforming it.
+
+    Parameters:
+        m: Model built with mutable=True
+        data (dict): Any of MUTABLE_PARAMS with the new values, keys the model does not have are ignored
+    """
+
+    for name in MUTABLE_PARAMS:
+        param = m.component(name)
+        if name not in data or param is None:
+            continue
+        if not param.mutable:
+            raise ValueError(f"{name} is not mutable in the model, build it with mutable=True")
+
+        if not param.is_indexed():
+            param.set_value(data[name])
+            continue
+
+        values = data[name]
+        if name == 'load_demand' and m.component('bigm_demand') is not None:
+            raised = [idx for idx in param if values[idx] > m.bigm_demand[idx] + 1e-9]
+            if raised:
+                raise ValueError(f"Demand raised above the values the big-M constants were derived from at {raised[0]} "
+                                 f"({values[raised[0]]} > {m.bigm_demand[raised[0]]}), rebuild the model")
+        for idx in param:
+            param[idx] = values[idx]
+
+    return m
+
+
+
+def solve_sweep(m, updates, time_limit, abs_gap, solver='appsi_gurobi'):
+    """
+    Sensitivity sweep on a model built with mutable=True: each update is pushed into the model
+    with update_model and solved with a persistent solver, which keeps the transformed model
+    and only receives the changed coefficients. Each point costs one solve, not a build.
+
+    Parameters:
+        updates (list): Data dictionaries with the values of each point (see update_model)
+        solver (str): Persistent solver -> 'appsi_gurobi', 'appsi_highs', ...
+
+    Returns:
+        list: Objective value of each point (None when no solution was found)
+    """
+    import time
+
+    opt = pyo.SolverFactory(solver)
+    opt.config.time_limit = time_limit
+    opt.config.mip_gap = abs_gap
+
+    objectives = []
+    for p, data in enumerate(updates):
+        update_model(m, data)
+
+        start_time = time.time()
+        results = opt.solve(m, load_solutions=False)
+        solve_time = time.time() - start_time
+
+        if len(results.solution) > 0:
+            m.solutions.load_from(results)
+            objectives.append(value(m.obj))
+        else:
+            objectives.append(None)
+
+        print(f"Point {p}: {', '.join(sorted(k for k in data if k in MUTABLE_PARAMS))} | "
+              f"Objective {objectives[-1]} | Solve time: {solve_time:.2f} seconds")
+
+    return objectives
+
+
+
+def linear_sum(variables, coefs=None, constant=0):
+    """
+    Linear expression constant + sum(coefs[j] * variables[j]), built directly as one flat
+    LinearExpression instead of term by term with sum().
+
+    Parameters:
+        variables (list): Pyomo variables
+        coefs (list): Coefficients (numbers or Params), 1 for every variable when None
+        constant: Constant term (number or Param)
+    """
+
+    # The compact survived capacities are Expressions (or 0 for a failed component), which cannot
+    # be terms of a LinearExpression
+    if not all(isinstance(v, VarData) for v in variables):
+        if coefs is None:
+            return constant + sum(variables)
+        return constant + sum(c * v for c, v in zip(coefs, variables))
+
+    # Variables with a coefficient of 1 are terms of the expression themselves
+    if coefs is None:
+        args = list(variables)
+    else:
+        args = [v if type(c) is int and c == 1 else MonomialTermExpression((c, v)) for c, v in zip(coefs, variables)]
+    if type(constant) is not int or constant != 0:
+        args.insert(0, constant)
+
+    return LinearExpression(args)
+
+
+
+# Rough memory of the solver: every nonzero is stored by rows and by columns (value and index), and
+# presolve keeps a second copy of the model; every row and column carries bounds, types and names
+BYTES_PER_NONZERO = 2 * 2 * (8 + 4)
+BYTES_PER_ROW_COLUMN = 2 * 64
+
+
+def model_statistics(m, verbose=True):
+    """
+    Size of a built (and transformed) model before it is solved, by component family.
+
+    The model is compiled once to a sparse matrix with Pyomo's standard form compiler, and every
+    count is a NumPy reduction of that matrix over the family of each row and column. The rows of
+    the GDP transformation (gdp.bigm, gdp.hull, gdp.mbigm) are counted in the family of the disjunct
+    constraint they come from (e.g. load_shdding_yes.LOLE_state), the indicator variables in the
+    family of their disjunct. gdp.binary_multiplication gives quadratic rows, which have no linear
+    standard form, so these models are refused with a ValueError.
+
+    Parameters:
+        m: Pyomo model, after the GDP transformation
+        verbose (bool): Print the table and the totals
+
+    Returns:
+        dict: 'families' (DataFrame with the continuous and binary variables, constraints, nonzeros
+              and coefficient range of every family), 'rows', 'columns', 'binaries', 'nonzeros'
+              and 'memory_GB' (estimated memory of the solver)
+    """
+    import scipy.sparse as sp
+    from pyomo.repn.plugins.standard_form import LinearStandardFormCompiler
+
+    if gdp_transformation(m) == 'binary_multiplication':
+        raise ValueError("model_statistics needs a linear model, gdp.binary_multiplication gives quadratic rows "
+                         "(indicator times constraint body), use another transformation")
+
+    repn = LinearStandardFormCompiler().write(m, mixed_form=True)
+    A = sp.csr_matrix(repn.A)
+    c = sp.csr_matrix(repn.c)
+
+    # Family of every row, column and objective, as positions in names
+    names, positions = [], {}
+
+    def _position(name):
+        if name not in positions:
+            positions[name] = len(names)
+            names.append(name)
+        return positions[name]
+
+    gdp = pyo.TransformationFactory(f'gdp.{gdp_transformation(m)}')
+    row_family = np.array([_position(_row_family(row[0], gdp)) for row in repn.rows], dtype=int)
+    col_family = np.array([_position(_family(v.parent_component())) for v in repn.columns], dtype=int)
+    obj_family = np.array([_position(o.parent_component().local_name) for o in repn.objectives], dtype=int)
+    binary = np.array([v.is_binary() for v in repn.columns], dtype=bool)
+
+    F = len(names)
+    binaries = np.bincount(col_family[binary], minlength=F)
+    continuous = np.bincount(col_family, minlength=F) - binaries
+    constraints = np.bincount(row_family, minlength=F)
+
+    # Nonzeros of the constraints by row family, of the variables by column family, of the objectives
+    row_nnz = np.repeat(row_family, np.diff(A.indptr))
+    col_nnz = col_family[A.indices]
+    obj_nnz = np.repeat(obj_family, np.diff(c.indptr))
+    nonzeros = np.bincount(row_nnz, minlength=F) + np.bincount(obj_nnz, minlength=F)
+    column_nonzeros = np.bincount(col_nnz, minlength=F)
+
+    # Coefficient range of the constraint and objective families
+    family = np.concatenate([row_nnz, obj_nnz])
+    coef = np.abs(np.concatenate([A.data, c.data]))
+    coef_min, coef_max = np.full(F, np.inf), np.zeros(F)
+    np.minimum.at(coef_min, family[coef > 0], coef[coef > 0])
+    np.maximum.at(coef_max, family, coef)
+
+    table = pd.DataFrame({
+        'family': names,
+        'continuous': continuous,
+        'binary': binaries,
+        'constraints': constraints,
+        'nonzeros': np.where(nonzeros > 0, nonzeros, column_nonzeros),
+        'min |coef|': np.where(np.isfinite(coef_min), coef_min, np.nan),
+        'max |coef|': np.where(coef_max > 0, coef_max, np.nan),
+    }).sort_values('nonzeros', ascending=False, ignore_index=True)
+
+    n_rows, n_cols = A.shape
+    memory = (A.nnz * BYTES_PER_NONZERO + (n_rows + n_cols) * BYTES_PER_ROW_COLUMN) / 1024**3
+    statistics = {'families': table, 'rows': n_rows, 'columns': n_cols, 'binaries': int(binary.sum()),
+                  'nonzeros': A.nnz, 'memory_GB': memory}
+
+    if verbose:
+        print(table.to_string(index=False, float_format=lambda x: f'{x:.3g}'))
+        print(f"Rows {n_rows} | Columns {n_cols} ({statistics['binaries']} binary) | Nonzeros {A.nnz} | "
+              f"Coefficients {coef[coef > 0].min() if (coef > 0).any() else 0:.3g} to {coef.max(initial=0):.3g} | "
+              f"Estimated solver memory {memory:.2f} GB")
+
+    return statistics
+
+
+def _family(comp):
+    # Name of an indexed component, the ones on the data of an indexed block (the indicator variables of
+    # a Disjunct, the constraints of the GDP reformulation block) are named after that block
+    block = comp.parent_block()
+    if block is None or block.parent_block() is None or not block.parent_component().is_indexed():
+        return comp.local_name
+    return f'{block.parent_component().local_name}.{comp.local_name}'
+
+
+def _row_family(con, gdp):
+    # The relaxed constraints of the GDP transformation are counted in the family of their disjunct
+    # constraint, the ones it adds itself (e.g. the disaggregated bounds of gdp.hull) by their own name
+    comp = con.parent_component()
+    if comp.parent_block().parent_component().local_name == 'relaxedDisjuncts':
+        try:
+            return _family(gdp.get_src_constraint(con).parent_component())
+        except GDP_Error:
+            pass
+    return _family(comp)
+
+
+GDP_TRANSFORMATIONS = ['bigm', 'hull', 'mbigm', 'binary_multiplication']
+
+
+def gdp_transformation(m):
+    # GDP transformation applied to the model, from the reformulation block it added (bigm if none)
+    for name in GDP_TRANSFORMATIONS:
+        if m.component(f'_pyomo_gdp_{name}_reformulation') is not None:
+            return name
+    return 'bigm'
+
+
+
+# (Disjunction, installation Disjunct, no-installation Disjunct, its capacity and cost constraints, minimum and maximum capacity, unit investment cost)
+INSTALL_DISJUNCTS = [
+    ('Ornot_gen_install', 'gen_install', 'gen_install_no', 'invest_cost_res_no', 'install_cap_res_no', 'min_ins_cap', 'max_ins_cap', 'unit_IC'),
+    ('Ornot_line_install', 'line_install', 'line_install_no', 'ins_cap_no', 'invest_cost_no', 'min_line', 'max_line', 'unit_IC_line'),
+    ('Ornot_backup_install', 'backup_install', 'backup_install_no', 'invest_cost_bk_no', 'install_cap_bk_no', 'min_ins_cap_backup', 'max_ins_cap_backup', 'unit_IC_backup'),
+]
+
+
+def bigm_values(m):
+    """
+    Tightest valid M of every disjunct constraint of a model, from the case data, to be passed to
+    gdp.bigm (bigM=bigm_values(m)).
+
+    The M of a constraint only has to hold while the other disjunct of its disjunction is active,
+    not over the whole bounds of its variables: e.g. EENS == ls only needs the load shedding
+    threshold of load_shdding_no (instead of the demand), and the investment cost equalities
+    hold in both disjuncts (M = 0).
+
+    Returns:
+        ComponentMap: (M of the lower bound, M of the upper bound) of every disjunct constraint
+    """
+    from pyomo.common.collections import ComponentMap
+
+    M = ComponentMap()
+
+    for _, on_name, off_name, cap_name, cost_name, min_name, max_name, cost_param in INSTALL_DISJUNCTS:
+        on, off = m.component(on_name), m.component(off_name)
+        if on is None:
+            continue
+
+        for idx in on:
+            # Fixed by presolve_disjuncts, not transformed
+            if not on[idx].active:
+                continue
+
+            # Nothing installed: the capacity and the cost are 0
+            for c in on[idx].component_data_objects(pyo.Constraint, active=True):
+                M[c] = (min(0, -value(c.lower)) if c.has_lb() else None, max(0, -value(c.upper)) if c.has_ub() else None)
+
+            # Installed: the capacity is between its limits and the cost proportional to it (idx ends with component, year)
+            max_cap = value(m.component(max_name)[idx[-2]])
+            M[off[idx].component(cap_name)] = (0, max_cap)
+            M[off[idx].component(cost_name)] = (0, value(m.component(cost_param)[idx[-2:]]) * max_cap)
+
+    if m.component('load_shdding_yes') is not None:
+        zones = m.component('zone') is not None
+        for (a,t,n,b,st), yes in m.load_shdding_yes.items():
+            if not yes.active:
+                continue
+            no = m.load_shdding_no[a,t,n,b,st]
+            ls_yes, ls_no = value(yes.load_shedding_state.lower), value(no.load_shedding_state_no.upper)
+            demand = sum(value(m.load_demand[i,t,n,b]) for i in (m.zone_node[a] if zones else [a]))
+            operation_time = value(m.operation_time[b])
+
+            # No load shedding: ls (of the node or the zone) is at most ls_no, LOLE and EENS are 0
+            M[yes.load_shedding_state] = (-ls_yes, None)
+            M[yes.LOLE_state] = (-operation_time, 0)
+
+            # Load shedding: ls is between ls_yes and the demand, LOLE is the operation time and EENS is ls
+            M[no.load_shedding_state_no] = (None, demand - ls_no)
+            M[no.LOLE_state_no] = (0, operation_time)
+
+            # With zones, EENS is not in the disjuncts (EENS_state holds for every node)
+            if not zones:
+                M[yes.EENS_state] = (-ls_no, 0)
+                M[no.EENS_state_no] = (0, demand)
+
+    return M
+
+
+
+def presolve_disjuncts(m, load_shedding=False):
+    """
+    Fixes the disjunctions the case data already decides, before the GDP transformation, so the
+    transformed model has neither their binaries nor their relaxed constraints.
+
+    - Installation (INSTALL_DISJUNCTS): nothing is installed when the indicator is already fixed to
+      False (node_npn_gen), or the maximum capacity is 0 or below the minimum capacity.
+    - Load shedding (only with load_shedding=True): none in the (node or zone, year, rpdn, sub, state)
+      where the existing generators of every node cover its demand in every subperiod on their own,
+      i.e. the renewables at their capacity factor and the dispatchable ones whose variable cost is
+      at most the load shedding penalty at a constant output within their output and ramping limits,
+      without imports. The existing generators do not fail in any state. This is a dominance rule
+      (shedding there only moves the shortage between nodes at no lower cost), not a proof, so it is
+      opt-in and refused when UD_penalty is mutable, as a lower penalty would void it.
+
+    The constraints of the disjunct that holds are added to m.presolved_disjuncts, its indicator is
+    fixed to True, the other one is deactivated (indicator fixed to False) and so is the disjunction.
+
+    Returns:
+        int: Number of disjunctions fixed
+    """
+
+    m.presolved_disjuncts = pyo.ConstraintList()
+    fixed = 0
+
+    for disjunction_name, on_name, off_name, _, _, min_name, max_name, _ in INSTALL_DISJUNCTS:
+        on, off = m.component(on_name), m.component(off_name)
+        if on is None:
+            continue
+
+        for idx in on:
+            k = idx[-2]
+            min_cap, max_cap = value(m.component(min_name)[k]), value(m.component(max_name)[k])
+            indicator = on[idx].indicator_var
+            if (indicator.is_fixed() and not indicator.value) or max_cap <= 0 or min_cap > max_cap:
+                _fix_disjunction(m, m.component(disjunction_name)[idx], off[idx])
+                fixed += 1
+
+    if load_shedding and m.component('load_shdding_yes') is not None:
+        if m.UD_penalty.mutable:
+            raise ValueError("The load shedding presolve depends on UD_penalty, build the model with mutable=False")
+
+        covered = _covered_by_existing(m)
+        zones = m.component('zone') is not None
+        for (a,t,n,b,st), no in m.load_shdding_no.items():
+            if all(covered[i,t,n] for i in (m.zone_node[a] if zones else [a])):
+                _fix_disjunction(m, m.Ornot_load_shedding[a,t,n,b,st], no)
+                fixed += 1
+
+    return fixed
+
+
+def _fix_disjunction(m, disjunction, keep):
+    # The disjunct keep holds: its constraints become constraints of the model, the disjuncts and the
+    # disjunction are left out of the transformation
+    for c in keep.component_data_objects(pyo.Constraint, active=True):
+        m.presolved_disjuncts.add(c.expr)
+    for disjunct in disjunction.disjuncts:
+        if disjunct is not keep:
+            disjunct.deactivate()
+    keep.indicator_var.fix(True)
+    keep._deactivate_without_fixing_indicator()
+    disjunction.deactivate()
+
+
+def _covered_by_existing(m):
+    # {(node, year, rpdn): True} when the existing generators of the node cover its demand in every
+    # subperiod: the dispatchable ones cheaper than shedding load at a constant output (within their output
+    # and ramping limits in every subperiod), the renewables at their capacity factor
+    penalty = value(m.UD_penalty) / 1000     # M$/MWh, as in EENS_penalties (VOC_generator: unit_VC / 1000000)
+    level = {}
+    for k in m.gen_ex:
+        if k in m.dispatch_gen:
+            output = min(value(m.max_opt_dpt[k]), value(m.ramp_up[k]))
+            if value(m.min_opt_dpt[k]) <= output:
+                level[k] = output
+    renewable = [k for k in m.gen_ex if k in m.renewable_gen]
+
+    covered = {}
+    for i in m.node:
+        for t in m.year:
+            dispatchable = sum(level[k] * value(m.pre_cap[i,k]) for k in level if value(m.unit_VC[k,t]) / 1000000 <= penalty)
+            for n in m.rpdn:
+                covered[i,t,n] = all(dispatchable + sum(value(m.capacity_factor[i,t,n,b]) * value(m.pre_cap[i,k]) for k in renewable)
+                                     >= value(m.load_demand[i,t,n,b]) for b in m.sub)
+    return covered